@@ -6,6 +6,7 @@ Structure:
     ├── core/               # Core agent logic
     │   ├── orchestrator.py # Main agent loop
     │   ├── client.py       # Claude SDK client
+    │   ├── client_pool.py  # Client reuse across sessions
     │   └── hitl.py         # HITL checkpoints
     ├── daemon/             # Background daemon
     │   ├── server.py       # Daemon process
@@ -27,7 +27,7 @@ import sys
 from pathlib import Path
 
 from common import validate_required_env_vars
-from common.state import FileStateRepository
+from common.state import create_state_repository
 
 from .core import run_autonomous_agent
 from .core.checkpoint_handlers import CheckpointDispatcher
@@ -95,7 +95,11 @@ def main() -> None:
         sys.exit(1)
 
     # Create dependencies (dependency injection)
-    state_repo = FileStateRepository()
+    try:
+        state_repo = create_state_repository()
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
     checkpoint_dispatcher = CheckpointDispatcher()
 
     # Run the agent (auto_accept is read from workspace file at checkpoint time)
@@ -3,6 +3,8 @@
 Exports:
     Client:
         create_client: Create configured Claude SDK client
+        get_client_profile: Select MCP servers/tools for a session type
+        ClientPool: Reuse one connected client across sessions
 
     Orchestrator:
         determine_session_type: Determine which session phase to run
@@ -23,7 +25,8 @@ Exports:
 """
 
 from .checkpoint_handlers import CheckpointDispatcher
-from .client import create_client
+from .client import ClientProfile, create_client, get_client_profile
+from .client_pool import ClientPool
 from .hitl import (
     approve_checkpoint,
     get_pending_checkpoint_type,
@@ -39,6 +42,9 @@ from .session_runner import run_agent_session
 __all__ = [
     # Client
     "create_client",
+    "ClientProfile",
+    "get_client_profile",
+    "ClientPool",
     # Orchestrator
     "determine_session_type",
     "run_autonomous_agent",
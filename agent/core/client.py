@@ -11,11 +11,16 @@ Security hooks are defined in agent/core/hooks/ module.
 from __future__ import annotations
 
 import os
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any
 
 from claude_agent_sdk import ClaudeAgentOptions, ClaudeSDKClient
 
+from common.types import SessionType
+
 from .hooks import get_all_hooks
+from .state_server import create_harness_state_server
 
 # Puppeteer MCP tools for browser automation
 _PUPPETEER_TOOLS = (
@@ -73,6 +78,18 @@ _GITLAB_TOOLS = (
     "mcp__gitlab__get_milestone_merge_requests",
 )
 
+# GitLab MCP tools still used in file-only mode: issues/milestones live in local
+# JSON files, but code is still committed and verified through GitLab
+_GITLAB_COMMIT_TOOLS = (
+    "mcp__gitlab__create_branch",
+    "mcp__gitlab__list_commits",
+    "mcp__gitlab__get_commit",
+    "mcp__gitlab__get_commit_diff",
+    "mcp__gitlab__get_file_contents",
+    "mcp__gitlab__create_or_update_file",
+    "mcp__gitlab__push_files",
+)
+
 # Context7 MCP tools for documentation search
 # Using Context7 HTTP MCP server for library documentation
 _CONTEXT7_TOOLS = (
@@ -87,6 +104,21 @@ _SEARXNG_TOOLS = (
     "mcp__searxng__web_url_read",  # Read content from URLs
 )
 
+# Harness state MCP tools (in-process server, see state_server.py)
+_HARNESS_CHECKPOINT_TOOLS = (
+    "mcp__harness__create_checkpoint",
+    "mcp__harness__get_pending_checkpoint",
+    "mcp__harness__complete_checkpoint",
+    "mcp__harness__list_checkpoints",
+)
+
+# Local issue tools, only meaningful in file-only mode (.file_issues.json)
+_HARNESS_ISSUE_TOOLS = (
+    "mcp__harness__list_issues",
+    "mcp__harness__create_issue",
+    "mcp__harness__update_issue",
+)
+
 # Built-in tools
 _BUILTIN_TOOLS = (
     "Read",
@@ -100,14 +132,148 @@ _BUILTIN_TOOLS = (
     "Skill",  # For invoking .claude/skills/ in the project
 )
 
+# MCP server names
+MCP_PUPPETEER = "puppeteer"
+MCP_GITLAB = "gitlab"
+MCP_CONTEXT7 = "context7"
+MCP_SEARXNG = "searxng"
+MCP_HARNESS = "harness"
+
+# Every MCP server the harness knows about, in registration order
+ALL_MCP_SERVERS = (MCP_HARNESS, MCP_PUPPETEER, MCP_GITLAB, MCP_CONTEXT7, MCP_SEARXNG)
+
+# Servers spawned as local stdio subprocesses (via npx); context7 is remote HTTP
+_STDIO_MCP_SERVERS = frozenset({MCP_PUPPETEER, MCP_GITLAB, MCP_SEARXNG})
+
+_ALL_TOOLS = (
+    *_BUILTIN_TOOLS,
+    *_HARNESS_CHECKPOINT_TOOLS,
+    *_HARNESS_ISSUE_TOOLS,
+    *_PUPPETEER_TOOLS,
+    *_GITLAB_TOOLS,
+    *_CONTEXT7_TOOLS,
+    *_SEARXNG_TOOLS,
+)
+
+
+@dataclass(frozen=True)
+class ClientProfile:
+    """MCP servers and tools exposed to one kind of session.
+
+    Profiles are derived from the session type and agent flags so that a
+    session only spawns the MCP servers (and advertises the tool schemas)
+    its prompt actually uses.
+
+    Attributes:
+        name: Short label for display (e.g. "coding/file-only")
+        mcp_servers: MCP server names to register
+        allowed_tools: Tool allowlist passed to the SDK
+        gitlab_milestones: Enable GitLab milestone tools (USE_MILESTONE)
+    """
+
+    name: str
+    mcp_servers: tuple[str, ...]
+    allowed_tools: tuple[str, ...]
+    gitlab_milestones: bool = True
+
+    @property
+    def stdio_process_count(self) -> int:
+        """Number of MCP subprocesses this profile spawns."""
+        return sum(1 for server in self.mcp_servers if server in _STDIO_MCP_SERVERS)
+
+    def summary(self) -> str:
+        """One-line summary of servers and tools, including what was skipped."""
+        servers = ", ".join(self.mcp_servers) or "none"
+        skipped = [server for server in ALL_MCP_SERVERS if server not in self.mcp_servers]
+        saved_processes = len(_STDIO_MCP_SERVERS) - self.stdio_process_count
+        line = f"Profile {self.name}: MCP servers {servers}"
+        if skipped:
+            line += f" (skipped {', '.join(skipped)}; {saved_processes} fewer subprocess(es))"
+        line += f" | tools {len(self.allowed_tools)}/{len(_ALL_TOOLS)}"
+        if MCP_GITLAB in self.mcp_servers and not self.gitlab_milestones:
+            line += " | gitlab milestone tools off"
+        return line
+
+
+# Default profile: everything enabled (used when no session type is given)
+FULL_PROFILE = ClientProfile(name="full", mcp_servers=ALL_MCP_SERVERS, allowed_tools=_ALL_TOOLS)
+
 
-def create_client(project_dir: Path, model: str) -> ClaudeSDKClient:
+def get_client_profile(
+    session_type: SessionType,
+    *,
+    file_only_mode: bool = False,
+    skip_puppeteer: bool = False,
+) -> ClientProfile:
+    """Select the MCP servers and tools a session needs.
+
+    Based on what each prompt template uses:
+    - All sessions: harness state server for checkpoints (plus local issue
+      tools in file-only mode)
+    - INITIALIZER: GitLab (unless file-only) plus Context7/SearXNG for issue
+      enrichment; never uses the browser
+    - CODING / MR_CREATION: GitLab commit tools (full set unless file-only)
+      plus Puppeteer unless skip_puppeteer; no enrichment servers
+
+    Args:
+        session_type: Session phase being started
+        file_only_mode: Issues/milestones are tracked in local files
+        skip_puppeteer: Browser automation is disabled
+
+    Returns:
+        ClientProfile for the session
+    """
+    servers: list[str] = [MCP_HARNESS]
+    tools: list[str] = [*_BUILTIN_TOOLS, *_HARNESS_CHECKPOINT_TOOLS]
+    if file_only_mode:
+        tools.extend(_HARNESS_ISSUE_TOOLS)
+
+    if session_type == SessionType.INITIALIZER:
+        if not file_only_mode:
+            servers.append(MCP_GITLAB)
+            tools.extend(_GITLAB_TOOLS)
+        servers.extend([MCP_CONTEXT7, MCP_SEARXNG])
+        tools.extend([*_CONTEXT7_TOOLS, *_SEARXNG_TOOLS])
+    else:
+        if not skip_puppeteer:
+            servers.append(MCP_PUPPETEER)
+            tools.extend(_PUPPETEER_TOOLS)
+        servers.append(MCP_GITLAB)
+        tools.extend(_GITLAB_COMMIT_TOOLS if file_only_mode else _GITLAB_TOOLS)
+
+    name = session_type.value
+    if file_only_mode:
+        name += "/file-only"
+    if skip_puppeteer and session_type != SessionType.INITIALIZER:
+        name += "/no-browser"
+
+    # Keep registration order stable so equal profiles compare equal
+    ordered_servers = tuple(server for server in ALL_MCP_SERVERS if server in servers)
+    return ClientProfile(
+        name=name,
+        mcp_servers=ordered_servers,
+        allowed_tools=tuple(dict.fromkeys(tools)),
+        gitlab_milestones=not file_only_mode,
+    )
+
+
+def create_client(
+    project_dir: Path,
+    model: str,
+    profile: ClientProfile | None = None,
+    spec_slug: str | None = None,
+    spec_hash: str | None = None,
+) -> ClaudeSDKClient:
     """
     Create a Claude Agent SDK client with multi-layered security.
 
     Args:
         project_dir: Directory for the project
         model: Claude model to use
+        profile: MCP servers/tools to expose (defaults to FULL_PROFILE)
+        spec_slug: Spec slug for the harness state server
+        spec_hash: Spec hash for the harness state server (the server is
+            only registered when both are given)
 
     Returns:
         Configured ClaudeSDKClient
@@ -120,11 +286,11 @@ def create_client(project_dir: Path, model: str) -> ClaudeSDKClient:
 
     Uses SDK 0.1.18 direct options instead of settings file.
     """
-    # Environment variables are validated in runner.py (entry point)
-    # Get them here for MCP server configuration
-    gitlab_token = os.environ.get("GITLAB_PERSONAL_ACCESS_TOKEN", "")
-    gitlab_api_url = os.environ.get("GITLAB_API_URL", "https://gitlab.com/api/v4")
-    context7_api_key = os.environ.get("CONTEXT7_API_KEY", "")
+    if profile is None:
+        profile = FULL_PROFILE
+    mcp_servers = _build_mcp_servers(profile)
+    if MCP_HARNESS in profile.mcp_servers and spec_slug and spec_hash:
+        mcp_servers[MCP_HARNESS] = create_harness_state_server(project_dir, spec_slug, spec_hash)
     searxng_url = os.environ.get("SEARXNG_URL", "http://localhost:8888")
 
     # Ensure project directory exists
@@ -135,8 +301,11 @@ def create_client(project_dir: Path, model: str) -> ClaudeSDKClient:
     print(f"   - Working directory: {project_dir.resolve()}")
     print("   - permission_mode: acceptEdits (auto-approve file operations)")
     print("   - Bash commands restricted to allowlist (see agent/core/hooks/)")
-    print(f"   - MCP servers: puppeteer (browser), gitlab (project mgmt), context7 (docs), searxng ({searxng_url})")
-    print("   - Web search: SearXNG (primary), WebFetch (fallback)")
+    print(f"   - MCP servers: {', '.join(_MCP_SERVER_LABELS[name] for name in mcp_servers) or 'none'}")
+    if MCP_SEARXNG in profile.mcp_servers:
+        print(f"   - Web search: SearXNG ({searxng_url}, primary), WebFetch (fallback)")
+    else:
+        print("   - Web search: WebFetch")
     print()
 
     # Note: Timeout configuration is not exposed in ClaudeAgentOptions (SDK 0.1.18)
@@ -155,13 +324,7 @@ def create_client(project_dir: Path, model: str) -> ClaudeSDKClient:
                 "You use GitLab for project management and tracking all your work."
             ),
             # Tools configuration (SDK 0.1.12+)
-            allowed_tools=[
-                *_BUILTIN_TOOLS,
-                *_PUPPETEER_TOOLS,
-                *_GITLAB_TOOLS,
-                *_CONTEXT7_TOOLS,
-                *_SEARXNG_TOOLS,
-            ],
+            allowed_tools=list(profile.allowed_tools),
             # Permission mode (SDK 0.1.18) - replaces settings file permissions
             # "acceptEdits" auto-approves Read, Write, Edit, Glob, Grep within cwd
             permission_mode="acceptEdits",
@@ -174,35 +337,7 @@ def create_client(project_dir: Path, model: str) -> ClaudeSDKClient:
             setting_sources=["project"],
             # MCP servers for external integrations
             # type: ignore[arg-type] - SDK expects a specific MCP server config type that's not publicly exported
-            mcp_servers={  # type: ignore[arg-type]
-                "puppeteer": {"command": "npx", "args": ["puppeteer-mcp-server"]},
-                # GitLab MCP server using stdio transport
-                "gitlab": {
-                    "command": "npx",
-                    "args": ["-y", "@zereight/mcp-gitlab"],
-                    "env": {
-                        "GITLAB_PERSONAL_ACCESS_TOKEN": gitlab_token,
-                        "GITLAB_API_URL": gitlab_api_url,
-                        "USE_MILESTONE": "true",
-                    },
-                },
-                # Context7 HTTP MCP server for library documentation
-                "context7": {
-                    "type": "http",
-                    "url": "https://mcp.context7.com/mcp",
-                    "headers": {
-                        "CONTEXT7_API_KEY": context7_api_key,
-                    },
-                },
-                # SearXNG MCP server for web search (local instance)
-                "searxng": {
-                    "command": "npx",
-                    "args": ["-y", "mcp-searxng"],
-                    "env": {
-                        "SEARXNG_URL": searxng_url,
-                    },
-                },
-            },
+            mcp_servers=mcp_servers,  # type: ignore[arg-type]
             # Security hooks - see agent/core/hooks/ for implementation
             hooks=get_all_hooks(),
             # Execution limits
@@ -218,6 +353,65 @@ def create_client(project_dir: Path, model: str) -> ClaudeSDKClient:
     )
 
 
+_MCP_SERVER_LABELS = {
+    MCP_HARNESS: "harness (local state)",
+    MCP_PUPPETEER: "puppeteer (browser)",
+    MCP_GITLAB: "gitlab (project mgmt)",
+    MCP_CONTEXT7: "context7 (docs)",
+    MCP_SEARXNG: "searxng (search)",
+}
+
+
+def _build_mcp_servers(profile: ClientProfile) -> dict[str, dict[str, Any]]:
+    """Build the MCP server configuration for the servers in a profile.
+
+    The in-process harness state server needs the spec identity and is added
+    by create_client().
+
+    Environment variables are validated in cli.py (entry point); they are
+    read here for MCP server configuration.
+    """
+    servers: dict[str, dict[str, Any]] = {}
+
+    if MCP_PUPPETEER in profile.mcp_servers:
+        servers[MCP_PUPPETEER] = {"command": "npx", "args": ["puppeteer-mcp-server"]}
+
+    if MCP_GITLAB in profile.mcp_servers:
+        # GitLab MCP server using stdio transport
+        servers[MCP_GITLAB] = {
+            "command": "npx",
+            "args": ["-y", "@zereight/mcp-gitlab"],
+            "env": {
+                "GITLAB_PERSONAL_ACCESS_TOKEN": os.environ.get("GITLAB_PERSONAL_ACCESS_TOKEN", ""),
+                "GITLAB_API_URL": os.environ.get("GITLAB_API_URL", "https://gitlab.com/api/v4"),
+                # Milestone tools are only advertised when enabled
+                "USE_MILESTONE": "true" if profile.gitlab_milestones else "false",
+            },
+        }
+
+    if MCP_CONTEXT7 in profile.mcp_servers:
+        # Context7 HTTP MCP server for library documentation
+        servers[MCP_CONTEXT7] = {
+            "type": "http",
+            "url": "https://mcp.context7.com/mcp",
+            "headers": {
+                "CONTEXT7_API_KEY": os.environ.get("CONTEXT7_API_KEY", ""),
+            },
+        }
+
+    if MCP_SEARXNG in profile.mcp_servers:
+        # SearXNG MCP server for web search (local instance)
+        servers[MCP_SEARXNG] = {
+            "command": "npx",
+            "args": ["-y", "mcp-searxng"],
+            "env": {
+                "SEARXNG_URL": os.environ.get("SEARXNG_URL", "http://localhost:8888"),
+            },
+        }
+
+    return servers
+
+
 def _stderr_filter(msg: str) -> None:
     """
     Filter and log stderr messages from Claude Code client.
@@ -0,0 +1,229 @@
+"""
+Claude SDK Client Pool
+======================
+
+Keeps one long-lived Claude SDK client (and the CLI subprocess + MCP servers
+it spawned) alive across orchestrator iterations.
+
+Each call to create_client() + connect() starts a fresh Claude CLI, which in
+turn cold-starts every stdio MCP server through npx. That costs 10-30s before
+every session. The pool instead:
+- Connects once and reuses the client for subsequent sessions
+- Clears the conversation between sessions (/clear) so every session still
+  starts with a fresh context
+- Health-checks the client before handing it out
+- Recycles the client after N sessions, after a failed session, when the
+  CLI process has died, or when the next session needs a different
+  ClientProfile (different MCP servers/tools)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from collections.abc import Callable
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from .client import FULL_PROFILE, ClientProfile, create_client
+
+if TYPE_CHECKING:
+    from claude_agent_sdk import ClaudeSDKClient
+
+# Recycle the CLI process after this many sessions to bound memory growth
+# in the CLI and long-running MCP servers
+DEFAULT_MAX_SESSIONS_PER_CLIENT = 10
+
+# Slash command that resets the conversation without restarting the CLI
+_CLEAR_COMMAND = "/clear"
+_CLEAR_TIMEOUT_SECONDS = 30.0
+_DISCONNECT_TIMEOUT_SECONDS = 10.0
+
+# Marks an SDK attribute this module does not know (see ClientPool._is_healthy)
+_MISSING = object()
+
+# create_client(project_dir, model, profile, spec_slug=..., spec_hash=...)
+ClientFactory = Callable[..., "ClaudeSDKClient"]
+
+
+class ClientPool:
+    """Long-lived Claude SDK client pool for a single agent.
+
+    An agent runs one session at a time, so the pool holds at most one
+    connected client. Usage:
+
+        async with ClientPool(project_dir, model) as pool:
+            client = await pool.acquire(profile)
+            status, _ = await run_agent_session(client, prompt)
+            await pool.release(client, healthy=status != "error")
+    """
+
+    def __init__(
+        self,
+        project_dir: Path,
+        model: str,
+        *,
+        max_sessions: int = DEFAULT_MAX_SESSIONS_PER_CLIENT,
+        client_factory: ClientFactory = create_client,
+        spec_slug: str | None = None,
+        spec_hash: str | None = None,
+    ) -> None:
+        """Initialize the pool.
+
+        Args:
+            project_dir: Directory for the project
+            model: Claude model to use
+            max_sessions: Sessions served by one client before it is recycled
+            client_factory: Function that builds an unconnected client
+            spec_slug: Spec slug passed to the factory (harness state server)
+            spec_hash: Spec hash passed to the factory (harness state server)
+        """
+        if max_sessions <= 0:
+            raise ValueError(f"max_sessions must be a positive integer, got: {max_sessions}")
+
+        self._project_dir = project_dir
+        self._model = model
+        self._max_sessions = max_sessions
+        self._client_factory = client_factory
+        self._spec_slug = spec_slug
+        self._spec_hash = spec_hash
+        self._client: ClaudeSDKClient | None = None
+        self._profile: ClientProfile | None = None
+        self._sessions_served = 0
+        self._in_use = False
+
+        # Counters for the session header / diagnostics
+        self.clients_created = 0
+        self.clients_recycled = 0
+
+    async def __aenter__(self) -> ClientPool:
+        """Enter async context manager."""
+        return self
+
+    async def __aexit__(self, exc_type: type | None, exc_val: BaseException | None, exc_tb: object) -> None:
+        """Exit async context manager, disconnecting any pooled client."""
+        await self.close()
+
+    @property
+    def sessions_served(self) -> int:
+        """Number of sessions served by the current client."""
+        return self._sessions_served
+
+    async def acquire(self, profile: ClientProfile = FULL_PROFILE) -> ClaudeSDKClient:
+        """Get a connected client with a fresh conversation context.
+
+        Reuses the pooled client when it is healthy, under its session
+        budget and built for the same profile; otherwise disconnects it and
+        connects a new one.
+
+        Args:
+            profile: MCP servers/tools the session needs
+
+        Raises:
+            RuntimeError: If the client is already checked out
+        """
+        if self._in_use:
+            raise RuntimeError("ClientPool client is already in use")
+
+        if self._client is not None:
+            if profile != self._profile:
+                print(f"[Pool] Switching client profile to {profile.name}")
+                await self._discard()
+            elif self._sessions_served >= self._max_sessions:
+                print(f"[Pool] Recycling client after {self._sessions_served} sessions")
+                await self._discard()
+            elif not self._is_healthy(self._client):
+                print("[Pool] Client process is not running, recycling")
+                await self._discard()
+            elif not await self._reset_conversation(self._client):
+                print("[Pool] Failed to reset conversation, recycling")
+                await self._discard()
+            else:
+                print(f"[Pool] Reusing client (session {self._sessions_served + 1}/{self._max_sessions})")
+
+        if self._client is None:
+            client = self._client_factory(
+                self._project_dir, self._model, profile, spec_slug=self._spec_slug, spec_hash=self._spec_hash
+            )
+            await client.connect()
+            self._client = client
+            self._profile = profile
+            self._sessions_served = 0
+            self.clients_created += 1
+
+        self._in_use = True
+        return self._client
+
+    async def release(self, client: ClaudeSDKClient, *, healthy: bool = True) -> None:
+        """Return a client to the pool.
+
+        Args:
+            client: Client previously returned by acquire()
+            healthy: False if the session crashed; the client is then discarded
+        """
+        # Never leave the pool checked out, even for a client it no longer holds
+        self._in_use = False
+        if client is not self._client:
+            return
+
+        self._sessions_served += 1
+
+        if not healthy:
+            print("[Pool] Session failed, recycling client")
+            await self._discard()
+
+    async def close(self) -> None:
+        """Disconnect the pooled client, if any."""
+        self._in_use = False
+        if self._client is not None:
+            await self._discard(recycled=False)
+
+    def _is_healthy(self, client: ClaudeSDKClient) -> bool:
+        """Check that the client's CLI transport is still usable."""
+        # The SDK does not expose a public liveness check, so inspect the
+        # transport it created on connect(): ClaudeSDKClient._transport and
+        # SubprocessCLITransport._process as of claude-agent-sdk 0.1.x. If a
+        # later version renames them, assume healthy and let the /clear in
+        # _reset_conversation() detect a dead CLI instead.
+        transport = getattr(client, "_transport", _MISSING)
+        if transport is _MISSING:
+            return True
+        if transport is None:
+            return False
+        is_ready = getattr(transport, "is_ready", None)
+        if callable(is_ready) and not is_ready():
+            return False
+        process = getattr(transport, "_process", None)
+        return process is None or getattr(process, "returncode", None) is None
+
+    async def _reset_conversation(self, client: ClaudeSDKClient) -> bool:
+        """Clear conversation history so the next session starts fresh.
+
+        Returns:
+            True if the CLI acknowledged the reset, False otherwise.
+        """
+
+        async def _clear() -> None:
+            await client.query(_CLEAR_COMMAND)
+            async for _message in client.receive_response():
+                pass
+
+        try:
+            await asyncio.wait_for(_clear(), timeout=_CLEAR_TIMEOUT_SECONDS)
+            return True
+        except Exception:  # pylint: disable=broad-exception-caught
+            return False
+
+    async def _discard(self, recycled: bool = True) -> None:
+        """Disconnect and drop the pooled client."""
+        client = self._client
+        self._client = None
+        self._profile = None
+        self._sessions_served = 0
+        if client is None:
+            return
+        if recycled:
+            self.clients_recycled += 1
+        # A crashed CLI may raise or hang on disconnect; never let that block the loop
+        with contextlib.suppress(Exception):
+            await asyncio.wait_for(client.disconnect(), timeout=_DISCONNECT_TIMEOUT_SECONDS)
@@ -13,18 +13,32 @@ HITL Checkpoints:
 5. Issue Selection - Approve which issue to work on next
 6. Issue Closure - Require human test before closing issue
 7. MR Review - Approve MR title/description before creation
+
+Waiting on a checkpoint is event-driven: CheckpointLogWatcher wakes the
+orchestrator when the checkpoint log changes (inotify on Linux, cheap stat
+polling elsewhere) so the log is only re-parsed after it was written.
+
+Resolutions are appended to an append-only checkpoint journal
+(common/checkpoint_journal.py) and folded into the log file before the
+next agent session reads it.
 """
 
 from __future__ import annotations
 
+import asyncio
 import contextlib
-import json
+import ctypes
+import ctypes.util
 import os
-import tempfile
+import struct
+import sys
 from collections.abc import Callable
 from datetime import UTC, datetime
 from pathlib import Path
 
+from common.checkpoint_journal import JOURNAL_FILE, CheckpointJournal
+from common.sqlite_state import SqliteStateRepository
+from common.state import CachingStateRepository, create_state_repository
 from common.types import CheckpointData, CheckpointStatus, CheckpointType
 
 # State file names
@@ -32,6 +46,14 @@ HITL_LOG_FILE = ".hitl_checkpoint_log.json"
 MILESTONE_STATE_FILE = ".gitlab_milestone.json"
 AGENT_STATE_DIR = ".claude-agent"
 
+# Shared repository for checkpoint queries (STATE_BACKEND selects JSON or SQLite).
+# With the JSON backend, writes re-read the log from disk and append to the
+# checkpoint journal (see _atomic_checkpoint_update), never touching the cache.
+try:
+    _checkpoint_reader = create_state_repository()
+except ValueError:
+    _checkpoint_reader = CachingStateRepository()
+
 
 def get_milestone_state_path(project_dir: Path, spec_slug: str, spec_hash: str) -> Path:
     """Get the path to the milestone state file."""
@@ -40,26 +62,28 @@ def get_milestone_state_path(project_dir: Path, spec_slug: str, spec_hash: str)
     return state_dir / MILESTONE_STATE_FILE
 
 
+def get_checkpoint_log_path(project_dir: Path, spec_slug: str, spec_hash: str) -> Path:
+    """Get the path to the HITL checkpoint log file."""
+    return _get_hitl_log_path(project_dir, spec_slug, spec_hash)
+
+
 def load_pending_checkpoint(project_dir: Path, spec_slug: str, spec_hash: str) -> CheckpointData | None:
     """Load the most recent pending checkpoint from the log.
 
+    Uses the maintained checkpoint index (or the SQLite backend's indexed
+    tables), which is only updated when the log file changes on disk.
+
     Returns:
         The most recent checkpoint where completed=False, or None
     """
-    log_data = _load_checkpoint_log(project_dir, spec_slug, spec_hash)
+    _get_agent_state_dir(project_dir, spec_slug, spec_hash)  # Validates slug/hash
+    return _checkpoint_reader.load_pending_checkpoint(project_dir, spec_slug, spec_hash)
 
-    # Search all issues for pending checkpoints
-    all_checkpoints = _collect_checkpoints(
-        log_data,
-        lambda ckpt: not ckpt.get("completed", False),
-    )
-
-    if not all_checkpoints:
-        return None
 
-    # Return most recent (by created_at)
-    latest = max(all_checkpoints, key=lambda x: x.get("created_at", ""))
-    return CheckpointData.from_dict(latest)
+def load_checkpoint_log(project_dir: Path, spec_slug: str, spec_hash: str) -> dict[str, list[dict]]:
+    """Load the full checkpoint log ({issue_key: [checkpoint dicts]}) for read-only use."""
+    _get_agent_state_dir(project_dir, spec_slug, spec_hash)  # Validates slug/hash
+    return _checkpoint_reader.load(project_dir, spec_slug, spec_hash).checkpoint_log
 
 
 def is_checkpoint_pending(project_dir: Path, spec_slug: str, spec_hash: str) -> bool:
@@ -169,6 +193,253 @@ def reject_checkpoint(
     )
 
 
+def create_checkpoint(
+    project_dir: Path,
+    checkpoint_type: CheckpointType,
+    spec_slug: str,
+    spec_hash: str,
+    context: dict | None = None,
+    issue_iid: str | None = None,
+) -> CheckpointData:
+    """Create a new pending checkpoint.
+
+    Args:
+        project_dir: Project directory
+        checkpoint_type: Type of checkpoint
+        spec_slug: Spec slug identifier (required)
+        spec_hash: 8-character base62 hash (required)
+        context: Checkpoint-specific data shown to the reviewer
+        issue_iid: Issue IID the checkpoint belongs to (None for global)
+
+    Returns:
+        The created checkpoint
+    """
+    state_dir = _get_agent_state_dir(project_dir, spec_slug, spec_hash)
+    checkpoint = CheckpointData(checkpoint_type=checkpoint_type, context=context or {}, issue_iid=issue_iid)
+    issue_key = issue_iid or "global"
+
+    if isinstance(_checkpoint_reader, SqliteStateRepository):
+        _checkpoint_reader.add_checkpoint(project_dir, spec_slug, spec_hash, issue_key, checkpoint.to_dict())
+    else:
+        CheckpointJournal(state_dir).append(
+            {"op": "create", "issue_key": issue_key, "checkpoint": checkpoint.to_dict()}
+        )
+    return checkpoint
+
+
+def complete_checkpoint(project_dir: Path, spec_slug: str, spec_hash: str, checkpoint_id: str) -> CheckpointData | None:
+    """Mark a checkpoint as completed after the agent acted on the decision.
+
+    Returns:
+        The updated checkpoint, or None if no checkpoint has that ID.
+    """
+    completed_at = datetime.now(UTC).isoformat()
+
+    def update_completion(ckpt_dict: dict) -> None:
+        ckpt_dict["completed"] = True
+        ckpt_dict["completed_at"] = completed_at
+
+    updated = _atomic_checkpoint_update(
+        project_dir, spec_slug, spec_hash, checkpoint_id, update_completion, op="complete"
+    )
+    return CheckpointData.from_dict(updated) if updated else None
+
+
+def compact_checkpoint_journal(project_dir: Path, spec_slug: str, spec_hash: str) -> bool:
+    """Fold journaled checkpoint events into the checkpoint log file.
+
+    Prompts read .hitl_checkpoint_log.json directly, so this must run before
+    an agent session starts.
+
+    Returns:
+        True if the log file was rewritten.
+    """
+    return CheckpointJournal(_get_agent_state_dir(project_dir, spec_slug, spec_hash)).compact()
+
+
+# ============================================================================
+# Checkpoint Log Watcher
+# ============================================================================
+
+# inotify constants (from <sys/inotify.h>)
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_INOTIFY_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+# Stat polling interval when inotify is unavailable (stat is cheap, no parsing)
+_WATCH_POLL_INTERVAL_SECONDS = 1.0
+
+
+class CheckpointLogWatcher:
+    """Async notifier for changes to a checkpoint log file or its journal.
+
+    Uses inotify on the log's directory when available (the log is replaced
+    via atomic rename, so the file inode itself cannot be watched), and
+    falls back to polling (inode, mtime_ns, size) otherwise.
+
+    Changes that happen after start() but before wait_for_change() are not
+    lost: the pending notification is delivered on the next wait.
+
+    extra_paths adds other files in the same directory (e.g. milestone
+    state) that should also count as a change.
+
+    Usage:
+        async with CheckpointLogWatcher(log_path) as watcher:
+            while not done():
+                await watcher.wait_for_change(timeout=60)
+    """
+
+    def __init__(
+        self,
+        log_path: Path,
+        poll_interval: float = _WATCH_POLL_INTERVAL_SECONDS,
+        extra_paths: tuple[Path, ...] = (),
+    ) -> None:
+        self._log_path = log_path
+        self._watched_paths = (log_path, log_path.parent / JOURNAL_FILE, *extra_paths)
+        self._poll_interval = poll_interval
+        self._changed = asyncio.Event()
+        self._inotify_fd: int | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._last_signature: tuple[tuple[int, int, int] | None, ...] | None = None
+
+    @property
+    def uses_inotify(self) -> bool:
+        """True if change notification is kernel-driven rather than polled."""
+        return self._inotify_fd is not None
+
+    async def __aenter__(self) -> CheckpointLogWatcher:
+        """Enter async context manager."""
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type: type | None, exc_val: BaseException | None, exc_tb: object) -> None:
+        """Exit async context manager."""
+        self.close()
+
+    def start(self) -> None:
+        """Start watching. Falls back to polling if inotify cannot be used."""
+        self._loop = asyncio.get_running_loop()
+        self._last_signature = self._stat_signature()
+        fd = _inotify_watch_directory(self._log_path.parent)
+        if fd is None:
+            return
+        try:
+            self._loop.add_reader(fd, self._on_inotify_readable)
+        except (NotImplementedError, OSError):
+            os.close(fd)
+            return
+        self._inotify_fd = fd
+
+    def close(self) -> None:
+        """Stop watching and release the inotify descriptor."""
+        if self._inotify_fd is None:
+            return
+        if self._loop is not None:
+            with contextlib.suppress(Exception):
+                self._loop.remove_reader(self._inotify_fd)
+        with contextlib.suppress(OSError):
+            os.close(self._inotify_fd)
+        self._inotify_fd = None
+
+    async def wait_for_change(self, timeout: float | None = None) -> bool:
+        """Wait until the log file, its journal or an extra path changes.
+
+        Args:
+            timeout: Maximum seconds to wait (None waits forever)
+
+        Returns:
+            True if a change was observed, False on timeout.
+        """
+        if self._inotify_fd is not None:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+            except TimeoutError:
+                return False
+            self._changed.clear()
+            return True
+
+        # Polling fallback: compare stat signatures, never parse the file
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            signature = self._stat_signature()
+            if signature != self._last_signature:
+                self._last_signature = signature
+                return True
+            if deadline is not None and loop.time() >= deadline:
+                return False
+            delay = self._poll_interval if deadline is None else min(self._poll_interval, deadline - loop.time())
+            await asyncio.sleep(max(delay, 0.0))
+
+    def _on_inotify_readable(self) -> None:
+        """Drain inotify events and flag a change if a watched file was touched."""
+        if self._inotify_fd is None:
+            return
+        try:
+            data = os.read(self._inotify_fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        except OSError:
+            # Descriptor is unusable; degrade to polling on the next wait
+            self.close()
+            self._changed.set()
+            return
+
+        targets = {os.fsencode(path.name) for path in self._watched_paths}
+        offset = 0
+        while offset + _INOTIFY_EVENT_HEADER.size <= len(data):
+            _wd, _mask, _cookie, name_len = _INOTIFY_EVENT_HEADER.unpack_from(data, offset)
+            offset += _INOTIFY_EVENT_HEADER.size
+            name = data[offset : offset + name_len].rstrip(b"\0")
+            offset += name_len
+            if name in targets:
+                self._changed.set()
+
+    def _stat_signature(self) -> tuple[tuple[int, int, int] | None, ...]:
+        """Get (inode, mtime_ns, size) of each watched file (None if missing)."""
+        signatures: list[tuple[int, int, int] | None] = []
+        for path in self._watched_paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                signatures.append(None)
+                continue
+            signatures.append((st.st_ino, st.st_mtime_ns, st.st_size))
+        return tuple(signatures)
+
+
+def _inotify_watch_directory(directory: Path) -> int | None:
+    """Create a non-blocking inotify fd watching a directory for file writes.
+
+    Returns:
+        The inotify file descriptor, or None if inotify is unavailable.
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        inotify_init1 = libc.inotify_init1
+        inotify_add_watch = libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+
+    fd = inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+    if fd < 0:
+        return None
+
+    mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+    if inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
 # ============================================================================
 # Private Helper Functions
 # ============================================================================
@@ -202,71 +473,13 @@ def _get_hitl_log_path(project_dir: Path, spec_slug: str, spec_hash: str) -> Pat
     return state_dir / HITL_LOG_FILE
 
 
-def _collect_checkpoints(
-    log_data: dict[str, list[dict]],
-    predicate: Callable[[dict], bool],
-) -> list[dict]:
-    """Collect checkpoints matching a predicate.
-
-    Args:
-        log_data: Checkpoint log dictionary
-        predicate: Function that returns True for checkpoints to include
-
-    Returns:
-        List of matching checkpoint dicts
-    """
-    return [ckpt_dict for checkpoints in log_data.values() for ckpt_dict in checkpoints if predicate(ckpt_dict)]
-
-
 def _load_checkpoint_log(project_dir: Path, spec_slug: str, spec_hash: str) -> dict[str, list[dict]]:
-    """Load the entire checkpoint log.
+    """Load the entire checkpoint log (snapshot with journal events folded in).
 
     Returns:
         Dictionary mapping issue_iid (or "global") to list of checkpoint dicts
     """
-    log_path = _get_hitl_log_path(project_dir, spec_slug, spec_hash)
-    if not log_path.exists():
-        return {}
-
-    try:
-        with open(log_path, encoding="utf-8") as f:
-            data = json.load(f)
-            # Expect dict format: {issue_iid: [checkpoints]}
-            if not isinstance(data, dict):
-                return {}
-            return data
-    except (json.JSONDecodeError, KeyError, ValueError) as e:
-        # Silently return empty dict to handle corrupted/malformed files gracefully
-        # Uncomment for debugging: import logging; logging.debug(f"Failed to load checkpoint log: {e}")
-        _ = e  # Acknowledge exception variable to satisfy linters
-        return {}
-
-
-def _save_checkpoint_log(project_dir: Path, log_data: dict[str, list[dict]], spec_slug: str, spec_hash: str) -> None:
-    """Save the checkpoint log atomically using temp file + rename pattern.
-
-    This prevents file corruption if the process crashes during write.
-    Uses atomic rename operation to ensure consistency.
-    """
-    log_path = _get_hitl_log_path(project_dir, spec_slug, spec_hash)
-
-    # Write to temporary file in the same directory (required for atomic rename)
-    fd, temp_path = tempfile.mkstemp(dir=log_path.parent, prefix=".hitl_tmp_", suffix=".json", text=True)
-    try:
-        with os.fdopen(fd, "w", encoding="utf-8") as f:
-            json.dump(log_data, f, indent=2)
-            # Ensure all data is written to disk before rename
-            f.flush()
-            os.fsync(f.fileno())
-
-        # Atomic rename - this is the key operation for atomicity
-        # On POSIX systems, rename is atomic even if target exists
-        os.replace(temp_path, log_path)
-    except Exception:
-        # Clean up temp file if anything goes wrong
-        with contextlib.suppress(FileNotFoundError):
-            os.unlink(temp_path)
-        raise
+    return CheckpointJournal(_get_agent_state_dir(project_dir, spec_slug, spec_hash)).load()
 
 
 def _atomic_checkpoint_update(
@@ -275,11 +488,13 @@ def _atomic_checkpoint_update(
     spec_hash: str,
     checkpoint_id: str,
     update_fn: Callable[[dict], None],
+    op: str = "resolve",
 ) -> dict | None:
     """Atomically update a checkpoint in the log.
 
-    This function implements the load-modify-save pattern with proper atomicity
-    by using the atomic save_checkpoint_log function.
+    The changed fields are appended to the checkpoint journal as one event
+    (a single small fsync'd write) instead of rewriting the whole log; the
+    read and the append happen under one journal lock.
 
     Args:
         project_dir: Project directory
@@ -287,22 +502,17 @@ def _atomic_checkpoint_update(
         spec_hash: 8-character base62 hash
         checkpoint_id: Unique checkpoint ID to update
         update_fn: Function that modifies the checkpoint dict in-place
+        op: Journal event op ("resolve" or "complete")
 
     Returns:
         The updated checkpoint dict, or None if not found
     """
-    log_data = _load_checkpoint_log(project_dir, spec_slug, spec_hash)
-
-    # Find and update checkpoint
-    for _issue_key, checkpoints in log_data.items():
-        for ckpt_dict in checkpoints:
-            if ckpt_dict.get("checkpoint_id") == checkpoint_id:
-                # Apply update function
-                update_fn(ckpt_dict)
-
-                # Save atomically (this is the critical operation)
-                _save_checkpoint_log(project_dir, log_data, spec_slug, spec_hash)
-
-                return ckpt_dict
-
-    return None
+    if isinstance(_checkpoint_reader, SqliteStateRepository):
+        # Database transaction, then the JSON log is re-exported for prompts
+        _get_agent_state_dir(project_dir, spec_slug, spec_hash)  # Validates slug/hash
+        return _checkpoint_reader.update_checkpoint(project_dir, spec_slug, spec_hash, checkpoint_id, update_fn)
+
+    # Read, compare and append under the journal lock so concurrent
+    # resolvers never journal fields computed from a stale copy
+    journal = CheckpointJournal(_get_agent_state_dir(project_dir, spec_slug, spec_hash))
+    return journal.update(checkpoint_id, update_fn, op)
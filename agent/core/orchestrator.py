@@ -8,6 +8,8 @@ Includes Human-in-the-Loop (HITL) checkpoint handling (always enabled).
 This is the SLIM orchestrator - delegates to specialized modules:
 - output.py: All formatting and display
 - session_runner.py: SDK session execution
+- client_pool.py: Long-lived SDK client reuse across sessions
+- session_governor.py: Fleet-wide session leases from the daemon (rate limits)
 - checkpoint_handlers.py: Checkpoint-specific logic
 - StateRepository: All state I/O
 """
@@ -20,12 +22,13 @@ from dataclasses import dataclass
 from pathlib import Path
 
 from agent.prompts import get_coding_prompt, get_initializer_prompt, get_mr_creation_prompt
-from common.state import AgentState, FileStateRepository, StateRepository
+from common.state import AgentState, CachingStateRepository, StateRepository, create_state_repository
 from common.types import CheckpointStatus, CheckpointType, SessionType
 
 from .checkpoint_handlers import CheckpointDispatcher, HandlerContext
-from .client import create_client
-from .hitl import resolve_checkpoint
+from .client import get_client_profile
+from .client_pool import DEFAULT_MAX_SESSIONS_PER_CLIENT, ClientPool
+from .hitl import CheckpointLogWatcher, compact_checkpoint_journal, get_checkpoint_log_path, resolve_checkpoint
 from .output import (
     emit_output,
     format_agent_header,
@@ -36,6 +39,7 @@ from .output import (
     format_phase_info,
     format_session_header,
 )
+from .session_governor import SessionGovernor
 from .session_runner import run_agent_session
 
 # Callback types for TUI integration
@@ -44,7 +48,9 @@ ToolCallback = Callable[[str, str, bool], None]
 
 # Configuration
 AUTO_CONTINUE_DELAY_SECONDS = 3
-_HITL_CHECK_INTERVAL_SECONDS = 5
+# Safety re-check while waiting on a checkpoint, in case a change notification
+# is missed (e.g. filesystems where inotify does not fire)
+_HITL_RECHECK_INTERVAL_SECONDS = 60
 
 
 @dataclass
@@ -62,6 +68,7 @@ class AgentConfig:
     skip_puppeteer: bool = False
     skip_test_suite: bool = False
     skip_regression_testing: bool = False
+    max_sessions_per_client: int = DEFAULT_MAX_SESSIONS_PER_CLIENT
 
 
 @dataclass
@@ -162,7 +169,7 @@ async def run_autonomous_agent(
         on_phase: Optional callback for phase changes
         stop_event: Optional event to signal agent should stop
         pause_event: Optional event to control pause/resume
-        state_repo: Optional state repository (defaults to FileStateRepository)
+        state_repo: Optional state repository (defaults to create_state_repository())
         checkpoint_dispatcher: Optional checkpoint dispatcher (defaults to standard)
     """
     # Create config and callback containers
@@ -184,7 +191,7 @@ async def run_autonomous_agent(
 
     # Default dependencies
     if state_repo is None:
-        state_repo = FileStateRepository()
+        state_repo = create_state_repository()
     if checkpoint_dispatcher is None:
         checkpoint_dispatcher = CheckpointDispatcher()
 
@@ -215,7 +222,42 @@ async def _run_agent_loop(
     state_repo: StateRepository,
     checkpoint_dispatcher: CheckpointDispatcher,
 ) -> None:
-    """Run the main agent iteration loop."""
+    """Run the main agent iteration loop.
+
+    A single ClientPool is shared by all iterations so the Claude CLI and its
+    MCP servers are started once and reused across sessions.
+    """
+    governor = SessionGovernor.from_env()
+    try:
+        async with ClientPool(
+            config.project_dir,
+            config.model,
+            max_sessions=config.max_sessions_per_client,
+            spec_slug=config.spec_slug,
+            spec_hash=config.spec_hash,
+        ) as client_pool:
+            await _run_iterations(config, callbacks, events, state_repo, checkpoint_dispatcher, client_pool, governor)
+    finally:
+        await governor.close()
+
+    # Final summary
+    state = state_repo.load(config.project_dir, config.spec_slug, config.spec_hash)
+    print(format_final_summary(config.project_dir, state.milestone, state.file_only_mode))
+    if isinstance(state_repo, CachingStateRepository):
+        stats = state_repo.cache_stats()
+        print(f"State cache: {stats['hits']} hits, {stats['misses']} misses (file parses)")
+
+
+async def _run_iterations(
+    config: AgentConfig,
+    callbacks: AgentCallbacks,
+    events: AgentEvents,
+    state_repo: StateRepository,
+    checkpoint_dispatcher: CheckpointDispatcher,
+    client_pool: ClientPool,
+    governor: SessionGovernor,
+) -> None:
+    """Run agent iterations until stopped, completed, or out of iterations."""
     iteration = 0
 
     while True:
@@ -256,24 +298,48 @@ async def _run_agent_loop(
         if callbacks.on_phase:
             callbacks.on_phase(session_type, iteration)
 
+        # Only start the MCP servers/tools this phase and mode need
+        profile = get_client_profile(
+            session_type, file_only_mode=config.file_only_mode, skip_puppeteer=config.skip_puppeteer
+        )
+
         # Print session header and run
-        print(format_session_header(iteration, session_type == SessionType.INITIALIZER))
+        print(format_session_header(iteration, session_type == SessionType.INITIALIZER, profile.summary()))
 
-        client = create_client(config.project_dir, config.model)
         prompt = _get_session_prompt(session_type, config)
 
+        # Prompts read the checkpoint log file directly: fold journaled resolutions in first
+        await asyncio.to_thread(compact_checkpoint_journal, config.project_dir, config.spec_slug, config.spec_hash)
+
+        # Fleet-wide admission first: a rate-limit cooldown shared with other agents is
+        # waited out without holding a connected client, and ends early on stop
+        lease_id = await governor.acquire(events.stop_event)
+        if lease_id is None and await _check_stop_pause(events, callbacks):
+            break
+
         status = "error"  # Default, will be overwritten
-        async with client:
-            status, _ = await run_agent_session(client, prompt, callbacks.on_output, callbacks.on_tool)
+        response_text = ""
+        backoff = 0.0
+        try:
+            try:
+                client = await client_pool.acquire(profile)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                response_text = f"Error starting Claude client: {e}"
+                emit_output(callbacks.on_output, response_text + "\n")
+            else:
+                try:
+                    status, response_text = await run_agent_session(
+                        client, prompt, callbacks.on_output, callbacks.on_tool
+                    )
+                finally:
+                    await client_pool.release(client, healthy=status != "error")
+        finally:
+            backoff = await governor.release(lease_id, status, response_text)
 
         # Handle result
-        if await _handle_session_result(status, config, events, callbacks):
+        if await _handle_session_result(status, config, events, callbacks, backoff):
             break
 
-    # Final summary
-    state = state_repo.load(config.project_dir, config.spec_slug, config.spec_hash)
-    print(format_final_summary(config.project_dir, state.milestone, state.file_only_mode))
-
 
 async def _check_stop_pause(events: AgentEvents, callbacks: AgentCallbacks) -> bool:
     """Check for stop/pause signals. Returns True if should stop."""
@@ -327,22 +393,27 @@ async def _handle_pending_checkpoint(
 
 
 async def _wait_for_approval(config: AgentConfig, state_repo: StateRepository) -> bool:
-    """Wait for checkpoint approval. Returns True if approved, False if rejected."""
-    while True:
-        checkpoint = state_repo.load_pending_checkpoint(config.project_dir, config.spec_slug, config.spec_hash)
+    """Wait for checkpoint approval. Returns True if approved, False if rejected.
 
-        if checkpoint is None:
-            return True
+    Sleeps until the checkpoint log changes and only re-reads it then.
+    """
+    log_path = get_checkpoint_log_path(config.project_dir, config.spec_slug, config.spec_hash)
+    async with CheckpointLogWatcher(log_path) as watcher:
+        while True:
+            checkpoint = state_repo.load_pending_checkpoint(config.project_dir, config.spec_slug, config.spec_hash)
 
-        match checkpoint.status:
-            case CheckpointStatus.APPROVED | CheckpointStatus.MODIFIED | CheckpointStatus.SKIPPED:
-                print(f"\n[HITL] Checkpoint {checkpoint.status.value}")
+            if checkpoint is None:
                 return True
-            case CheckpointStatus.REJECTED:
-                print("\n[HITL] Checkpoint REJECTED")
-                return False
-            case _:
-                await asyncio.sleep(_HITL_CHECK_INTERVAL_SECONDS)
+
+            match checkpoint.status:
+                case CheckpointStatus.APPROVED | CheckpointStatus.MODIFIED | CheckpointStatus.SKIPPED:
+                    print(f"\n[HITL] Checkpoint {checkpoint.status.value}")
+                    return True
+                case CheckpointStatus.REJECTED:
+                    print("\n[HITL] Checkpoint REJECTED")
+                    return False
+                case _:
+                    await watcher.wait_for_change(timeout=_HITL_RECHECK_INTERVAL_SECONDS)
 
 
 async def _handle_session_result(
@@ -350,8 +421,18 @@ async def _handle_session_result(
     config: AgentConfig,
     events: AgentEvents,
     callbacks: AgentCallbacks,
+    backoff: float = 0.0,
 ) -> bool:
-    """Handle session result. Returns True if should stop."""
+    """Handle session result. Returns True if should stop.
+
+    backoff is an extra wait after a rate limit when no daemon governor
+    paces the next session.
+    """
+    if backoff > 0:
+        print(f"\nRate limited, backing off {backoff:.0f}s...")
+        if await _wait_with_stop_check(events.stop_event, backoff, callbacks.on_output):
+            return True
+
     if status == "continue":
         print(f"\nAgent will auto-continue in {AUTO_CONTINUE_DELAY_SECONDS}s...")
         if await _wait_with_stop_check(events.stop_event, AUTO_CONTINUE_DELAY_SECONDS, callbacks.on_output):
@@ -58,10 +58,19 @@ def format_agent_header(
     return "\n".join(lines)
 
 
-def format_session_header(session_num: int, is_initializer: bool) -> str:
-    """Format a session header."""
+def format_session_header(session_num: int, is_initializer: bool, profile_summary: str | None = None) -> str:
+    """Format a session header.
+
+    Args:
+        session_num: Iteration number
+        is_initializer: Whether this is the initializer session
+        profile_summary: Optional client profile line (MCP servers/tools in use)
+    """
     session_type = "INITIALIZER" if is_initializer else "CODING AGENT"
-    return f"\n{SEPARATOR_HEAVY}\n  SESSION {session_num}: {session_type}\n{SEPARATOR_HEAVY}\n"
+    header = f"\n{SEPARATOR_HEAVY}\n  SESSION {session_num}: {session_type}\n"
+    if profile_summary:
+        header += f"  {profile_summary}\n"
+    return f"{header}{SEPARATOR_HEAVY}\n"
 
 
 def format_phase_info(session_type: SessionType, state: AgentState | None) -> str:
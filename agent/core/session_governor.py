@@ -0,0 +1,177 @@
+"""
+Session Governor Client
+=======================
+
+Agent-side half of the daemon's session rate governor (see
+agent/daemon/governor.py): before each SDK session the orchestrator asks
+the daemon for a lease, and reports the session outcome when returning it,
+so the whole fleet backs off together after a rate limit instead of every
+agent retrying on its own timer.
+
+Only active when the agent runs under the daemon (HARNESS_AGENT_ID is set
+and the socket answers). Otherwise, and if the daemon goes away, sessions
+start without a lease and rate limits fall back to a local backoff.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import os
+import re
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from agent.daemon.client import DaemonClient
+
+logger = logging.getLogger(__name__)
+
+# Set by the daemon in each agent process's environment
+AGENT_ID_ENV = "HARNESS_AGENT_ID"
+
+# Local backoff (no daemon) after a rate limit without a retry-after hint
+LOCAL_BACKOFF_BASE_SECONDS = 15.0
+LOCAL_BACKOFF_MAX_SECONDS = 300.0
+
+# Error text that indicates an API rate limit or overload (429 / 529)
+_RATE_LIMIT_PATTERN = re.compile(r"\b(429|529)\b|rate[ _-]?limit|overloaded|too many requests", re.IGNORECASE)
+_RETRY_AFTER_PATTERN = re.compile(r"retry[ _-]?after\D{0,5}(\d+(?:\.\d+)?)", re.IGNORECASE)
+
+
+def classify_session_error(error_text: str) -> tuple[bool, float | None]:
+    """Check whether a session error was a rate limit and extract a retry-after hint.
+
+    Args:
+        error_text: Error message of a failed session
+
+    Returns:
+        Tuple of (is_rate_limited, retry_after_seconds or None)
+    """
+    if not _RATE_LIMIT_PATTERN.search(error_text):
+        return False, None
+    match = _RETRY_AFTER_PATTERN.search(error_text)
+    return True, float(match.group(1)) if match else None
+
+
+class SessionGovernor:
+    """Acquires and releases daemon session leases for one agent process."""
+
+    def __init__(self, agent_id: str | None) -> None:
+        """Initialize the governor client.
+
+        Args:
+            agent_id: Daemon agent ID, or None to disable (standalone runs)
+        """
+        self._agent_id = agent_id
+        self._client: DaemonClient | None = None
+        self._local_backoff = 0.0
+
+    @classmethod
+    def from_env(cls) -> SessionGovernor:
+        """Create a governor client for the agent ID the daemon passed in the environment."""
+        return cls(os.environ.get(AGENT_ID_ENV) or None)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether leases are requested from the daemon."""
+        return self._agent_id is not None
+
+    async def acquire(self, stop_event: asyncio.Event | None = None) -> str | None:
+        """Wait until the daemon grants a session lease.
+
+        Args:
+            stop_event: Stop waiting once set (the agent was stopped during a cooldown)
+
+        Returns:
+            Lease ID, or None when running without the daemon or stopped
+        """
+        if self._agent_id is None:
+            return None
+        # Imported here: agent.daemon imports agent.core modules at package import
+        from agent.daemon.client import DaemonClient, DaemonError
+
+        if self._client is None:
+            self._client = DaemonClient()
+        waited = False
+        try:
+            while True:
+                result = await self._wait_for_slot(self._client, stop_event)
+                if result is None:
+                    return None
+                if result["lease_id"]:
+                    return result["lease_id"]
+                if not waited:
+                    print(
+                        f"\n[Governor] Waiting for a session slot "
+                        f"(rate-limit cooldown {result['cooldown_seconds']:.0f}s)...",
+                        flush=True,
+                    )
+                    waited = True
+        except DaemonError as e:
+            logger.warning("Session governor unavailable, continuing without it: %s", e)
+            self._agent_id = None
+            return None
+
+    async def _wait_for_slot(self, client: DaemonClient, stop_event: asyncio.Event | None) -> dict[str, Any] | None:
+        """One acquire_session request, abandoned if stop_event is set first (None then)."""
+        assert self._agent_id is not None
+        if stop_event is None:
+            return await client.acquire_session(self._agent_id)
+        if stop_event.is_set():
+            return None
+        request = asyncio.ensure_future(client.acquire_session(self._agent_id))
+        stopped = asyncio.ensure_future(stop_event.wait())
+        try:
+            await asyncio.wait({request, stopped}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stopped.cancel()
+        if not request.done():
+            # A lease granted after all is returned when the daemon sees the agent exit
+            request.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await request
+            return None
+        return request.result()
+
+    async def release(self, lease_id: str | None, status: str, response_text: str) -> float:
+        """Report a session's outcome and return its lease.
+
+        Args:
+            lease_id: Lease from acquire() (None if running without the daemon)
+            status: Session status from run_agent_session ("continue"/"error")
+            response_text: Response text, or the error message for "error"
+
+        Returns:
+            Seconds to wait locally before the next session (only non-zero
+            after a rate limit when running without the daemon, which
+            otherwise paces the next acquire())
+        """
+        rate_limited, retry_after = (False, None) if status != "error" else classify_session_error(response_text)
+        if not rate_limited:
+            self._local_backoff = 0.0
+        outcome = "rate_limited" if rate_limited else ("ok" if status != "error" else "error")
+
+        if lease_id is not None and self._client is not None:
+            from agent.daemon.client import DaemonError
+
+            try:
+                await self._client.release_session(lease_id, outcome, retry_after)
+                return 0.0
+            except DaemonError as e:
+                logger.warning("Failed to release session lease: %s", e)
+
+        if not rate_limited:
+            return 0.0
+        if retry_after is not None:
+            return retry_after
+        self._local_backoff = min(
+            self._local_backoff * 2 if self._local_backoff else LOCAL_BACKOFF_BASE_SECONDS, LOCAL_BACKOFF_MAX_SECONDS
+        )
+        return self._local_backoff
+
+    async def close(self) -> None:
+        """Close the daemon connection."""
+        if self._client is not None:
+            await self._client.disconnect()
+            self._client = None
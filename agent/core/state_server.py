@@ -0,0 +1,356 @@
+"""
+Harness State MCP Server
+========================
+
+In-process MCP server ("harness") that gives the agent typed access to its
+local state instead of reading and rewriting whole JSON files with the
+Read/Write/Edit tools.
+
+Tools:
+- create_checkpoint: Create a pending HITL checkpoint
+- get_pending_checkpoint: Most recent checkpoint not yet completed
+- complete_checkpoint: Mark a checkpoint completed after acting on it
+- list_checkpoints: Checkpoint history filtered by type/issue/completion
+- list_issues: Filtered, compact view of .file_issues.json (file-only mode)
+- create_issue: Add a new issue, e.g. a bug found while working (file-only mode)
+- update_issue: Change state/labels/assignee of one issue (file-only mode)
+
+Checkpoint tools go through the hitl write paths and the configured
+StateRepository, so they use the checkpoint journal or SQLite backend.
+The server runs inside the agent process (no subprocess to spawn), on the
+SDK's event loop, so the file I/O of every tool runs in a worker thread.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import os
+import tempfile
+import threading
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from claude_agent_sdk import create_sdk_mcp_server, tool
+
+from common.types import CheckpointStatus, CheckpointType
+
+from . import hitl
+
+SERVER_NAME = "harness"
+SERVER_VERSION = "1.0.0"
+
+FILE_ISSUES_FILE = ".file_issues.json"
+
+# Fields returned by list_issues unless include_description is set
+_ISSUE_SUMMARY_FIELDS = ("iid", "title", "state", "labels", "assignee", "updated_at")
+
+# Checkpoint statuses that allow an issue to be closed
+_CLOSURE_APPROVED = (CheckpointStatus.APPROVED.value, CheckpointStatus.MODIFIED.value)
+
+
+def create_harness_state_server(project_dir: Path, spec_slug: str, spec_hash: str) -> Any:
+    """Create the in-process harness state MCP server for one spec.
+
+    Args:
+        project_dir: Project directory
+        spec_slug: Spec slug identifier
+        spec_hash: 8-character base62 hash
+
+    Returns:
+        SDK MCP server config for ClaudeAgentOptions.mcp_servers
+    """
+    agent_dir = project_dir / hitl.AGENT_STATE_DIR / f"{spec_slug}-{spec_hash}"
+    issues_path = agent_dir / FILE_ISSUES_FILE
+    issues_lock = threading.Lock()  # Serializes read-modify-write of the issues file
+
+    @tool(
+        "create_checkpoint",
+        "Create a pending HITL checkpoint for human review. Returns the checkpoint_id.",
+        {
+            "type": "object",
+            "properties": {
+                "checkpoint_type": {"type": "string", "enum": [t.value for t in CheckpointType]},
+                "context": {"type": "object", "description": "Checkpoint-specific data for the reviewer"},
+                "issue_iid": {"type": "string", "description": "Issue IID, omit for global checkpoints"},
+            },
+            "required": ["checkpoint_type", "context"],
+        },
+    )
+    async def create_checkpoint(args: dict[str, Any]) -> dict[str, Any]:
+        try:
+            checkpoint_type = CheckpointType(args["checkpoint_type"])
+        except (KeyError, ValueError):
+            return _error(f"Unknown checkpoint_type: {args.get('checkpoint_type')!r}")
+        issue_iid = args.get("issue_iid")
+        checkpoint = await asyncio.to_thread(
+            hitl.create_checkpoint,
+            project_dir,
+            checkpoint_type,
+            spec_slug,
+            spec_hash,
+            context=args.get("context") or {},
+            issue_iid=str(issue_iid) if issue_iid not in (None, "") else None,
+        )
+        return _result({"checkpoint_id": checkpoint.checkpoint_id, "status": checkpoint.status.value})
+
+    @tool(
+        "get_pending_checkpoint",
+        "Get the most recent checkpoint that is not completed (status, human_decision, human_notes, "
+        "modifications, context). Returns null if there is none.",
+        {"type": "object", "properties": {}},
+    )
+    async def get_pending_checkpoint(args: dict[str, Any]) -> dict[str, Any]:
+        checkpoint = await asyncio.to_thread(hitl.load_pending_checkpoint, project_dir, spec_slug, spec_hash)
+        return _result(checkpoint.to_dict() if checkpoint else None)
+
+    @tool(
+        "complete_checkpoint",
+        "Mark a checkpoint as completed after acting on the human decision.",
+        {
+            "type": "object",
+            "properties": {"checkpoint_id": {"type": "string"}},
+            "required": ["checkpoint_id"],
+        },
+    )
+    async def complete_checkpoint(args: dict[str, Any]) -> dict[str, Any]:
+        checkpoint = await asyncio.to_thread(
+            hitl.complete_checkpoint, project_dir, spec_slug, spec_hash, str(args.get("checkpoint_id", ""))
+        )
+        if checkpoint is None:
+            return _error(f"No checkpoint with id {args.get('checkpoint_id')!r}")
+        return _result({"checkpoint_id": checkpoint.checkpoint_id, "completed": True})
+
+    @tool(
+        "list_checkpoints",
+        "List checkpoints (oldest first), optionally filtered by checkpoint_type, issue_iid and completed.",
+        {
+            "type": "object",
+            "properties": {
+                "checkpoint_type": {"type": "string", "enum": [t.value for t in CheckpointType]},
+                "issue_iid": {"type": "string"},
+                "completed": {"type": "boolean"},
+            },
+        },
+    )
+    async def list_checkpoints(args: dict[str, Any]) -> dict[str, Any]:
+        log = await asyncio.to_thread(hitl.load_checkpoint_log, project_dir, spec_slug, spec_hash)
+        matches = [
+            ckpt
+            for checkpoints in log.values()
+            for ckpt in checkpoints
+            if isinstance(ckpt, dict) and _checkpoint_matches(ckpt, args)
+        ]
+        matches.sort(key=lambda ckpt: str(ckpt.get("created_at", "")))
+        return _result({"count": len(matches), "checkpoints": matches})
+
+    @tool(
+        "list_issues",
+        "List local issues (file-only mode). All filters are optional and combined with AND. "
+        "Descriptions are only included when include_description is true.",
+        {
+            "type": "object",
+            "properties": {
+                "state": {"type": "string", "enum": ["opened", "closed"]},
+                "labels": {"type": "array", "items": {"type": "string"}, "description": "Issue must have all"},
+                "exclude_labels": {"type": "array", "items": {"type": "string"}},
+                "assignee": {"type": ["string", "null"], "description": "null matches unassigned issues"},
+                "iid": {"type": "integer"},
+                "include_description": {"type": "boolean"},
+            },
+        },
+    )
+    async def list_issues(args: dict[str, Any]) -> dict[str, Any]:
+        issues = await asyncio.to_thread(_load_issues, issues_path)
+        if issues is None:
+            return _error(f"{FILE_ISSUES_FILE} does not exist or is not a JSON array")
+        matches = [issue for issue in issues if _issue_matches(issue, args)]
+        if not args.get("include_description"):
+            matches = [{key: issue.get(key) for key in _ISSUE_SUMMARY_FIELDS} for issue in matches]
+        return _result({"count": len(matches), "issues": matches})
+
+    @tool(
+        "create_issue",
+        "Create a local issue (file-only mode), e.g. a bug found while working. Returns the new issue's iid.",
+        {
+            "type": "object",
+            "properties": {
+                "title": {"type": "string"},
+                "description": {"type": "string"},
+                "labels": {"type": "array", "items": {"type": "string"}},
+            },
+            "required": ["title"],
+        },
+    )
+    async def create_issue(args: dict[str, Any]) -> dict[str, Any]:
+        if not str(args.get("title") or "").strip():
+            return _error("title must not be empty")
+        return await asyncio.to_thread(_create_issue, args)
+
+    def _create_issue(args: dict[str, Any]) -> dict[str, Any]:
+        """create_issue body (worker thread)."""
+        with issues_lock:
+            issues = _load_issues(issues_path) if issues_path.exists() else []
+            if issues is None:
+                return _error(f"{FILE_ISSUES_FILE} is not a JSON array")
+            now = datetime.now(UTC).isoformat()
+            issue = {
+                "id": max((i["id"] for i in issues if isinstance(i.get("id"), int)), default=0) + 1,
+                "iid": max((i["iid"] for i in issues if isinstance(i.get("iid"), int)), default=0) + 1,
+                "title": args["title"],
+                "description": args.get("description") or "",
+                "labels": list(dict.fromkeys(args.get("labels") or [])),
+                "state": "opened",
+                "assignee": None,
+                "created_at": now,
+                "updated_at": now,
+            }
+            milestone_id = next((i["milestone_id"] for i in issues if "milestone_id" in i), None)
+            if milestone_id is not None:
+                issue["milestone_id"] = milestone_id
+            issues.append(issue)
+
+            issues_path.parent.mkdir(parents=True, exist_ok=True)
+            _save_issues(issues_path, issues)
+            return _result({key: issue.get(key) for key in _ISSUE_SUMMARY_FIELDS})
+
+    @tool(
+        "update_issue",
+        "Update one local issue (file-only mode). Closing requires an approved issue_closure checkpoint.",
+        {
+            "type": "object",
+            "properties": {
+                "iid": {"type": "integer"},
+                "state": {"type": "string", "enum": ["opened", "closed"]},
+                "add_labels": {"type": "array", "items": {"type": "string"}},
+                "remove_labels": {"type": "array", "items": {"type": "string"}},
+                "assignee": {"type": ["string", "null"]},
+                "title": {"type": "string"},
+                "description": {"type": "string"},
+            },
+            "required": ["iid"],
+        },
+    )
+    async def update_issue(args: dict[str, Any]) -> dict[str, Any]:
+        return await asyncio.to_thread(_update_issue, args)
+
+    def _update_issue(args: dict[str, Any]) -> dict[str, Any]:
+        """update_issue body (worker thread)."""
+        with issues_lock:
+            issues = _load_issues(issues_path)
+            if issues is None:
+                return _error(f"{FILE_ISSUES_FILE} does not exist or is not a JSON array")
+            iid = args.get("iid")
+            issue = next((issue for issue in issues if issue.get("iid") == iid), None)
+            if issue is None:
+                return _error(f"No issue with iid {iid}")
+
+            if args.get("state") == "closed" and issue.get("state") != "closed" and not _closure_approved(iid):
+                return _error(f"Issue {iid} has no approved issue_closure checkpoint; create one and wait for approval")
+
+            for key in ("state", "title", "description", "assignee"):
+                if key in args:
+                    issue[key] = args[key]
+            labels = [label for label in issue.get("labels", []) if label not in (args.get("remove_labels") or [])]
+            labels.extend(label for label in args.get("add_labels") or [] if label not in labels)
+            issue["labels"] = labels
+            issue["updated_at"] = datetime.now(UTC).isoformat()
+
+            _save_issues(issues_path, issues)
+            return _result({key: issue.get(key) for key in _ISSUE_SUMMARY_FIELDS})
+
+    def _closure_approved(iid: Any) -> bool:
+        """Check whether the latest issue_closure checkpoint for an issue was approved."""
+        closures = [
+            ckpt
+            for checkpoints in hitl.load_checkpoint_log(project_dir, spec_slug, spec_hash).values()
+            for ckpt in checkpoints
+            if isinstance(ckpt, dict)
+            and ckpt.get("checkpoint_type") == CheckpointType.ISSUE_CLOSURE.value
+            and str(ckpt.get("issue_iid") or (ckpt.get("context") or {}).get("issue_iid")) == str(iid)
+        ]
+        if not closures:
+            return False
+        latest = max(closures, key=lambda ckpt: str(ckpt.get("created_at", "")))
+        return latest.get("status") in _CLOSURE_APPROVED
+
+    return create_sdk_mcp_server(
+        name=SERVER_NAME,
+        version=SERVER_VERSION,
+        tools=[
+            create_checkpoint,
+            get_pending_checkpoint,
+            complete_checkpoint,
+            list_checkpoints,
+            list_issues,
+            create_issue,
+            update_issue,
+        ],
+    )
+
+
+# ============================================================================
+# Private Helper Functions
+# ============================================================================
+
+
+def _result(data: Any) -> dict[str, Any]:
+    """Wrap a JSON-serializable value as an MCP text result."""
+    return {"content": [{"type": "text", "text": json.dumps(data, indent=1, default=str)}]}
+
+
+def _error(message: str) -> dict[str, Any]:
+    """Build an MCP error result."""
+    return {"content": [{"type": "text", "text": f"Error: {message}"}], "is_error": True}
+
+
+def _checkpoint_matches(ckpt: dict[str, Any], filters: dict[str, Any]) -> bool:
+    """Check a checkpoint dict against list_checkpoints filters."""
+    if "checkpoint_type" in filters and ckpt.get("checkpoint_type") != filters["checkpoint_type"]:
+        return False
+    if "issue_iid" in filters and str(ckpt.get("issue_iid")) != str(filters["issue_iid"]):
+        return False
+    return "completed" not in filters or bool(ckpt.get("completed", False)) == filters["completed"]
+
+
+def _issue_matches(issue: dict[str, Any], filters: dict[str, Any]) -> bool:
+    """Check an issue against list_issues filters."""
+    if "iid" in filters and issue.get("iid") != filters["iid"]:
+        return False
+    if "state" in filters and issue.get("state") != filters["state"]:
+        return False
+    if "assignee" in filters and issue.get("assignee") != filters["assignee"]:
+        return False
+    labels = set(issue.get("labels") or [])
+    if not set(filters.get("labels") or []).issubset(labels):
+        return False
+    return not labels.intersection(filters.get("exclude_labels") or [])
+
+
+def _load_issues(path: Path) -> list[dict[str, Any]] | None:
+    """Read the issues array, None if missing or invalid."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return None
+    if not isinstance(data, list):
+        return None
+    return [issue for issue in data if isinstance(issue, dict)]
+
+
+def _save_issues(path: Path, issues: list[dict[str, Any]]) -> None:
+    """Write the issues array atomically (temp file + rename)."""
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=".issues_tmp_", suffix=".json", text=True)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(issues, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except Exception:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(temp_path)
+        raise
@@ -1,12 +1,18 @@
 """Agent daemon - background process management for agents."""
 
-from .client import DaemonClient, DaemonError, DaemonNotRunningError
+from .client import DaemonClient, DaemonError, DaemonEventOverflowError, DaemonNotRunningError
+from .events import EventType
+from .logrotate import LogReader, read_log_tail
 from .server import SOCKET_PATH, AgentDaemon
 
 __all__ = [
     "AgentDaemon",
     "DaemonClient",
     "DaemonError",
+    "DaemonEventOverflowError",
     "DaemonNotRunningError",
+    "EventType",
+    "LogReader",
     "SOCKET_PATH",
+    "read_log_tail",
 ]
@@ -0,0 +1,139 @@
+"""
+Agent Resource Accounting
+=========================
+
+Periodic CPU, memory and I/O sampling of each running agent's whole process
+tree (the agent, its Claude CLI, MCP servers, dev servers it started, ...)
+from /proc, so operators can spot a runaway agent.
+
+Every HARNESS_ACCOUNTING_INTERVAL seconds (default 10, 0 disables) one
+scan of /proc yields a sample per agent:
+- cpu_seconds: CPU time of the processes in the tree now (drops when a
+  busy child exits), cpu_percent: CPU use since the previous sample
+  (100 = one core),
+- rss_kb / pss_kb: resident memory (PSS splits shared pages),
+- read_bytes / write_bytes: storage I/O of the processes in the tree,
+- children: number of descendant processes.
+
+The last RESOURCE_HISTORY samples per agent are kept in a ring buffer.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from collections.abc import Callable
+from datetime import UTC, datetime
+from typing import Any
+
+from .procfs import read_process_table, sample_process_tree
+
+logger = logging.getLogger(__name__)
+
+ACCOUNTING_INTERVAL_ENV = "HARNESS_ACCOUNTING_INTERVAL"
+DEFAULT_ACCOUNTING_INTERVAL = 10.0
+
+# Samples kept per agent (10 minutes at the default interval)
+RESOURCE_HISTORY = 60
+
+
+class ResourceAccountant:
+    """Samples agent process trees and keeps a short history per agent."""
+
+    def __init__(
+        self, running_pids: Callable[[], dict[str, int]], interval: float = DEFAULT_ACCOUNTING_INTERVAL
+    ) -> None:
+        """Initialize the accountant.
+
+        Args:
+            running_pids: Returns agent_id -> PID of every running agent
+            interval: Seconds between samples (0 disables sampling)
+        """
+        self.interval = interval
+        self._running_pids = running_pids
+        self._history: dict[str, deque[dict[str, Any]]] = {}
+        self._cpu_marks: dict[str, tuple[int, float, float]] = {}  # agent_id -> (pid, cpu_seconds, monotonic)
+        self._task: asyncio.Task[None] | None = None
+
+    @classmethod
+    def from_env(cls, running_pids: Callable[[], dict[str, int]]) -> ResourceAccountant:
+        """Create an accountant with the sampling interval from the environment."""
+        try:
+            interval = max(float(os.environ.get(ACCOUNTING_INTERVAL_ENV, DEFAULT_ACCOUNTING_INTERVAL)), 0.0)
+        except ValueError:
+            interval = DEFAULT_ACCOUNTING_INTERVAL
+        return cls(running_pids, interval)
+
+    def start(self) -> None:
+        """Start periodic sampling."""
+        if self.interval and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        """Stop periodic sampling."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def latest(self, agent_id: str) -> dict[str, Any] | None:
+        """Return an agent's most recent sample, None if there is none."""
+        history = self._history.get(agent_id)
+        return history[-1] if history else None
+
+    def history(self, agent_id: str) -> list[dict[str, Any]]:
+        """Return an agent's samples, oldest first."""
+        return list(self._history.get(agent_id, ()))
+
+    def forget(self, agent_id: str) -> None:
+        """Drop an agent's samples (agent removed)."""
+        self._history.pop(agent_id, None)
+        self._cpu_marks.pop(agent_id, None)
+
+    async def sample(self) -> None:
+        """Take one sample of every running agent."""
+        pids = self._running_pids()
+        if not pids:
+            return
+        # Scanning /proc is blocking file I/O: keep it off the event loop
+        samples = await asyncio.to_thread(_sample_trees, pids)
+        now = time.monotonic()
+        at = datetime.now(UTC).isoformat()
+        for agent_id, sample in samples.items():
+            pid = pids[agent_id]
+            previous = self._cpu_marks.get(agent_id)
+            cpu_percent = None
+            if previous and previous[0] == pid and now > previous[2]:
+                cpu_percent = round(max(sample["cpu_seconds"] - previous[1], 0.0) / (now - previous[2]) * 100, 1)
+            self._cpu_marks[agent_id] = (pid, sample["cpu_seconds"], now)
+            history = self._history.setdefault(agent_id, deque(maxlen=RESOURCE_HISTORY))
+            history.append({"at": at, "pid": pid, "cpu_percent": cpu_percent, **sample})
+
+    async def _run(self) -> None:
+        """Sample every interval until stopped."""
+        while True:
+            try:
+                await self.sample()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.warning("Resource sampling failed: %s", e)
+            await asyncio.sleep(self.interval)
+
+
+# ============================================================================
+# Private Helper Functions
+# ============================================================================
+
+
+def _sample_trees(pids: dict[str, int]) -> dict[str, dict[str, Any]]:
+    """Sample the process tree of each agent from one /proc scan."""
+    table = read_process_table()
+    samples = {}
+    for agent_id, pid in pids.items():
+        sample = sample_process_tree(pid, table)
+        if sample is not None:
+            samples[agent_id] = sample
+    return samples
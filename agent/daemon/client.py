@@ -3,19 +3,50 @@ Agent Daemon Client
 ====================
 
 Client for TUI to communicate with the agent daemon via Unix socket.
-Provides async methods for starting, stopping, and monitoring agents.
+Provides async methods for starting, stopping, and monitoring agents, and
+async iterators over an agent's log output (subscribe_logs) and daemon
+events (subscribe_events).
+
+Commands share one connection and may be awaited concurrently: each request
+gets an "id", a reader task matches responses to their requests, so a slow
+stop does not hold up list or status calls.
+
+While the daemon is upgraded (see upgrade.py) commands and streams move
+to the new daemon transparently: a command the old daemon did not take is
+resent, and log streams resume from the last offset received.
+
+DaemonClient(address="host:port") talks to a daemon listening on TCP
+instead; every TCP connection starts with an auth command carrying the
+shared token (HARNESS_DAEMON_TOKEN unless given).
 """
 
 from __future__ import annotations
 
 import asyncio
 import contextlib
+import itertools
 import json
+import os
+from collections.abc import AsyncIterator
 from pathlib import Path
 from typing import Any
 
 # Must match daemon.py
-SOCKET_PATH = Path("/tmp/coding-harness-daemon.sock")
+SOCKET_ENV = "HARNESS_DAEMON_SOCKET"
+SOCKET_PATH = Path(os.environ.get(SOCKET_ENV, "/tmp/coding-harness-daemon.sock"))
+
+# Shared secret of daemons listening on TCP
+DAEMON_TOKEN_ENV = "HARNESS_DAEMON_TOKEN"
+
+# Line limit for streams (a 64 KiB log chunk grows when JSON-escaped)
+_STREAM_LIMIT_BYTES = 1024 * 1024
+
+# Seconds to wait for the response to a command
+_RESPONSE_TIMEOUT = 30.0
+
+# Retries (and seconds between them) of a command or stream while the daemon is upgraded
+_RECONNECT_ATTEMPTS = 100
+_RECONNECT_DELAY = 0.2
 
 
 class DaemonError(Exception):
@@ -26,13 +57,29 @@ class DaemonNotRunningError(DaemonError):
     """Daemon is not running."""
 
 
+class DaemonEventOverflowError(DaemonError):
+    """Event subscriber fell too far behind and was dropped by the daemon."""
+
+
 class DaemonClient:
     """Async client for communicating with the agent daemon."""
 
-    def __init__(self) -> None:
+    def __init__(self, address: str | None = None, token: str | None = None) -> None:
+        """Initialize the client.
+
+        Args:
+            address: "host:port" of a daemon listening on TCP, None for the
+                local Unix socket
+            token: Auth token for TCP (default: HARNESS_DAEMON_TOKEN)
+        """
+        self.address = address
+        self._token = token if token is not None else os.environ.get(DAEMON_TOKEN_ENV, "")
         self._reader: asyncio.StreamReader | None = None
         self._writer: asyncio.StreamWriter | None = None
-        self._lock = asyncio.Lock()
+        self._lock = asyncio.Lock()  # Serializes connect and request writes
+        self._request_ids = itertools.count(1)
+        self._pending: dict[int, asyncio.Future[dict[str, Any]]] = {}
+        self._reader_task: asyncio.Task[None] | None = None
 
     async def __aenter__(self) -> DaemonClient:
         """Enter async context manager."""
@@ -44,54 +91,153 @@ class DaemonClient:
         await self.disconnect()
 
     async def connect(self) -> None:
-        """Connect to the daemon."""
-        if not SOCKET_PATH.exists():
-            raise DaemonNotRunningError(f"Daemon socket not found: {SOCKET_PATH}")
-
-        try:
-            self._reader, self._writer = await asyncio.open_unix_connection(str(SOCKET_PATH))
-        except (ConnectionRefusedError, FileNotFoundError) as e:
-            raise DaemonNotRunningError(f"Cannot connect to daemon: {e}") from e
-
-    async def disconnect(self) -> None:
-        """Disconnect from the daemon."""
+        """Connect to the daemon (no-op if already connected)."""
         if self._writer:
-            self._writer.close()
-            await self._writer.wait_closed()
-        self._reader = None
-        self._writer = None
+            return
+        self._reader, self._writer = await self._open_connection()
+        self._reader_task = asyncio.create_task(self._read_responses(self._reader, self._writer))
 
-    async def _send_command(self, command: dict[str, Any]) -> dict[str, Any]:
-        """Send a command to the daemon and return the response."""
-        async with self._lock:
-            if not self._reader or not self._writer:
-                await self.connect()
+    async def disconnect(self) -> None:
+        """Disconnect from the daemon, failing any commands still awaiting a response."""
+        writer = self._writer
+        self._reset_connection(DaemonError("Disconnected from daemon"))
+        if writer:
+            with contextlib.suppress(ConnectionResetError, BrokenPipeError):
+                await writer.wait_closed()
 
-            if not self._reader or not self._writer:
-                raise DaemonNotRunningError("Not connected to daemon")
+    async def _open_connection(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """Open a connection to the daemon, authenticating over TCP.
 
+        Raises:
+            DaemonNotRunningError: If the daemon cannot be reached
+            DaemonError: If the daemon refuses the token
+        """
+        if self.address is None:
+            if not SOCKET_PATH.exists():
+                raise DaemonNotRunningError(f"Daemon socket not found: {SOCKET_PATH}")
             try:
-                # Send command
-                self._writer.write(json.dumps(command).encode() + b"\n")
-                await self._writer.drain()
+                return await asyncio.open_unix_connection(str(SOCKET_PATH), limit=_STREAM_LIMIT_BYTES)
+            except (ConnectionRefusedError, FileNotFoundError) as e:
+                raise DaemonNotRunningError(f"Cannot connect to daemon: {e}") from e
 
-                # Read response with timeout to prevent indefinite blocking
-                try:
-                    data = await asyncio.wait_for(self._reader.readline(), timeout=30.0)
-                except TimeoutError:
-                    await self.disconnect()
-                    raise DaemonError("Daemon response timeout") from None
-                if not data:
-                    raise DaemonError("Daemon closed connection")
+        try:
+            host, port = parse_address(self.address)
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(host, port, limit=_STREAM_LIMIT_BYTES), timeout=_RESPONSE_TIMEOUT
+            )
+        except (OSError, TimeoutError, ValueError) as e:
+            raise DaemonNotRunningError(f"Cannot connect to daemon at {self.address}: {e}") from e
+        try:
+            writer.write(json.dumps({"cmd": "auth", "token": self._token}).encode() + b"\n")
+            await writer.drain()
+            data = await asyncio.wait_for(reader.readline(), timeout=_RESPONSE_TIMEOUT)
+            if not data:
+                raise DaemonError(f"Daemon at {self.address} closed connection")
+            self._validate_response(json.loads(data.decode()), "Authentication failed")
+        except (TimeoutError, ConnectionResetError, BrokenPipeError, ValueError) as e:
+            writer.close()
+            raise DaemonError(f"Cannot authenticate to daemon at {self.address}: {e}") from e
+        except DaemonError:
+            writer.close()
+            raise
+        return reader, writer
 
-                response = json.loads(data.decode())
+    async def _send_command(self, command: dict[str, Any]) -> dict[str, Any]:
+        """Send a command to the daemon and return the response.
+
+        Safe to call concurrently; responses are matched by request id. A
+        command refused by a daemon that is being upgraded is resent on a new
+        connection (to the new daemon).
+        """
+        for _ in range(_RECONNECT_ATTEMPTS):
+            response, writer = await self._send_once(command)
+            if not response.get("reconnect"):
                 return response
+            self._detach_connection(writer)
+            await asyncio.sleep(_RECONNECT_DELAY)
+        raise DaemonError("Daemon upgrade did not complete")
+
+    async def _send_once(self, command: dict[str, Any]) -> tuple[dict[str, Any], asyncio.StreamWriter]:
+        """Send a command on the current connection and return the response and that connection."""
+        async with self._lock:
+            await self.connect()
+            if not self._writer:
+                raise DaemonNotRunningError("Not connected to daemon")
 
+            writer = self._writer
+            request_id = next(self._request_ids)
+            future: asyncio.Future[dict[str, Any]] = asyncio.get_running_loop().create_future()
+            self._pending[request_id] = future
+            try:
+                writer.write(json.dumps({**command, "id": request_id}).encode() + b"\n")
+                await writer.drain()
             except (ConnectionResetError, BrokenPipeError) as e:
-                # Connection lost, try to reconnect
+                # Connection lost, reconnect on the next command
+                self._pending.pop(request_id, None)
                 await self.disconnect()
                 raise DaemonError(f"Connection lost: {e}") from e
 
+        try:
+            # Timeout prevents indefinite blocking; other requests are unaffected
+            return await asyncio.wait_for(future, timeout=_RESPONSE_TIMEOUT), writer
+        except TimeoutError:
+            raise DaemonError("Daemon response timeout") from None
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def _read_responses(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Resolve pending commands from response lines until the connection ends."""
+        error = DaemonError("Daemon closed connection")
+        try:
+            while True:
+                data = await reader.readline()
+                if not data:
+                    break
+                try:
+                    response = json.loads(data.decode())
+                except ValueError:
+                    continue
+                if isinstance(response, dict) and response.get("event") == "reconnect":
+                    # The daemon was upgraded: it still answers what it took, new commands go to the new one
+                    self._detach_connection(writer)
+                    continue
+                future = self._pending.pop(response.get("id"), None) if isinstance(response, dict) else None
+                if future and not future.done():
+                    future.set_result(response)
+        except (ConnectionResetError, BrokenPipeError, ValueError) as e:
+            error = DaemonError(f"Connection lost: {e}")
+        if self._writer is writer:
+            self._reset_connection(error)
+        else:
+            writer.close()
+
+    def _detach_connection(self, writer: asyncio.StreamWriter) -> None:
+        """Stop sending commands on a connection the daemon retires (upgrade).
+
+        Its reader keeps resolving the commands already sent on it; closing
+        our side tells the daemon we are done with it.
+        """
+        if self._writer is writer:
+            self._reader_task = None
+            self._reader = None
+            self._writer = None
+        with contextlib.suppress(OSError, RuntimeError):
+            writer.write_eof()
+
+    def _reset_connection(self, error: DaemonError) -> None:
+        """Drop the current connection and fail its pending commands."""
+        if self._reader_task and self._reader_task is not asyncio.current_task():
+            self._reader_task.cancel()
+        if self._writer:
+            self._writer.close()
+        self._reader_task = None
+        self._reader = None
+        self._writer = None
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
     def _validate_response(
         self, response: dict[str, Any], error_msg: str, return_key: str | None = None
     ) -> dict[str, Any]:
@@ -130,9 +276,104 @@ class DaemonClient:
         except DaemonError:
             return False
 
-    async def list_agents(self) -> list[dict[str, Any]]:
-        """List all agents."""
-        response = await self._send_command({"cmd": "list"})
+    async def forward(self, command: dict[str, Any]) -> dict[str, Any]:
+        """Send a raw protocol command and return the raw response (proxying between daemons).
+
+        Raises:
+            DaemonError: If the daemon cannot be reached
+        """
+        response = await self._send_command(command)
+        return {key: value for key, value in response.items() if key != "id"}
+
+    async def relay(self, command: dict[str, Any]) -> AsyncIterator[dict[str, Any]]:
+        """Send a subscribe command and yield the raw stream messages (relaying between daemons).
+
+        Raises:
+            DaemonError: If the subscription is refused or the connection drops
+        """
+        async with contextlib.aclosing(self._stream(command, "Subscription refused")) as stream:
+            async for message in stream:
+                yield message
+
+    async def get_stats(self) -> dict[str, Any]:
+        """Get daemon diagnostics (e.g. "persistence": state write counts and latency)."""
+        response = await self._send_command({"cmd": "stats"})
+        self._validate_response(response, "Failed to get stats")
+        return {key: value for key, value in response.items() if key not in ("id", "status")}
+
+    async def get_metrics(self) -> str:
+        """Get daemon and agent metrics in Prometheus text format."""
+        response = await self._send_command({"cmd": "metrics"})
+        self._validate_response(response, "Failed to get metrics")
+        return response["metrics"]
+
+    async def set_limits(self, max_running: int | None = None, max_per_project: int | None = None) -> dict[str, Any]:
+        """Change the daemon scheduler's running limits (0 = unlimited, None = unchanged).
+
+        Returns:
+            Scheduler limits and occupancy
+        """
+        command: dict[str, Any] = {"cmd": "set_limits"}
+        if max_running is not None:
+            command["max_running"] = max_running
+        if max_per_project is not None:
+            command["max_per_project"] = max_per_project
+        response = await self._send_command(command)
+        return self._validate_response(response, "Failed to set limits", "scheduler")
+
+    async def acquire_session(self, agent_id: str, max_wait: float = 20.0) -> dict[str, Any]:
+        """Ask the daemon's session governor for a slot to run one API session.
+
+        Args:
+            agent_id: Agent that wants to run a session
+            max_wait: Seconds the daemon may wait for a slot before answering
+
+        Returns:
+            Dict with "lease_id" (None if not granted yet; ask again) and
+            "cooldown_seconds" (remaining rate-limit cooldown)
+        """
+        response = await self._send_command({"cmd": "acquire_session", "agent_id": agent_id, "max_wait": max_wait})
+        self._validate_response(response, "Failed to acquire session")
+        return {"lease_id": response.get("lease_id"), "cooldown_seconds": response.get("cooldown_seconds", 0.0)}
+
+    async def release_session(self, lease_id: str, outcome: str, retry_after: float | None = None) -> None:
+        """Return a session slot to the governor.
+
+        Args:
+            lease_id: Lease from acquire_session()
+            outcome: "ok", "rate_limited" or "error"
+            retry_after: Seconds the API asked to wait (rate limits only)
+        """
+        command: dict[str, Any] = {"cmd": "release_session", "lease_id": lease_id, "outcome": outcome}
+        if retry_after is not None:
+            command["retry_after"] = retry_after
+        response = await self._send_command(command)
+        self._validate_response(response, "Failed to release session")
+
+    async def list_agents(
+        self,
+        status: str | list[str] | None = None,
+        project_dir: str | None = None,
+        fields: list[str] | None = None,
+    ) -> list[dict[str, Any]]:
+        """List agents, optionally filtered and projected by the daemon.
+
+        Args:
+            status: Only agents with this status (or one of these statuses)
+            project_dir: Only agents of this project directory
+            fields: Agent dict keys to return (agent_id is always included)
+
+        Returns:
+            List of agent dicts
+        """
+        command: dict[str, Any] = {"cmd": "list"}
+        if status is not None:
+            command["status"] = status
+        if project_dir is not None:
+            command["project_dir"] = project_dir
+        if fields is not None:
+            command["fields"] = fields
+        response = await self._send_command(command)
         self._validate_response(response, "Failed to list agents")
         return response.get("agents", [])
 
@@ -155,7 +396,7 @@ class DaemonClient:
         )
         return self._validate_response(response, "Failed to register agent", "agent")
 
-    async def start_agent(self, agent_id: str, config: dict[str, Any]) -> dict[str, Any]:
+    async def start_agent(self, agent_id: str, config: dict[str, Any], priority: int = 0) -> dict[str, Any]:
         """Start a new agent.
 
         Args:
@@ -165,15 +406,18 @@ class DaemonClient:
                 - project_dir: Project directory
                 - target_branch: Target branch for MR
                 - max_iterations: Optional max iterations
+            priority: Queue priority if the daemon's running limits are
+                reached (higher starts first)
 
         Returns:
-            Agent info dict
+            Agent info dict (status "queued" if the agent waits for a slot)
         """
         response = await self._send_command(
             {
                 "cmd": "start",
                 "agent_id": agent_id,
                 "config": config,
+                "priority": priority,
             }
         )
         return self._validate_response(response, "Failed to start agent", "agent")
@@ -213,12 +457,204 @@ class DaemonClient:
         )
         self._validate_response(response, "Failed to remove agent")
 
-    async def shutdown_daemon(self) -> None:
+    async def start_many(self, agents: dict[str, dict[str, Any]], priority: int = 0) -> list[dict[str, Any]]:
+        """Start several agents in one round-trip (started concurrently by the daemon).
+
+        Agents beyond the daemon's running limits are queued (see start_agent).
+
+        Args:
+            agents: Mapping of agent_id to agent configuration
+            priority: Queue priority for all of them
+
+        Returns:
+            Per-agent results with "agent_id", "status" ("ok"/"error") and
+            "agent" (agent info) or "message"
+        """
+        response = await self._send_command(
+            {
+                "cmd": "start_many",
+                "agents": [
+                    {"agent_id": agent_id, "config": config, "priority": priority}
+                    for agent_id, config in agents.items()
+                ],
+            }
+        )
+        self._validate_response(response, "Failed to start agents")
+        return response.get("results", [])
+
+    async def stop_many(self, agent_ids: list[str]) -> list[dict[str, Any]]:
+        """Stop several agents in one round-trip.
+
+        Returns:
+            Per-agent results (see start_many)
+        """
+        response = await self._send_command({"cmd": "stop_many", "agent_ids": agent_ids})
+        self._validate_response(response, "Failed to stop agents")
+        return response.get("results", [])
+
+    async def remove_many(self, agent_ids: list[str]) -> list[dict[str, Any]]:
+        """Remove several agents (stopping running ones) in one round-trip.
+
+        Returns:
+            Per-agent results (see start_many)
+        """
+        response = await self._send_command({"cmd": "remove_many", "agent_ids": agent_ids})
+        self._validate_response(response, "Failed to remove agents")
+        return response.get("results", [])
+
+    async def shutdown_daemon(self, keep_agents: bool = False) -> None:
         """Shutdown the daemon.
 
         Note: This method is available for external use but currently has no
         consumers in the codebase. The daemon is typically stopped via CLI
         or by sending SIGTERM directly.
+
+        Args:
+            keep_agents: Leave agents running; a restarted daemon re-adopts them.
         """
         with contextlib.suppress(DaemonError):
-            await self._send_command({"cmd": "shutdown"})
+            await self._send_command({"cmd": "shutdown", "keep_agents": keep_agents})
+
+    async def upgrade_daemon(self) -> int:
+        """Replace the daemon by the installed harness version, keeping agents and connections.
+
+        Returns:
+            PID of the new daemon (it takes over in the background)
+        """
+        response = await self._send_command({"cmd": "upgrade"})
+        self._validate_response(response, "Failed to upgrade daemon")
+        return response["pid"]
+
+    async def subscribe_logs(
+        self, agent_id: str, offset: int = 0, tail: int | None = None
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Stream an agent's log output as it is produced.
+
+        Uses a dedicated connection, so other commands can be sent while
+        iterating. Iteration ends after the agent's current run has exited
+        and its log was fully delivered.
+
+        Example:
+            async for chunk in client.subscribe_logs("agent_1"):
+                print(chunk["data"], end="")
+
+        Args:
+            agent_id: Agent to stream
+            offset: Byte offset to resume from (the "offset" of the last
+                chunk received)
+            tail: Start with the last N lines instead (served from the
+                daemon's memory while the agent runs); overrides offset
+
+        Yields:
+            Dicts with "data" (decoded text) and "offset" (byte offset after
+            the chunk)
+
+        Raises:
+            DaemonNotRunningError: If the daemon cannot be reached
+            DaemonError: If the subscription is refused or the connection drops
+        """
+        command: dict[str, Any] = {"cmd": "subscribe_logs", "agent_id": agent_id, "offset": offset}
+        if tail is not None:
+            command["tail"] = tail
+        async with contextlib.aclosing(self._stream(command, "Failed to subscribe to logs")) as stream:
+            async for event in stream:
+                if event.get("event") == "log_end":
+                    return
+                if event.get("event") == "log":
+                    yield {"data": event.get("data", ""), "offset": event.get("offset", offset)}
+
+    async def subscribe_events(
+        self, events: list[str] | None = None, agent_ids: list[str] | None = None
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Receive daemon events (agent lifecycle, checkpoints, phases) as they happen.
+
+        Uses a dedicated connection and runs until the caller stops
+        iterating. If the client falls too far behind, the daemon ends the
+        stream with DaemonEventOverflowError; resync with list_agents() and
+        subscribe again.
+
+        Args:
+            events: Event types to receive (see agent.daemon.EventType), None for all
+            agent_ids: Agents to receive events for, None for all
+
+        Yields:
+            Event dicts with "event", "agent_id", "timestamp" and event fields
+
+        Raises:
+            DaemonNotRunningError: If the daemon cannot be reached
+            DaemonError: If the subscription is refused or the connection drops
+        """
+        command: dict[str, Any] = {"cmd": "subscribe_events"}
+        if events is not None:
+            command["events"] = events
+        if agent_ids is not None:
+            command["agent_ids"] = agent_ids
+        async with contextlib.aclosing(self._stream(command, "Failed to subscribe to events")) as stream:
+            async for event in stream:
+                if event.get("event") == "overflow":
+                    raise DaemonEventOverflowError("Event stream overflowed; resync and resubscribe")
+                yield event
+
+    async def _stream(self, command: dict[str, Any], error_msg: str) -> AsyncIterator[dict[str, Any]]:
+        """Open a dedicated connection, send a subscribe command and yield its messages.
+
+        When the daemon is upgraded the subscription is reopened on the new
+        daemon, a log stream from the offset of the last message.
+
+        Raises:
+            DaemonNotRunningError: If the daemon cannot be reached
+            DaemonError: If the subscription is refused or the connection drops
+        """
+        command = dict(command)
+        attempts = 0
+        while True:
+            reader, writer = await self._open_connection()
+            try:
+                writer.write(json.dumps(command).encode() + b"\n")
+                await writer.drain()
+
+                data = await asyncio.wait_for(reader.readline(), timeout=_RESPONSE_TIMEOUT)
+                if not data:
+                    raise DaemonError("Daemon closed connection")
+                response = json.loads(data.decode())
+                if response.get("reconnect") and attempts < _RECONNECT_ATTEMPTS:
+                    attempts += 1
+                    await asyncio.sleep(_RECONNECT_DELAY)
+                    continue
+                self._validate_response(response, error_msg)
+                attempts = 0
+                # A reopened log stream resumes from the offset, not from a new tail
+                command.pop("tail", None)
+                if "offset" in command and "offset" in response:
+                    command["offset"] = response["offset"]
+
+                while True:
+                    data = await reader.readline()
+                    if not data:
+                        raise DaemonError("Daemon closed stream")
+                    message = json.loads(data.decode())
+                    if message.get("event") == "reconnect":
+                        break
+                    if "offset" in command and "offset" in message:
+                        command["offset"] = message["offset"]
+                    yield message
+            except TimeoutError:
+                raise DaemonError("Daemon response timeout") from None
+            except (ConnectionResetError, BrokenPipeError, ValueError) as e:
+                raise DaemonError(f"Stream failed: {e}") from e
+            finally:
+                writer.close()
+                with contextlib.suppress(ConnectionResetError, BrokenPipeError):
+                    await writer.wait_closed()
+
+
+def parse_address(address: str) -> tuple[str, int]:
+    """Split a "host:port" address ("[::1]:port" for IPv6).
+
+    Raises:
+        ValueError: If the address has no valid port
+    """
+    host, sep, port = address.rpartition(":")
+    if not sep or not port.isdigit() or not 0 < int(port) < 65536:
+        raise ValueError(f"Invalid address {address!r}, expected HOST:PORT")
+    return host.strip("[]") or "127.0.0.1", int(port)
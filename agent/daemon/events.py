@@ -0,0 +1,296 @@
+"""
+Daemon Event Bus
+================
+
+Typed push events published by the daemon to subscribed clients, so the
+TUI learns about agent and checkpoint changes without polling.
+
+Event types:
+- agent_queued / agent_started / agent_exited / agent_failed: process
+  lifecycle (queued: waiting for a scheduler slot)
+- checkpoint_created / checkpoint_resolved / checkpoint_completed: HITL
+  checkpoint changes found in the agent's .claude-agent directory
+- phase_changed: session phase (initializer/coding/mr_creation) changed
+- limit_exceeded: an agent's cgroup hit its pids/memory limit or was OOM
+  killed ("limit", "count")
+
+Every event is a dict with "event", "agent_id" and "timestamp" plus
+event-specific fields. Checkpoint events also carry
+"pending_checkpoint_type" (type of the most recent uncompleted
+checkpoint, or None) so clients need not read the checkpoint log.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Callable
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from agent.core.hitl import CheckpointLogWatcher
+from agent.core.orchestrator import determine_session_type
+from common.state import FileStateRepository, StateRepository, create_state_repository
+
+logger = logging.getLogger(__name__)
+
+# Events a subscriber may queue before it is dropped (it should resync via list)
+MAX_QUEUED_EVENTS = 1000
+
+
+class EventType:
+    """Event type constants for the daemon event stream."""
+
+    AGENT_QUEUED = "agent_queued"
+    AGENT_STARTED = "agent_started"
+    AGENT_EXITED = "agent_exited"
+    AGENT_FAILED = "agent_failed"
+    CHECKPOINT_CREATED = "checkpoint_created"
+    CHECKPOINT_RESOLVED = "checkpoint_resolved"
+    CHECKPOINT_COMPLETED = "checkpoint_completed"
+    PHASE_CHANGED = "phase_changed"
+    LIMIT_EXCEEDED = "limit_exceeded"
+
+    # Sent once to a subscriber that fell too far behind, before its stream closes
+    OVERFLOW = "overflow"
+
+    ALL = frozenset(
+        {
+            AGENT_QUEUED,
+            AGENT_STARTED,
+            AGENT_EXITED,
+            AGENT_FAILED,
+            CHECKPOINT_CREATED,
+            CHECKPOINT_RESOLVED,
+            CHECKPOINT_COMPLETED,
+            PHASE_CHANGED,
+            LIMIT_EXCEEDED,
+        }
+    )
+
+
+class EventSubscription:
+    """One subscriber's filter and bounded event queue."""
+
+    def __init__(
+        self,
+        event_types: frozenset[str] | None = None,
+        agent_ids: frozenset[str] | None = None,
+        max_queued: int = MAX_QUEUED_EVENTS,
+    ) -> None:
+        self.event_types = event_types
+        self.agent_ids = agent_ids
+        self.queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=max_queued)
+        self.overflowed = False
+
+    def matches(self, event: dict[str, Any]) -> bool:
+        """Check an event against the subscription filters (None matches all)."""
+        if self.event_types is not None and event["event"] not in self.event_types:
+            return False
+        return self.agent_ids is None or event["agent_id"] in self.agent_ids
+
+    def offer(self, event: dict[str, Any]) -> None:
+        """Queue an event without blocking; a full queue marks the subscriber as overflowed."""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            logger.warning("Event subscriber fell behind, dropping it (%d queued)", self.queue.qsize())
+
+
+class EventBus:
+    """Fan-out of daemon events to subscriptions.
+
+    publish() never blocks: a subscriber whose queue is full is marked as
+    overflowed and receives no further events.
+    """
+
+    def __init__(self) -> None:
+        self._subscriptions: list[EventSubscription] = []
+        self._listeners: list[Callable[[dict[str, Any]], None]] = []
+
+    def add_listener(self, listener: Callable[[dict[str, Any]], None]) -> None:
+        """Call a function with every published event (in-process consumers, e.g. metrics)."""
+        self._listeners.append(listener)
+
+    def subscribe(
+        self, event_types: frozenset[str] | None = None, agent_ids: frozenset[str] | None = None
+    ) -> EventSubscription:
+        """Add a subscription.
+
+        Args:
+            event_types: Event types to receive (None for all)
+            agent_ids: Agents to receive events for (None for all)
+
+        Returns:
+            The subscription; pass it to unsubscribe() when done.
+        """
+        subscription = EventSubscription(event_types, agent_ids)
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: EventSubscription) -> None:
+        """Remove a subscription."""
+        self._subscriptions = [sub for sub in self._subscriptions if sub is not subscription]
+
+    def publish(self, event_type: str, agent_id: str, **data: Any) -> None:
+        """Publish an event to all matching subscriptions.
+
+        Args:
+            event_type: One of EventType
+            agent_id: Agent the event is about
+            **data: Event-specific fields
+        """
+        if not self._subscriptions and not self._listeners:
+            return
+        event = {"event": event_type, "agent_id": agent_id, "timestamp": datetime.now(UTC).isoformat(), **data}
+        for listener in self._listeners:
+            listener(event)
+        for subscription in self._subscriptions:
+            if subscription.matches(event):
+                subscription.offer(event)
+
+
+class AgentStateWatcher:
+    """Watches one agent's .claude-agent directory and publishes state events.
+
+    Wakes on changes to the checkpoint log/journal and the workspace and
+    milestone files (inotify, see CheckpointLogWatcher), reloads the state
+    off the event loop and publishes the differences as checkpoint and
+    phase events. The latest state is also kept for list/status responses.
+    """
+
+    def __init__(
+        self,
+        bus: EventBus,
+        agent_id: str,
+        project_dir: Path,
+        spec_slug: str,
+        spec_hash: str,
+        skip_mr_creation: bool = False,
+    ) -> None:
+        self._bus = bus
+        self.agent_id = agent_id
+        self._project_dir = project_dir
+        self._spec_slug = spec_slug
+        self._spec_hash = spec_hash
+        self._skip_mr_creation = skip_mr_creation
+        self.agent_dir = project_dir / ".claude-agent" / f"{spec_slug}-{spec_hash}"
+        self._task: asyncio.Task[None] | None = None
+
+        # Latest observed state
+        self.phase: str | None = None
+        self.pending_checkpoint_type: str | None = None
+        self._checkpoints: dict[str, tuple[str | None, bool]] = {}  # id -> (status, completed)
+
+    def start(self) -> None:
+        """Start watching (no-op if already running)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        """Stop watching."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        """Reload and publish on every change of the watched files."""
+        # One repository per watcher: loads run in worker threads and the
+        # caching repositories are not shared between threads
+        try:
+            repo: StateRepository = create_state_repository()
+        except ValueError as e:
+            logger.warning("Falling back to JSON state for %s: %s", self.agent_id, e)
+            repo = FileStateRepository()
+
+        extra_paths = tuple(
+            self.agent_dir / name
+            for name in (
+                FileStateRepository.WORKSPACE_FILE,
+                FileStateRepository.GITLAB_MILESTONE_FILE,
+                FileStateRepository.FILE_MILESTONE_FILE,
+            )
+        )
+        log_path = self.agent_dir / FileStateRepository.CHECKPOINT_LOG_FILE
+        try:
+            async with CheckpointLogWatcher(log_path, extra_paths=extra_paths) as watcher:
+                await self._refresh(repo, publish=False)
+                while True:
+                    await watcher.wait_for_change()
+                    await self._refresh(repo, publish=True)
+        except asyncio.CancelledError:
+            pass
+
+    async def _refresh(self, repo: StateRepository, publish: bool) -> None:
+        """Reload state and publish what changed since the last load."""
+        try:
+            phase, checkpoint_log = await asyncio.to_thread(self._load, repo)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.warning("Failed to load state for %s: %s", self.agent_id, e)
+            return
+
+        checkpoints: dict[str, tuple[str | None, bool]] = {}
+        changes: list[tuple[str, dict[str, Any]]] = []
+        latest_pending: dict[str, Any] | None = None
+        for checkpoint_list in checkpoint_log.values():
+            if not isinstance(checkpoint_list, list):
+                continue
+            for ckpt in checkpoint_list:
+                if not isinstance(ckpt, dict) or not isinstance(ckpt.get("checkpoint_id"), str):
+                    continue
+                checkpoint_id = ckpt["checkpoint_id"]
+                status, completed = ckpt.get("status"), bool(ckpt.get("completed", False))
+                checkpoints[checkpoint_id] = (status, completed)
+                if not completed and (
+                    latest_pending is None
+                    or str(ckpt.get("created_at", "")) > str(latest_pending.get("created_at", ""))
+                ):
+                    latest_pending = ckpt
+
+                previous = self._checkpoints.get(checkpoint_id)
+                if previous is None:
+                    changes.append((EventType.CHECKPOINT_CREATED, ckpt))
+                    continue
+                if status != previous[0]:
+                    changes.append((EventType.CHECKPOINT_RESOLVED, ckpt))
+                if completed and not previous[1]:
+                    changes.append((EventType.CHECKPOINT_COMPLETED, ckpt))
+
+        previous_phase = self.phase
+        self._checkpoints = checkpoints
+        self.phase = phase
+        self.pending_checkpoint_type = latest_pending.get("checkpoint_type") if latest_pending else None
+
+        if not publish:
+            return
+        for event_type, ckpt in changes:
+            self._bus.publish(
+                event_type,
+                self.agent_id,
+                checkpoint_id=ckpt["checkpoint_id"],
+                checkpoint_type=ckpt.get("checkpoint_type"),
+                issue_iid=ckpt.get("issue_iid"),
+                status=ckpt.get("status"),
+                completed=bool(ckpt.get("completed", False)),
+                created_at=ckpt.get("created_at"),
+                resolved_at=ckpt.get("resolved_at"),
+                pending_checkpoint_type=self.pending_checkpoint_type,
+            )
+        if phase != previous_phase:
+            self._bus.publish(EventType.PHASE_CHANGED, self.agent_id, phase=phase, previous_phase=previous_phase)
+
+    def _load(self, repo: StateRepository) -> tuple[str, dict[str, Any]]:
+        """Load the agent state (worker thread).
+
+        Returns:
+            Tuple of (session phase value, checkpoint log)
+        """
+        state = repo.load(self._project_dir, self._spec_slug, self._spec_hash)
+        session_type = determine_session_type(
+            state, self._skip_mr_creation, repo, self._project_dir, self._spec_slug, self._spec_hash
+        )
+        return session_type.value, state.checkpoint_log
@@ -0,0 +1,225 @@
+"""
+Daemon Federation
+=================
+
+Spreads agents across several hosts. Each peer runs an ordinary daemon
+listening on TCP (--tcp HOST:PORT with HARNESS_DAEMON_TOKEN); one
+coordinator daemon, started with --peer HOST:PORT (repeatable) or
+HARNESS_FEDERATION_PEERS="host1:port1,host2:port2", and the same token:
+
+- places new agents (register/start) on the least-loaded daemon, itself
+  included, by (active + queued) / capacity from each peer's "stats",
+  where capacity is max_running or else the host's CPU count,
+- proxies register/start/stop/status/remove of remote agents to the peer
+  that owns them and merges every peer's agents into list (tagged with
+  "host"),
+- relays subscribe_logs of remote agents and merges the peers' events into
+  subscribe_events.
+
+TCP connections accept only the commands federation needs (agent
+commands, list, stats, ping and the subscriptions; not shutdown or
+upgrade). The transport is not encrypted: the token and all traffic cross
+the network in plaintext, so bind peers to a trusted network or tunnel
+them (SSH, WireGuard).
+
+Forwarded requests carry "local": true, so a peer never forwards them
+again. Peers need the same spec and project paths as the coordinator;
+session governance (governor.py) and scheduling limits stay per host.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import os
+from collections import Counter
+from collections.abc import AsyncIterator
+from typing import Any
+
+from .client import DaemonClient, DaemonError, parse_address
+from .events import EventSubscription, EventType
+
+logger = logging.getLogger(__name__)
+
+FEDERATION_PEERS_ENV = "HARNESS_FEDERATION_PEERS"
+
+# Seconds to wait for a peer's stats when placing an agent
+PLACEMENT_TIMEOUT = 5.0
+
+# Seconds between reconnects of a peer's event relay
+RELAY_RETRY_INTERVAL = 5.0
+
+# "host" of agents run by the coordinator itself
+LOCAL_HOST = "local"
+
+
+class Federation:
+    """The coordinator's view of its peer daemons."""
+
+    def __init__(self, peers: list[str], token: str) -> None:
+        """Initialize the federation.
+
+        Args:
+            peers: "host:port" addresses of the peer daemons
+            token: Auth token shared by the peers
+
+        Raises:
+            ValueError: If a peer address is invalid
+        """
+        for peer in peers:
+            parse_address(peer)
+        self.peers = list(dict.fromkeys(peers))
+        self._clients = {peer: DaemonClient(peer, token) for peer in self.peers}
+        self._placement: dict[str, str] = {}  # agent_id -> peer, for remote agents
+        self._starting: Counter[str] = Counter()  # Starts in flight per peer, not in its stats yet
+
+    @staticmethod
+    def peers_from_env() -> list[str]:
+        """Read peer addresses from HARNESS_FEDERATION_PEERS (comma-separated)."""
+        return [peer.strip() for peer in os.environ.get(FEDERATION_PEERS_ENV, "").split(",") if peer.strip()]
+
+    async def close(self) -> None:
+        """Disconnect from all peers."""
+        for client in self._clients.values():
+            await client.disconnect()
+
+    async def locate(self, agent_id: str) -> str | None:
+        """Find the peer running an agent.
+
+        Returns:
+            The peer address, None if no reachable peer knows the agent.
+        """
+        if agent_id in self._placement:
+            return self._placement[agent_id]
+        await self.list_agents({"cmd": "list", "fields": []})
+        return self._placement.get(agent_id)
+
+    async def place(self, local_scheduler: dict[str, Any]) -> str | None:
+        """Pick the least-loaded daemon for a new agent.
+
+        Args:
+            local_scheduler: The coordinator's scheduler info (see stats)
+
+        Returns:
+            The peer address, None to run the agent on the coordinator
+            (also on ties and when no peer answers).
+        """
+        stats = await asyncio.gather(*(self._peer_stats(peer) for peer in self.peers), return_exceptions=True)
+        best, best_load = None, scheduler_load(local_scheduler)
+        for peer, peer_stats in zip(self.peers, stats, strict=True):
+            if not isinstance(peer_stats, dict) or not isinstance(peer_stats.get("scheduler"), dict):
+                continue
+            load = scheduler_load(peer_stats["scheduler"], self._starting[peer])
+            if load < best_load:
+                best, best_load = peer, load
+        return best
+
+    async def forward(self, peer: str, request: dict[str, Any]) -> dict[str, Any]:
+        """Send a request to a peer for local handling and track where its agent lives.
+
+        Returns:
+            The peer's response (an error response if it is unreachable), with
+            "host" added to the agent dict.
+        """
+        agent_id = request.get("agent_id")
+        starting = request.get("cmd") == "start"
+        if starting:
+            self._starting[peer] += 1
+        try:
+            response = await self._clients[peer].forward({**request, "local": True})
+        except DaemonError as e:
+            return {"status": "error", "message": f"Peer {peer} unreachable: {e}"}
+        finally:
+            if starting:
+                self._starting[peer] -= 1
+        if isinstance(agent_id, str) and response.get("status") == "ok":
+            if request.get("cmd") == "remove":
+                self._placement.pop(agent_id, None)
+            else:
+                self._placement[agent_id] = peer
+        if isinstance(response.get("agent"), dict):
+            response["agent"]["host"] = peer
+        return response
+
+    async def list_agents(self, request: dict[str, Any]) -> tuple[list[dict[str, Any]], list[str]]:
+        """Run a list request on every peer.
+
+        Returns:
+            Tuple of (agents of all peers tagged with "host", unreachable peers).
+        """
+        responses = await asyncio.gather(
+            *(self._clients[peer].forward({**request, "local": True}) for peer in self.peers),
+            return_exceptions=True,
+        )
+        agents: list[dict[str, Any]] = []
+        unreachable = []
+        for peer, response in zip(self.peers, responses, strict=True):
+            if isinstance(response, BaseException) or response.get("status") != "ok":
+                unreachable.append(peer)
+                continue
+            for agent in response.get("agents", []):
+                self._placement[agent["agent_id"]] = peer
+                agents.append({**agent, "host": peer})
+        return agents, unreachable
+
+    async def relay_logs(self, peer: str, request: dict[str, Any]) -> AsyncIterator[dict[str, Any]]:
+        """Yield a remote agent's log stream messages, ending after log_end.
+
+        Raises:
+            DaemonError: If the peer refuses the subscription or the connection drops
+        """
+        async with contextlib.aclosing(self._clients[peer].relay({**request, "local": True})) as stream:
+            async for message in stream:
+                yield message
+                if message.get("event") == "log_end":
+                    return
+
+    def relay_events(self, subscription: EventSubscription) -> list[asyncio.Task[None]]:
+        """Feed every peer's events into a local subscription.
+
+        Returns:
+            The relay tasks; cancel them when the subscriber leaves.
+        """
+        return [asyncio.create_task(self._relay_peer_events(peer, subscription)) for peer in self.peers]
+
+    def stats(self) -> dict[str, Any]:
+        """Peers and known remote agents for the stats command."""
+        return {"peers": self.peers, "remote_agents": dict(Counter(self._placement.values()))}
+
+    async def _peer_stats(self, peer: str) -> dict[str, Any]:
+        """Fetch a peer's stats within PLACEMENT_TIMEOUT."""
+        return await asyncio.wait_for(self._clients[peer].forward({"cmd": "stats"}), timeout=PLACEMENT_TIMEOUT)
+
+    async def _relay_peer_events(self, peer: str, subscription: EventSubscription) -> None:
+        """Relay one peer's events until cancelled, reconnecting when the peer goes away."""
+        command: dict[str, Any] = {"cmd": "subscribe_events", "local": True}
+        if subscription.event_types is not None:
+            command["events"] = sorted(subscription.event_types)
+        if subscription.agent_ids is not None:
+            command["agent_ids"] = sorted(subscription.agent_ids)
+        while not subscription.overflowed:
+            try:
+                async for event in self._clients[peer].relay(command):
+                    if event.get("event") == EventType.OVERFLOW:
+                        # The peer dropped us; pass it on so the subscriber resyncs
+                        subscription.offer({**event, "agent_id": None, "host": peer})
+                        subscription.overflowed = True
+                        return
+                    if isinstance(event.get("agent_id"), str):
+                        self._placement[event["agent_id"]] = peer
+                    subscription.offer({**event, "host": peer})
+            except DaemonError as e:
+                logger.debug("Event relay from %s interrupted: %s", peer, e)
+            await asyncio.sleep(RELAY_RETRY_INTERVAL)
+
+
+def scheduler_load(scheduler: dict[str, Any], starting: int = 0) -> float:
+    """Load of a daemon from its scheduler info: (active + queued) / capacity.
+
+    Args:
+        scheduler: Scheduler info from stats (active, queued, max_running, cpu_count)
+        starting: Agents being started there that the info does not count yet
+    """
+    capacity = scheduler.get("max_running") or scheduler.get("cpu_count") or 1
+    return (scheduler.get("active", 0) + scheduler.get("queued", 0) + starting) / capacity
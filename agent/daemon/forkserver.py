@@ -0,0 +1,303 @@
+"""
+Agent Fork Server
+=================
+
+Daemon side of the pre-warmed agent launcher (see zygote.py). Starting an
+agent with exec pays for a fresh interpreter and the import of the agent
+runtime (claude_agent_sdk, agent.core, prompts, ...) on every launch; the
+zygote pays it once and forks each agent from the warm image, so agents
+reach their first session sooner and share the imported modules' pages
+(lower PSS per agent).
+
+Agents forked by the zygote are its children, not the daemon's: their
+handle (ZygoteProcess) gets the exit code from the zygote's exit reports
+and falls back to pidfd/proc polling (like a re-adopted agent) if the
+zygote dies. Any zygote failure makes the daemon fall back to exec.
+
+The fork server is on by default; HARNESS_FORKSERVER=0 disables it.
+Environment the agent runtime reads at import time is the daemon's (the
+zygote imported it); each agent's os.environ is its own.
+
+LaunchStats records spawn latency, time to first session (spawn until
+the agent's first acquire_session) and RSS/PSS at first session per
+launch mode, reported by the daemon's "stats" command.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Any
+
+from .procfs import AdoptedProcess, read_process_start_time
+
+logger = logging.getLogger(__name__)
+
+FORKSERVER_ENV = "HARNESS_FORKSERVER"
+
+# Seconds to wait for the zygote to import the agent runtime
+ZYGOTE_START_TIMEOUT = 60.0
+# Seconds to wait for a fork reply before falling back to exec
+SPAWN_TIMEOUT = 10.0
+
+# Agent commands the zygote can run: [python, "-m", "agent.cli", *args]
+_AGENT_MODULE_PREFIX = [sys.executable, "-m", "agent.cli"]
+
+
+class LaunchMode:
+    """How an agent process was started."""
+
+    FORKSERVER = "forkserver"
+    EXEC = "exec"
+
+
+class ZygoteLostError(Exception):
+    """The zygote exited before reporting an agent's exit."""
+
+
+class ZygoteProcess(AdoptedProcess):
+    """Handle for an agent forked by the zygote (the daemon's grandchild)."""
+
+    def __init__(self, pid: int, start_time: int, exited: asyncio.Future[int]) -> None:
+        super().__init__(pid, start_time)
+        self._exit_report = exited
+
+    async def wait(self) -> int | None:
+        """Wait until the process exits.
+
+        Returns:
+            Exit code reported by the zygote (negative signal number if
+            killed), or None if the zygote died first.
+        """
+        try:
+            self.returncode = await asyncio.shield(self._exit_report)
+        except ZygoteLostError:
+            return await super().wait()
+        self._exited = True
+        return self.returncode
+
+
+class ForkServer:
+    """Runs the zygote and forks agent processes from it."""
+
+    def __init__(self, enabled: bool = True) -> None:
+        """Initialize the fork server (the zygote starts with start()).
+
+        Args:
+            enabled: False to always launch agents with exec
+        """
+        self.enabled = enabled
+        self._process: asyncio.subprocess.Process | None = None
+        self._ready: asyncio.Future[None] | None = None
+        self._reader: asyncio.Task[None] | None = None
+        self._request_ids = 0
+        self._replies: dict[int, asyncio.Future[tuple[int, asyncio.Future[int]]]] = {}
+        self._exits: dict[int, asyncio.Future[int]] = {}
+        self._env: dict[str, str] = {}
+
+    @classmethod
+    def from_env(cls) -> ForkServer:
+        """Create a fork server, disabled if HARNESS_FORKSERVER=0."""
+        return cls(enabled=os.environ.get(FORKSERVER_ENV, "1").strip().lower() not in ("0", "false", "no"))
+
+    def start(self, env: dict[str, str]) -> None:
+        """Launch the zygote in the background (imports take a while).
+
+        Args:
+            env: Environment of the zygote (and thus of import-time config)
+        """
+        if not self.enabled:
+            return
+        self._env = env
+        self._ready = asyncio.get_running_loop().create_future()
+        self._reader = asyncio.create_task(self._run_zygote())
+
+    def accepts(self, cmd: list[str]) -> bool:
+        """Check whether a command can be launched through the zygote."""
+        return self.enabled and cmd[: len(_AGENT_MODULE_PREFIX)] == _AGENT_MODULE_PREFIX
+
+    async def spawn(
+        self, cmd: list[str], cwd: str, env: dict[str, str], log_file: Path, limits: dict[str, Any] | None = None
+    ) -> ZygoteProcess | None:
+        """Fork an agent from the zygote.
+
+        Args:
+            cmd: Agent command (see accepts())
+            cwd: Working directory
+            env: Complete environment of the agent
+            log_file: File the agent's stdout/stderr are appended to, or the daemon's capture pipe
+            limits: Resource limits the child applies to itself before
+                running the agent (LaunchLimits.to_request())
+
+        Returns:
+            Handle for the agent, or None if the zygote is unavailable or
+            the fork failed (launch with exec instead).
+        """
+        if not self.accepts(cmd):
+            return None
+        if self._reader is None or self._reader.done():
+            # Not started yet, or the zygote died: start a fresh one
+            self.start(self._env or os.environ.copy())
+        assert self._ready is not None
+        try:
+            await asyncio.wait_for(asyncio.shield(self._ready), timeout=ZYGOTE_START_TIMEOUT)
+        except (TimeoutError, ZygoteLostError) as e:
+            logger.warning("Fork server unavailable (%s), launching with exec", e or "timeout")
+            return None
+
+        self._request_ids += 1
+        request_id = self._request_ids
+        reply = asyncio.get_running_loop().create_future()
+        self._replies[request_id] = reply
+        request = {
+            "id": request_id,
+            "args": cmd[len(_AGENT_MODULE_PREFIX) :],
+            "cwd": cwd,
+            "env": env,
+            "log_file": str(log_file),
+            "limits": limits,
+        }
+        try:
+            assert self._process is not None and self._process.stdin is not None
+            self._process.stdin.write((json.dumps(request) + "\n").encode())
+            await self._process.stdin.drain()
+            pid, exited = await asyncio.wait_for(reply, timeout=SPAWN_TIMEOUT)
+        except (OSError, TimeoutError, ZygoteLostError, RuntimeError) as e:
+            logger.warning("Fork server spawn failed (%s), launching with exec", e or "timeout")
+            return None
+        finally:
+            self._replies.pop(request_id, None)
+
+        # None: already exited (a zombie has no start time), so the handle is never "alive"
+        start_time = read_process_start_time(pid)
+        return ZygoteProcess(pid, start_time if start_time is not None else -1, exited)
+
+    async def stop(self) -> None:
+        """Stop the zygote (agents it forked keep running)."""
+        if self._process is None:
+            return
+        if self._process.stdin is not None:
+            self._process.stdin.close()
+        try:
+            await asyncio.wait_for(self._process.wait(), timeout=5.0)
+        except TimeoutError:
+            with contextlib.suppress(ProcessLookupError):
+                self._process.kill()
+        if self._reader is not None:
+            self._reader.cancel()
+
+    async def _run_zygote(self) -> None:
+        """Start the zygote and dispatch its replies and exit reports until it exits."""
+        assert self._ready is not None
+        try:
+            self._process = await asyncio.create_subprocess_exec(
+                sys.executable,
+                "-m",
+                "agent.daemon.zygote",
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                cwd=str(Path(__file__).parent.parent.parent),
+                env=self._env,
+                start_new_session=True,  # Not hit by the terminal's Ctrl-C
+            )
+            assert self._process.stdout is not None
+            while line := await self._process.stdout.readline():
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self._dispatch(message)
+        except OSError as e:
+            logger.warning("Failed to start fork server: %s", e)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._lost()
+
+    def _dispatch(self, message: dict[str, Any]) -> None:
+        """Handle one message from the zygote."""
+        loop = asyncio.get_running_loop()
+        if message.get("event") == "ready":
+            logger.info("Fork server ready (zygote PID %s)", message.get("pid"))
+            if self._ready is not None and not self._ready.done():
+                self._ready.set_result(None)
+        elif message.get("event") == "exit":
+            exited = self._exits.pop(message["pid"], None) or loop.create_future()
+            if not exited.done():
+                exited.set_result(message["returncode"])
+        elif (reply := self._replies.get(message.get("id", -1))) is not None and not reply.done():
+            if "pid" in message:
+                # Register the exit future before the exit report can arrive
+                exited = self._exits.setdefault(message["pid"], loop.create_future())
+                reply.set_result((message["pid"], exited))
+            else:
+                reply.set_exception(OSError(message.get("error", "fork failed")))
+
+    def _lost(self) -> None:
+        """Fail everything waiting on the zygote after it exited."""
+        if self._ready is not None and not self._ready.done():
+            # Never became ready (e.g. the agent runtime fails to import): stop retrying
+            logger.warning("Fork server failed to start, launching agents with exec")
+            self.enabled = False
+        if self._process is not None and self._process.returncode is None:
+            with contextlib.suppress(ProcessLookupError):
+                self._process.kill()
+        for future in [self._ready, *self._replies.values(), *self._exits.values()]:
+            if future is not None and not future.done():
+                future.set_exception(ZygoteLostError("zygote exited"))
+                future.exception()  # Nobody may be waiting; mark as retrieved
+        self._exits.clear()
+
+
+class LaunchStats:
+    """Launch latency and memory samples per launch mode."""
+
+    def __init__(self) -> None:
+        self._spawn: dict[str, list[float]] = defaultdict(list)
+        self._first_session: dict[str, list[float]] = defaultdict(list)
+        self._rss_kb: dict[str, list[int]] = defaultdict(list)
+        self._pss_kb: dict[str, list[int]] = defaultdict(list)
+
+    def record_spawn(self, mode: str, seconds: float) -> None:
+        """Record how long launching a process took."""
+        self._spawn[mode].append(seconds)
+
+    def record_first_session(self, mode: str, seconds: float, memory: dict[str, int] | None) -> None:
+        """Record an agent's time to first session and its memory at that point."""
+        self._first_session[mode].append(seconds)
+        if memory:
+            if "rss_kb" in memory:
+                self._rss_kb[mode].append(memory["rss_kb"])
+            if "pss_kb" in memory:
+                self._pss_kb[mode].append(memory["pss_kb"])
+
+    def stats(self) -> dict[str, Any]:
+        """Return launches, averages (spawn ms, first session seconds, RSS/PSS kB) per mode."""
+        return {
+            mode: {
+                "launches": len(self._spawn[mode]),
+                "avg_spawn_ms": _average(self._spawn[mode], 1000),
+                "avg_time_to_first_session": _average(self._first_session[mode]),
+                "avg_rss_kb": _average(self._rss_kb[mode]),
+                "avg_pss_kb": _average(self._pss_kb[mode]),
+            }
+            for mode in (LaunchMode.FORKSERVER, LaunchMode.EXEC)
+        }
+
+
+# ============================================================================
+# Private Helper Functions
+# ============================================================================
+
+
+def _average(values: list[float] | list[int], scale: float = 1.0) -> float | None:
+    """Average of samples, scaled and rounded (None without samples)."""
+    if not values:
+        return None
+    return round(sum(values) / len(values) * scale, 3)
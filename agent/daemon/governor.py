@@ -0,0 +1,251 @@
+"""
+Session Rate Governor
+=====================
+
+Fleet-wide admission control for agent sessions (API conversations), so
+agents that share one API quota do not retry-storm after rate limits.
+
+Agent processes ask the daemon for a session lease before each session
+("acquire_session") and return it with the outcome ("release_session").
+Leases are granted FIFO while:
+- no rate-limit cooldown is active (set from retry-after hints, or an
+  exponential backoff when the API gave none),
+- the number of sessions in flight is below the concurrency cap, and
+- the token bucket (optional sessions-per-minute rate) has a token.
+
+The concurrency cap adapts AIMD-style: a rate-limited session halves it
+(from the number of sessions in flight, at most once per cooldown) and
+every successful session raises it by 1/cap, up to the configured maximum.
+
+Static limits come from HARNESS_MAX_CONCURRENT_SESSIONS and
+HARNESS_SESSIONS_PER_MINUTE (0 = unlimited).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+
+MAX_CONCURRENT_ENV = "HARNESS_MAX_CONCURRENT_SESSIONS"
+SESSIONS_PER_MINUTE_ENV = "HARNESS_SESSIONS_PER_MINUTE"
+
+# Cooldown after a rate limit without a retry-after hint: doubles up to the max
+BACKOFF_BASE_SECONDS = 5.0
+BACKOFF_MAX_SECONDS = 300.0
+
+# Multiplicative decrease of the concurrency cap on a rate limit
+DECREASE_FACTOR = 0.5
+
+
+class SessionOutcome:
+    """Outcome constants reported when a lease is released."""
+
+    OK = "ok"
+    RATE_LIMITED = "rate_limited"
+    ERROR = "error"
+
+    ALL = frozenset({OK, RATE_LIMITED, ERROR})
+
+
+@dataclass
+class _Lease:
+    """A granted session slot."""
+
+    agent_id: str
+    granted_at: float = field(default_factory=time.monotonic)
+
+
+class RateGovernor:
+    """Grants session leases under an adaptive concurrency cap and a token bucket."""
+
+    def __init__(self, max_concurrent: int = 0, sessions_per_minute: float = 0.0) -> None:
+        """Initialize the governor.
+
+        Args:
+            max_concurrent: Max sessions in flight fleet-wide (0 = unlimited)
+            sessions_per_minute: Token bucket refill rate (0 = unlimited);
+                the bucket holds up to one minute of tokens
+        """
+        self.max_concurrent = max_concurrent
+        self.sessions_per_minute = sessions_per_minute
+        self._tokens = max(sessions_per_minute, 1.0)
+        self._refilled_at = time.monotonic()
+
+        self._cap: float | None = None  # Adaptive cap; None until the first rate limit
+        self._cooldown_until = 0.0
+        self._backoff = 0.0
+
+        self._leases: dict[str, _Lease] = {}
+        self._waiters: deque[tuple[str, asyncio.Future[str]]] = deque()
+        self._timer: asyncio.TimerHandle | None = None
+
+        # Statistics (see stats())
+        self._granted = 0
+        self._rate_limited = 0
+        self._total_wait = 0.0
+
+    @classmethod
+    def from_env(cls) -> RateGovernor:
+        """Create a governor with limits from the environment (unset or invalid = unlimited)."""
+        return cls(int(_env_number(MAX_CONCURRENT_ENV)), _env_number(SESSIONS_PER_MINUTE_ENV))
+
+    async def acquire(self, agent_id: str, timeout: float) -> str | None:
+        """Wait for a session lease.
+
+        Args:
+            agent_id: Agent requesting the session
+            timeout: Seconds to wait before giving up
+
+        Returns:
+            Lease ID, or None if no lease was granted within the timeout
+        """
+        started = time.monotonic()
+        future: asyncio.Future[str] = asyncio.get_running_loop().create_future()
+        self._waiters.append((agent_id, future))
+        self._dispatch()
+        await asyncio.wait({future}, timeout=timeout)
+        if not future.done():
+            future.cancel()
+            self._waiters = deque(waiter for waiter in self._waiters if waiter[1] is not future)
+            return None
+        self._total_wait += time.monotonic() - started
+        return future.result()
+
+    def release(self, lease_id: str, outcome: str, retry_after: float | None = None) -> bool:
+        """Return a lease and adapt to the session's outcome.
+
+        Args:
+            lease_id: Lease from acquire()
+            outcome: One of SessionOutcome
+            retry_after: Seconds the API asked to wait (rate limits only)
+
+        Returns:
+            True if the lease was known
+        """
+        lease = self._leases.pop(lease_id, None)
+        if outcome == SessionOutcome.RATE_LIMITED:
+            self._on_rate_limited(len(self._leases) + 1, retry_after)
+        elif outcome == SessionOutcome.OK:
+            self._on_success()
+        self._dispatch()
+        return lease is not None
+
+    def lease(self, lease_id: str) -> tuple[str, float] | None:
+        """Return (agent_id, seconds held) of an outstanding lease, None if unknown."""
+        lease = self._leases.get(lease_id)
+        return (lease.agent_id, time.monotonic() - lease.granted_at) if lease else None
+
+    def release_agent(self, agent_id: str) -> None:
+        """Drop all leases and waiters of an agent (its process exited)."""
+        self._leases = {lease_id: lease for lease_id, lease in self._leases.items() if lease.agent_id != agent_id}
+        for waiter_agent_id, future in self._waiters:
+            if waiter_agent_id == agent_id:
+                future.cancel()
+        self._dispatch()
+
+    def cooldown_remaining(self) -> float:
+        """Seconds until the rate-limit cooldown ends (0 if none)."""
+        return max(self._cooldown_until - time.monotonic(), 0.0)
+
+    def stats(self) -> dict[str, Any]:
+        """Return governor state and counters."""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "sessions_per_minute": self.sessions_per_minute,
+            "concurrency_cap": round(self._cap, 2) if self._cap is not None else None,
+            "in_flight": len(self._leases),
+            "waiting": sum(1 for _, future in self._waiters if not future.done()),
+            "cooldown_seconds": round(self.cooldown_remaining(), 1),
+            "granted": self._granted,
+            "rate_limited": self._rate_limited,
+            "avg_wait_seconds": round(self._total_wait / self._granted, 3) if self._granted else 0.0,
+        }
+
+    def _dispatch(self) -> None:
+        """Grant leases to waiters in FIFO order while limits allow."""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        now = time.monotonic()
+        self._refill(now)
+        while self._waiters:
+            agent_id, future = self._waiters[0]
+            if future.done():
+                self._waiters.popleft()
+                continue
+            delay = self._admission_delay(now)
+            if delay > 0:
+                # Concurrency-bound waits are re-dispatched by release()
+                if math.isfinite(delay):
+                    self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+            self._waiters.popleft()
+            lease_id = uuid.uuid4().hex[:12]
+            self._leases[lease_id] = _Lease(agent_id)
+            if self.sessions_per_minute:
+                self._tokens -= 1
+            self._granted += 1
+            future.set_result(lease_id)
+
+    def _admission_delay(self, now: float) -> float:
+        """Seconds until the next lease may be granted (inf = wait for a release)."""
+        if now < self._cooldown_until:
+            return self._cooldown_until - now
+        limit = min(self.max_concurrent or math.inf, self._cap if self._cap is not None else math.inf)
+        if math.isfinite(limit) and len(self._leases) >= math.floor(limit):
+            return math.inf
+        if self.sessions_per_minute and self._tokens < 1:
+            return (1 - self._tokens) * 60 / self.sessions_per_minute
+        return 0.0
+
+    def _refill(self, now: float) -> None:
+        """Add tokens for the time since the last refill."""
+        if self.sessions_per_minute:
+            elapsed = now - self._refilled_at
+            self._tokens = min(
+                self._tokens + elapsed * self.sessions_per_minute / 60, max(self.sessions_per_minute, 1.0)
+            )
+        self._refilled_at = now
+
+    def _on_rate_limited(self, in_flight: int, retry_after: float | None) -> None:
+        """Shrink the concurrency cap and start a cooldown."""
+        self._rate_limited += 1
+        now = time.monotonic()
+        if now >= self._cooldown_until:
+            # First rate limit of this episode: the others were in flight with it
+            current = min(self._cap, in_flight) if self._cap is not None else in_flight
+            self._cap = max(1.0, current * DECREASE_FACTOR)
+        if retry_after is not None and retry_after > 0:
+            pause = retry_after
+        else:
+            self._backoff = min(self._backoff * 2 if self._backoff else BACKOFF_BASE_SECONDS, BACKOFF_MAX_SECONDS)
+            pause = self._backoff
+        self._cooldown_until = max(self._cooldown_until, now + pause)
+
+    def _on_success(self) -> None:
+        """Grow the concurrency cap additively and reset the backoff."""
+        self._backoff = 0.0
+        if self._cap is None:
+            return
+        self._cap += 1 / self._cap
+        if self.max_concurrent and self._cap >= self.max_concurrent:
+            self._cap = None  # Back at the configured limit
+
+
+# ============================================================================
+# Private Helper Functions
+# ============================================================================
+
+
+def _env_number(name: str) -> float:
+    """Read a non-negative number from the environment (0 if unset or invalid)."""
+    try:
+        return max(float(os.environ.get(name, "0")), 0.0)
+    except ValueError:
+        return 0.0
@@ -0,0 +1,504 @@
+"""
+Agent Resource Limits
+=====================
+
+Optional per-agent CPU quota, memory max and pids max (SpecConfig
+cpu_quota, memory_max_mb, pids_max), so one agent's dev server or test
+suite cannot starve the others.
+
+cgroup v2 (preferred): every agent run gets its own cgroup
+"agent-<agent_id>" below a delegated subtree, with cpu.max, memory.max and
+pids.max set; the limits cover the agent's whole process tree. The subtree
+is HARNESS_CGROUP_ROOT if set, else the daemon's own cgroup when the daemon
+is alone in it (the daemon then moves itself into a "daemon" leaf so the
+controllers can be enabled for the agent cgroups). memory.events,
+pids.events and cpu.stat are polled for OOM kills, memory.max/pids.max hits
+and CPU throttling.
+
+rlimit (fallback, no usable cgroup v2): memory_max_mb becomes RLIMIT_DATA
+and pids_max RLIMIT_NPROC of the agent process, inherited by its
+children. RLIMIT_DATA applies per process. RLIMIT_NPROC is checked
+against all tasks (threads, not just processes) of the user, so it is set
+to the user's thread count at launch plus pids_max: a cap on the user's
+total that all agents share, not a per-agent budget (and root ignores
+it). A CPU quota has no rlimit equivalent and is reported as unenforced.
+
+Limits are prepared before the agent is launched (prepare()) and the
+agent process applies them to itself before it runs anything
+(apply_to_self(): in the zygote's forked child, or on the exec path in a
+small shim that runs this file and then execs the agent command, see
+LaunchLimits.wrap_command()), so its children cannot escape them. apply()
+repeats them from the daemon once the PID is known, which also catches
+and reports a child that failed to apply them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import re
+import resource
+import sys
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+CGROUP_ROOT_ENV = "HARNESS_CGROUP_ROOT"
+
+# Seconds between checks of the agent cgroups' event counters
+LIMIT_POLL_INTERVAL = 5.0
+
+# cpu.max period: the quota is cpu_quota * period per period
+CPU_PERIOD_USEC = 100_000
+
+# Controller needed for each limit
+_LIMIT_CONTROLLERS = {"cpu_quota": "cpu", "memory_max_mb": "memory", "pids_max": "pids"}
+
+# Counters reported per agent: name -> (cgroup file, key)
+_CGROUP_COUNTERS = {
+    "oom": ("memory.events", "oom"),
+    "oom_kill": ("memory.events", "oom_kill"),
+    "memory_max": ("memory.events", "max"),
+    "pids_max": ("pids.events", "max"),
+    "cpu_throttled": ("cpu.stat", "nr_throttled"),
+}
+# Counter increases that are published as events (the others change too often)
+EVENT_COUNTERS = frozenset({"oom", "oom_kill", "pids_max"})
+
+
+class LimitMode:
+    """How an agent's limits are enforced."""
+
+    CGROUP = "cgroup"
+    RLIMIT = "rlimit"
+
+
+@dataclass(frozen=True)
+class LaunchLimits:
+    """Limits prepared for one agent launch (see LimitEnforcer.prepare())."""
+
+    info: dict[str, Any]  # mode, the limits and "unenforced", for the agent's status
+    cgroup_procs: str | None = None  # cgroup.procs file of the agent's cgroup
+    rlimits: tuple[tuple[str, int, int], ...] = ()  # (limit name, resource, value)
+
+    def to_request(self) -> dict[str, Any]:
+        """Convert to the form apply_to_self() takes (JSON-serializable for the zygote)."""
+        return {"cgroup_procs": self.cgroup_procs, "rlimits": [[rlimit, value] for _, rlimit, value in self.rlimits]}
+
+    def wrap_command(self, cmd: list[str]) -> list[str]:
+        """Wrap an agent command so it applies the limits to itself before exec.
+
+        The wrapper runs this file as a script (not as a module, so the
+        agent package is not imported twice); it calls apply_to_self() and
+        execs cmd in the same process. Used instead of a preexec_fn, which
+        is unsafe in the multi-threaded daemon.
+        """
+        return [sys.executable, str(Path(__file__).resolve()), json.dumps(self.to_request()), *cmd]
+
+
+@dataclass(frozen=True)
+class ResourceLimits:
+    """Limits for one agent (None = unlimited)."""
+
+    cpu_quota: float | None = None  # CPUs (1.5 = one and a half cores)
+    memory_max_mb: int | None = None
+    pids_max: int | None = None
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> ResourceLimits | None:
+        """Read limits from an agent config.
+
+        Returns:
+            The limits, or None if no limit is set
+
+        Raises:
+            ValueError: If a limit is not a positive number
+        """
+        values: dict[str, Any] = {}
+        for key in _LIMIT_CONTROLLERS:
+            value = config.get(key)
+            if value is None:
+                continue
+            number_types = (int, float) if key == "cpu_quota" else (int,)
+            if not isinstance(value, number_types) or isinstance(value, bool) or value <= 0:
+                raise ValueError(f"{key} must be a positive {'number' if key == 'cpu_quota' else 'integer'}")
+            values[key] = value
+        return cls(**values) if values else None
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert to dict, leaving out unset limits."""
+        return {key: value for key, value in asdict(self).items() if value is not None}
+
+
+class LimitEnforcer:
+    """Applies agent resource limits and tracks limit events."""
+
+    def __init__(self, cgroup_root: Path | None, on_event: Callable[[str, str, int], None]) -> None:
+        """Initialize the enforcer (call setup() before applying limits).
+
+        Args:
+            cgroup_root: Delegated cgroup v2 directory, or None to use the
+                daemon's own cgroup
+            on_event: Called with (agent_id, counter, count) when an OOM,
+                OOM kill or pids.max counter of an agent grows
+        """
+        self._configured_root = cgroup_root
+        self._on_event = on_event
+        self._root: Path | None = None  # Set when cgroup v2 is usable
+        self._controllers: set[str] = set()
+        self._applied: dict[str, dict[str, Any]] = {}  # agent_id -> limits info of the current run
+        self._baselines: dict[str, dict[str, int]] = {}
+        self._counters: dict[str, dict[str, int]] = {}
+        self._task: asyncio.Task[None] | None = None
+
+    @classmethod
+    def from_env(cls, on_event: Callable[[str, str, int], None]) -> LimitEnforcer:
+        """Create an enforcer using HARNESS_CGROUP_ROOT if set."""
+        root = os.environ.get(CGROUP_ROOT_ENV)
+        return cls(Path(root) if root else None, on_event)
+
+    @property
+    def mode(self) -> str:
+        """Enforcement mode for new agents."""
+        return LimitMode.CGROUP if self._root is not None else LimitMode.RLIMIT
+
+    def setup(self) -> None:
+        """Find a usable cgroup v2 subtree; otherwise limits use rlimits.
+
+        Must run before the daemon starts child processes (it may move the
+        daemon into a leaf cgroup).
+        """
+        try:
+            root = self._configured_root or _own_cgroup_dir()
+            if root is None:
+                raise OSError("no cgroup v2 hierarchy")
+            if self._configured_root is None and root.name == "daemon":
+                root = root.parent  # Moved into its leaf by a previous daemon instance
+            available = set((root / "cgroup.controllers").read_text(encoding="utf-8").split())
+            wanted = available & set(_LIMIT_CONTROLLERS.values())
+            if not wanted:
+                raise OSError(f"controllers {sorted(_LIMIT_CONTROLLERS.values())} not available in {root}")
+            if self._configured_root is None:
+                _move_to_leaf(root)
+            (root / "cgroup.subtree_control").write_text(
+                " ".join(f"+{controller}" for controller in sorted(wanted)), encoding="utf-8"
+            )
+        except OSError as e:
+            logger.info("Agent resource limits use rlimits (cgroup v2 unavailable: %s)", e)
+            return
+        self._root = root
+        self._controllers = wanted
+        logger.info("Agent resource limits use cgroup v2 under %s (%s)", root, ", ".join(sorted(wanted)))
+
+    async def prepare(self, agent_id: str, limits: ResourceLimits | None) -> LaunchLimits | None:
+        """Prepare limits for an agent about to be launched.
+
+        In cgroup mode this creates the agent's cgroup and sets its limits;
+        in rlimit mode it computes the rlimit values. The agent process
+        then applies the result to itself (apply_to_self()) before it runs.
+
+        Args:
+            agent_id: Agent being launched
+            limits: Limits from the agent's config (None = none)
+
+        Returns:
+            The prepared limits, or None without limits
+        """
+        self.release(agent_id)
+        self._applied.pop(agent_id, None)
+        if limits is None:
+            return None
+        wanted = limits.to_dict()
+        if self._root is not None:
+            try:
+                unenforced = self._prepare_cgroup(agent_id, limits)
+            except OSError as e:
+                logger.warning("Failed to prepare cgroup limits for agent %s, using rlimits: %s", agent_id, e)
+            else:
+                return LaunchLimits(
+                    {"mode": LimitMode.CGROUP, **wanted, "unenforced": unenforced},
+                    cgroup_procs=str(self._cgroup_dir(agent_id) / "cgroup.procs"),
+                )
+        # Counting the user's processes scans /proc: keep it off the event loop
+        rlimits, unenforced = await asyncio.to_thread(_rlimit_values, limits)
+        return LaunchLimits({"mode": LimitMode.RLIMIT, **wanted, "unenforced": unenforced}, rlimits=rlimits)
+
+    def apply(self, agent_id: str, pid: int, launch: LaunchLimits | None) -> dict[str, Any] | None:
+        """Apply prepared limits to a just-launched agent process.
+
+        The process normally applied them to itself already; repeating it
+        here covers a child that could not (and is harmless otherwise).
+
+        Args:
+            agent_id: Agent the process belongs to
+            pid: Agent process ID
+            launch: Limits from prepare() (None = none)
+
+        Returns:
+            Limits info for the agent's status: mode, the limits, and
+            "unenforced" (limits that could not be applied); None without limits
+        """
+        if launch is None:
+            return None
+        info = dict(launch.info)
+        if launch.cgroup_procs is not None:
+            try:
+                Path(launch.cgroup_procs).write_text(str(pid), encoding="utf-8")
+            except ProcessLookupError:
+                pass  # Already exited
+            except OSError as e:
+                logger.warning("Failed to move agent %s into its cgroup: %s", agent_id, e)
+                info["unenforced"] = [key for key in _LIMIT_CONTROLLERS if key in info]
+        else:
+            info["unenforced"] = [*info["unenforced"], *_apply_rlimits(pid, launch.rlimits)]
+        self._applied[agent_id] = info
+        return info
+
+    def adopt(self, agent_id: str, limits: ResourceLimits | None) -> None:
+        """Resume tracking the cgroup of an agent re-adopted after a daemon restart.
+
+        Counters start from their current values (events before the
+        restart are not reported again).
+        """
+        if limits is None or self._root is None or not self._cgroup_dir(agent_id).is_dir():
+            return
+        self._applied[agent_id] = {"mode": LimitMode.CGROUP, **limits.to_dict(), "unenforced": []}
+        self._baselines[agent_id] = self._read_counters(agent_id) or {}
+        self._counters[agent_id] = {}
+
+    def info(self, agent_id: str) -> dict[str, Any] | None:
+        """Return an agent's limits info with its limit event counters (None without limits)."""
+        applied = self._applied.get(agent_id)
+        if applied is None:
+            return None
+        return {**applied, "events": dict(self._counters.get(agent_id, {}))}
+
+    def poll(self, agent_id: str) -> None:
+        """Read an agent's cgroup counters and report OOM/limit events."""
+        if self._applied.get(agent_id, {}).get("mode") != LimitMode.CGROUP:
+            return
+        current = self._read_counters(agent_id)
+        if current is None:
+            return
+        baseline = self._baselines.get(agent_id, {})
+        counters = {name: value - baseline.get(name, 0) for name, value in current.items()}
+        previous = self._counters.get(agent_id, {})
+        self._counters[agent_id] = counters
+        for name in EVENT_COUNTERS:
+            if counters.get(name, 0) > previous.get(name, 0):
+                self._on_event(agent_id, name, counters[name])
+
+    def release(self, agent_id: str) -> None:
+        """Remove an agent's cgroup once its processes are gone (kept while any remain)."""
+        if self._root is not None:
+            with contextlib.suppress(OSError):
+                self._cgroup_dir(agent_id).rmdir()
+
+    def forget(self, agent_id: str) -> None:
+        """Drop an agent's limits info (agent removed)."""
+        self.release(agent_id)
+        self._applied.pop(agent_id, None)
+        self._baselines.pop(agent_id, None)
+        self._counters.pop(agent_id, None)
+
+    def start(self, running_agent_ids: Callable[[], list[str]]) -> None:
+        """Start polling the running agents' cgroup counters."""
+        if self._root is not None and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run(running_agent_ids))
+
+    def stop(self) -> None:
+        """Stop polling."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def _prepare_cgroup(self, agent_id: str, limits: ResourceLimits) -> list[str]:
+        """Create the agent's cgroup and set its limits.
+
+        Returns:
+            Limits whose controller is not available
+        """
+        assert self._root is not None
+        cgroup = self._cgroup_dir(agent_id)
+        cgroup.mkdir(exist_ok=True)
+        unenforced: list[str] = []
+        settings = {
+            "cpu_quota": (
+                "cpu.max",
+                f"{int(limits.cpu_quota * CPU_PERIOD_USEC)} {CPU_PERIOD_USEC}" if limits.cpu_quota else None,
+            ),
+            "memory_max_mb": ("memory.max", str(limits.memory_max_mb * 1024 * 1024) if limits.memory_max_mb else None),
+            "pids_max": ("pids.max", str(limits.pids_max) if limits.pids_max else None),
+        }
+        for key, (filename, value) in settings.items():
+            if _LIMIT_CONTROLLERS[key] not in self._controllers:
+                if value is not None:
+                    unenforced.append(key)
+                continue
+            # Reset limits a previous run of a reused cgroup may have left
+            (cgroup / filename).write_text(value or "max", encoding="utf-8")
+        self._baselines[agent_id] = self._read_counters(agent_id) or {}
+        self._counters[agent_id] = {}
+        return unenforced
+
+    def _read_counters(self, agent_id: str) -> dict[str, int] | None:
+        """Read an agent cgroup's event counters (None if the cgroup is gone)."""
+        cgroup = self._cgroup_dir(agent_id)
+        if not cgroup.is_dir():
+            return None
+        files: dict[str, dict[str, int]] = {}
+        counters: dict[str, int] = {}
+        for name, (filename, key) in _CGROUP_COUNTERS.items():
+            if filename not in files:
+                files[filename] = _read_flat_keyed(cgroup / filename)
+            if key in files[filename]:
+                counters[name] = files[filename][key]
+        return counters
+
+    def _cgroup_dir(self, agent_id: str) -> Path:
+        """cgroup directory of an agent."""
+        assert self._root is not None
+        return self._root / f"agent-{re.sub(r'[^A-Za-z0-9_.-]', '_', agent_id)}"
+
+    async def _run(self, running_agent_ids: Callable[[], list[str]]) -> None:
+        """Poll counters every LIMIT_POLL_INTERVAL until stopped."""
+        while True:
+            for agent_id in running_agent_ids():
+                self.poll(agent_id)
+            await asyncio.sleep(LIMIT_POLL_INTERVAL)
+
+
+def apply_to_self(request: dict[str, Any]) -> None:
+    """Apply prepared limits (LaunchLimits.to_request()) to the calling process.
+
+    Runs in the agent process before it runs the agent; failures are left
+    for LimitEnforcer.apply() to retry and report.
+    """
+    if request.get("cgroup_procs"):
+        with contextlib.suppress(OSError), open(request["cgroup_procs"], "w", encoding="utf-8") as f:
+            f.write(str(os.getpid()))
+    for rlimit, value in request.get("rlimits", ()):
+        with contextlib.suppress(OSError, ValueError):
+            resource.setrlimit(rlimit, (value, value))
+
+
+# ============================================================================
+# Private Helper Functions
+# ============================================================================
+
+
+def _own_cgroup_dir() -> Path | None:
+    """Return the daemon's cgroup v2 directory, None without a cgroup v2 mount."""
+    mount = None
+    with open("/proc/self/mountinfo", encoding="utf-8") as f:
+        for line in f:
+            fields = line.split()
+            separator = fields.index("-")
+            if fields[separator + 1] == "cgroup2":
+                mount = Path(fields[4])
+                break
+    if mount is None:
+        return None
+    with open("/proc/self/cgroup", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("0::"):
+                return mount / line[3:].strip().lstrip("/")
+    return None
+
+
+def _move_to_leaf(root: Path) -> None:
+    """Move the daemon from its own cgroup into a "daemon" leaf below it.
+
+    A cgroup with processes cannot enable controllers for its children
+    (except the root cgroup), so the daemon must leave it first.
+
+    Raises:
+        OSError: If other processes share the daemon's cgroup (it is not
+            delegated to the daemon), or moving fails
+    """
+    if not (root / "cgroup.type").exists():
+        return  # Root cgroup: the restriction does not apply
+    members = (root / "cgroup.procs").read_text(encoding="utf-8").split()
+    if members and members != [str(os.getpid())]:
+        raise OSError(f"daemon is not alone in {root}; set {CGROUP_ROOT_ENV} to a delegated cgroup")
+    if members:
+        leaf = root / "daemon"
+        leaf.mkdir(exist_ok=True)
+        (leaf / "cgroup.procs").write_text(str(os.getpid()), encoding="utf-8")
+
+
+def _read_flat_keyed(path: Path) -> dict[str, int]:
+    """Parse a flat keyed cgroup file ("key value" lines); empty if unreadable."""
+    values: dict[str, int] = {}
+    try:
+        for line in path.read_text(encoding="utf-8").splitlines():
+            key, _, value = line.partition(" ")
+            with contextlib.suppress(ValueError):
+                values[key] = int(value)
+    except OSError:
+        return {}
+    return values
+
+
+def _rlimit_values(limits: ResourceLimits) -> tuple[tuple[tuple[str, int, int], ...], list[str]]:
+    """Compute the rlimits for an agent.
+
+    Returns:
+        (limit name, resource, value) for each rlimit, and the limits that
+        have no rlimit equivalent
+    """
+    unenforced: list[str] = []
+    if limits.cpu_quota is not None:
+        unenforced.append("cpu_quota")
+    rlimits: list[tuple[str, int, int]] = []
+    if limits.memory_max_mb is not None:
+        rlimits.append(("memory_max_mb", resource.RLIMIT_DATA, limits.memory_max_mb * 1024 * 1024))
+    if limits.pids_max is not None:
+        rlimits.append(("pids_max", resource.RLIMIT_NPROC, _count_user_threads(os.getuid()) + limits.pids_max))
+    return tuple(rlimits), unenforced
+
+
+def _apply_rlimits(pid: int, rlimits: tuple[tuple[str, int, int], ...]) -> list[str]:
+    """Set rlimits on an agent process.
+
+    Returns:
+        Limits that could not be applied
+    """
+    unenforced: list[str] = []
+    for key, rlimit, value in rlimits:
+        try:
+            resource.prlimit(pid, rlimit, (value, value))
+        except ProcessLookupError:
+            break  # Already exited
+        except (OSError, ValueError) as e:
+            logger.warning("Failed to set %s on PID %d: %s", key, pid, e)
+            unenforced.append(key)
+    return unenforced
+
+
+def _count_user_threads(uid: int) -> int:
+    """Count the threads of a user (what RLIMIT_NPROC is checked against)."""
+    count = 0
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            with contextlib.suppress(OSError):  # Process exited while scanning
+                if os.stat(f"/proc/{entry}").st_uid == uid:
+                    count += len(os.listdir(f"/proc/{entry}/task"))
+    return count
+
+
+def _exec_with_limits() -> None:
+    """Exec shim (see LaunchLimits.wrap_command()): apply the limits, then exec the agent command."""
+    request, *cmd = sys.argv[1:]
+    apply_to_self(json.loads(request))
+    os.execvp(cmd[0], cmd)
+
+
+if __name__ == "__main__":
+    _exec_with_limits()
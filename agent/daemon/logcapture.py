@@ -0,0 +1,415 @@
+"""
+Agent Log Capture
+=================
+
+Agent output goes through a pipe that the daemon reads, instead of
+straight into the log file. The daemon timestamps every line, rate-limits
+floods and writes the lines to the log file in batches, and keeps the most
+recent ones in memory for fast attach (subscribe_logs with "tail").
+
+- Each line is prefixed with the ISO time the daemon read it.
+- At most HARNESS_LOG_LINE_RATE lines per second (default 1000, burst of
+  one second, 0 = unlimited) are kept per agent. Once per second of flood
+  the number of dropped lines is logged instead ("... 8,412 lines
+  suppressed").
+- Lines are appended every LOG_FLUSH_INTERVAL seconds in one write, in a
+  worker thread (with rotation), so a slow disk does not stall the loop.
+- The last LOG_RING_LINES written lines stay in a ring buffer with their
+  byte offsets in the log.
+- The log is rotated, compressed and kept within the agent's retention
+  budget (see logrotate.py).
+
+The pipe is a FIFO next to the daemon socket that the agent opens read-write, so it never
+gets EPIPE while no daemon reads it: after a daemon restart or upgrade the
+new daemon reopens the FIFO and carries on (the agent blocks if the pipe
+fills up in between). HARNESS_LOG_CAPTURE=0 writes output straight to the
+log file as before.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import fcntl
+import logging
+import os
+import stat
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from .logrotate import (
+    LogManifest,
+    RotationPolicy,
+    compress_segment,
+    enforce_retention,
+    mark_compressed,
+    run_agent_id,
+    uncompressed_segments,
+)
+
+logger = logging.getLogger(__name__)
+
+LOG_CAPTURE_ENV = "HARNESS_LOG_CAPTURE"
+LOG_LINE_RATE_ENV = "HARNESS_LOG_LINE_RATE"
+DEFAULT_LOG_LINE_RATE = 1000.0
+
+# Seconds between batched writes to the log file
+LOG_FLUSH_INTERVAL = 0.1
+
+# Lines kept in memory per agent for fast attach
+LOG_RING_LINES = 2000
+
+# Longer lines are split (a process writing without newlines is still logged)
+MAX_LINE_BYTES = 64 * 1024
+
+# Bytes read from the pipe at once, and reads per wakeup (a flooding agent cannot starve the loop)
+_READ_BYTES = 64 * 1024
+_READS_PER_WAKEUP = 4
+
+# Pipe buffer the agent can fill while no daemon reads (Linux F_SETPIPE_SZ)
+_PIPE_BUFFER_BYTES = 1024 * 1024
+_F_SETPIPE_SZ = getattr(fcntl, "F_SETPIPE_SZ", 1031)
+
+
+class LogCapture:
+    """Reads one agent run's output pipe and writes timestamped lines to its log file."""
+
+    def __init__(
+        self,
+        pipe_path: Path,
+        log_file: Path,
+        line_rate: float,
+        policy: RotationPolicy,
+        on_write: Callable[[], None] | None = None,
+    ) -> None:
+        """Initialize the capture.
+
+        Args:
+            pipe_path: FIFO the agent writes to
+            log_file: Log file the lines are appended to
+            line_rate: Lines per second kept before a flood is suppressed (0 = unlimited)
+            policy: Rotation and retention of the agent's logs
+            on_write: Called on the event loop after each write (wakes log subscribers)
+        """
+        self.pipe_path = pipe_path
+        self.log_file = log_file
+        self.line_rate = line_rate
+        self._policy = policy
+        self._on_write = on_write
+        self._base = 0  # Offset of the live file in the run's log (see logrotate.py)
+        self._segment_opened = time.monotonic()
+        self._archive_lock = asyncio.Lock()
+        self._archive_tasks: set[asyncio.Task[None]] = set()
+        self._pipe_fd: int | None = None
+        self._log_fd: int | None = None
+        self._partial = b""
+        self._batch: list[bytes] = []
+        self._ring: deque[tuple[int, bytes]] = deque(maxlen=LOG_RING_LINES)  # (start offset, line)
+        self._ring_lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+        # Batches are written in worker threads (and by close() on the loop);
+        # the sequence numbers keep them in order
+        self._write_cond = threading.Condition()
+        self._next_seq = 0
+        self._written_seq = 0
+        self._tokens = line_rate
+        self._refilled = time.monotonic()
+        self._suppressed = 0
+        self._flood_started: float | None = None
+        self._flush_task: asyncio.Task[None] | None = None
+        self.lines = 0
+        self.suppressed_total = 0
+        self.rotations = 0
+
+    @classmethod
+    def create(
+        cls, pipe_dir: Path, name: str, log_file: Path, on_write: Callable[[], None] | None = None
+    ) -> LogCapture | None:
+        """Make a FIFO for a new agent run and start reading it.
+
+        Returns:
+            The running capture, None if capture is disabled or the FIFO
+            cannot be made (the agent then writes to the log file directly).
+        """
+        if os.environ.get(LOG_CAPTURE_ENV, "1") == "0":
+            return None
+        pipe_path = pipe_dir / f"{name}.pipe"
+        try:
+            pipe_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+            with contextlib.suppress(FileNotFoundError):
+                pipe_path.unlink()
+            os.mkfifo(pipe_path, 0o600)
+        except OSError as e:
+            logger.warning("Log capture unavailable, writing agent output directly: %s", e)
+            return None
+        capture = cls(pipe_path, log_file, line_rate_from_env(), RotationPolicy.from_env(), on_write)
+        try:
+            capture.start()
+        except OSError as e:
+            logger.warning("Log capture unavailable, writing agent output directly: %s", e)
+            capture.remove_pipe()
+            return None
+        capture.archive()  # Earlier runs' logs
+        return capture
+
+    @classmethod
+    def reattach(cls, pipe_path: Path, log_file: Path, on_write: Callable[[], None] | None = None) -> LogCapture | None:
+        """Resume reading the FIFO of a running agent (daemon restart or upgrade).
+
+        Returns:
+            The running capture, None if the FIFO is gone.
+        """
+        try:
+            if not stat.S_ISFIFO(pipe_path.stat().st_mode):
+                return None
+            capture = cls(pipe_path, log_file, line_rate_from_env(), RotationPolicy.from_env(), on_write)
+            capture.start()
+        except OSError as e:
+            logger.warning("Cannot resume log capture from %s: %s", pipe_path, e)
+            return None
+        return capture
+
+    def start(self) -> None:
+        """Open the pipe and the log file and start reading (again, after close(remove_pipe=False))."""
+        self._pipe_fd = os.open(self.pipe_path, os.O_RDONLY | os.O_NONBLOCK)
+        with contextlib.suppress(OSError):
+            fcntl.fcntl(self._pipe_fd, _F_SETPIPE_SZ, _PIPE_BUFFER_BYTES)
+        self._log_fd = os.open(self.log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._base = LogManifest.load(self.log_file).live_start
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(self._pipe_fd, self._on_readable)
+        self._flush_task = asyncio.create_task(self._flush_periodically())
+
+    def tail(self, lines: int) -> tuple[int, bytes] | None:
+        """The last lines written to the log file, from memory.
+
+        Returns:
+            Tuple of (byte offset where they start, data), None if nothing was written yet.
+        """
+        with self._ring_lock:
+            recent = list(self._ring)[-lines:] if lines > 0 else []
+        if not recent:
+            return None
+        return recent[0][0], b"".join(line for _, line in recent)
+
+    def stats(self) -> dict[str, Any]:
+        """Captured and suppressed line counts."""
+        return {
+            "lines": self.lines,
+            "suppressed": self.suppressed_total,
+            "line_rate": self.line_rate,
+            "rotations": self.rotations,
+        }
+
+    def archive(self) -> None:
+        """Compress the agent's closed log segments and earlier runs and apply its retention budget.
+
+        Runs in the background, one archive pass at a time.
+        """
+        task = asyncio.create_task(self._archive())
+        self._archive_tasks.add(task)
+        task.add_done_callback(self._archive_tasks.discard)
+
+    def close(self, remove_pipe: bool = True) -> None:
+        """Stop reading: take what is in the pipe now, write everything out and close.
+
+        Writes synchronously (after a background write still in flight), so
+        the output is in the log file when this returns.
+
+        Args:
+            remove_pipe: Delete the FIFO (run ended); False leaves it for the
+                next daemon to reattach (upgrade, shutdown with keep_agents)
+        """
+        if self._pipe_fd is None:
+            return
+        asyncio.get_running_loop().remove_reader(self._pipe_fd)
+        self._drain(_PIPE_BUFFER_BYTES)
+        if self._partial:
+            self._add_line(self._partial + b"\n")
+            self._partial = b""
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+        self._summarize_suppressed()
+        self._write(*self._take_batch())
+        os.close(self._pipe_fd)
+        self._pipe_fd = None
+        if self._log_fd is not None:
+            os.close(self._log_fd)
+            self._log_fd = None
+        if remove_pipe:
+            self.remove_pipe()
+
+    def remove_pipe(self) -> None:
+        """Delete the FIFO."""
+        with contextlib.suppress(FileNotFoundError):
+            self.pipe_path.unlink()
+
+    def _on_readable(self) -> None:
+        """Read available output (event loop reader callback)."""
+        self._drain(_READS_PER_WAKEUP * _READ_BYTES)
+
+    def _drain(self, max_bytes: int) -> None:
+        """Read the pipe until it is empty or max_bytes were read, and queue the complete lines."""
+        while self._pipe_fd is not None and max_bytes > 0:
+            try:
+                data = os.read(self._pipe_fd, _READ_BYTES)
+            except BlockingIOError:
+                return
+            except OSError as e:
+                logger.warning("Reading agent output from %s failed: %s", self.pipe_path, e)
+                return
+            max_bytes -= len(data)
+            if not data:
+                # The agent and its children closed the pipe: stop polling a hung-up fd
+                asyncio.get_running_loop().remove_reader(self._pipe_fd)
+                return
+            lines = (self._partial + data).split(b"\n")
+            self._partial = lines.pop()
+            for line in lines:
+                self._add_line(line + b"\n")
+            while len(self._partial) >= MAX_LINE_BYTES:
+                self._add_line(self._partial[:MAX_LINE_BYTES] + b"\n")
+                self._partial = self._partial[MAX_LINE_BYTES:]
+
+    def _add_line(self, line: bytes) -> None:
+        """Timestamp a line and queue it, unless the agent exceeds its line rate."""
+        now = time.monotonic()
+        if self.line_rate:
+            self._tokens = min(self.line_rate, self._tokens + (now - self._refilled) * self.line_rate)
+            self._refilled = now
+            if self._tokens < 1:
+                self._suppressed += 1
+                self.suppressed_total += 1
+                if self._flood_started is None:
+                    self._flood_started = now
+                return
+            self._tokens -= 1
+        self.lines += 1
+        self._batch.append(_timestamp() + line)
+
+    def _summarize_suppressed(self) -> None:
+        """Log the number of lines dropped since the last summary."""
+        if self._suppressed:
+            self._batch.append(_timestamp() + f"... {self._suppressed:,} lines suppressed\n".encode())
+            self._suppressed = 0
+        self._flood_started = None
+
+    async def _flush_periodically(self) -> None:
+        """Write the batch every LOG_FLUSH_INTERVAL seconds, and flood summaries once a second."""
+        while True:
+            await asyncio.sleep(LOG_FLUSH_INTERVAL)
+            if self._flood_started is not None and time.monotonic() - self._flood_started >= 1.0:
+                self._summarize_suppressed()
+            if self._batch:
+                await asyncio.to_thread(self._write, *self._take_batch())
+
+    def _take_batch(self) -> tuple[int, list[bytes]]:
+        """Take the batched lines with the sequence number of their write (on the event loop)."""
+        batch, self._batch = self._batch, []
+        self._next_seq += 1
+        return self._next_seq, batch
+
+    def _write(self, seq: int, batch: list[bytes]) -> None:
+        """Write a batch after all earlier ones (any thread)."""
+        with self._write_cond:
+            self._write_cond.wait_for(lambda: self._written_seq == seq - 1)
+            try:
+                self._append(batch)
+            finally:
+                self._written_seq = seq
+                self._write_cond.notify_all()
+
+    def _append(self, batch: list[bytes]) -> None:
+        """Append lines to the log file, remember them in the ring buffer and rotate when due."""
+        if not batch or self._log_fd is None:
+            return
+        data = b"".join(batch)
+        try:
+            end = _write_all(self._log_fd, data)
+        except OSError as e:
+            logger.warning("Writing agent log %s failed: %s", self.log_file, e)
+            return
+        offset = self._base + end - len(data)
+        with self._ring_lock:
+            for line in batch:
+                self._ring.append((offset, line))
+                offset += len(line)
+        rotated = self._policy.due(end, time.monotonic() - self._segment_opened)
+        if rotated:
+            self._rotate()
+        assert self._loop is not None
+        self._loop.call_soon_threadsafe(self._written, rotated)
+
+    def _written(self, rotated: bool) -> None:
+        """Follow up a write on the event loop: archive after a rotation and wake subscribers."""
+        if rotated:
+            self.archive()
+        if self._on_write:
+            self._on_write()
+
+    def _rotate(self) -> None:
+        """Close the live log file as a segment and continue in a new one."""
+        assert self._log_fd is not None
+        os.close(self._log_fd)
+        self._log_fd = None
+        self._segment_opened = time.monotonic()
+        try:
+            manifest = LogManifest.load(self.log_file)
+            manifest.rotate()
+            self._base = manifest.live_start
+            self.rotations += 1
+        except OSError as e:
+            logger.warning("Rotating agent log %s failed: %s", self.log_file, e)
+        try:
+            self._log_fd = os.open(self.log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        except OSError as e:
+            logger.warning("Cannot reopen agent log %s, dropping output: %s", self.log_file, e)
+
+    async def _archive(self) -> None:
+        """Compress pending segments in a worker thread, then delete the oldest ones over budget."""
+        agent_id = run_agent_id(self.log_file)
+        if agent_id is None:
+            return
+        log_dir = self.log_file.parent
+        async with self._archive_lock:
+            try:
+                for segment in uncompressed_segments(log_dir, agent_id, self.log_file):
+                    index = await asyncio.to_thread(compress_segment, segment)
+                    mark_compressed(segment, index)
+                enforce_retention(log_dir, agent_id, self.log_file, self._policy.retention_bytes)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.warning("Archiving logs of %s failed: %s", agent_id, e)
+
+
+def line_rate_from_env() -> float:
+    """Read the per-agent line rate limit from the environment."""
+    try:
+        return max(float(os.environ.get(LOG_LINE_RATE_ENV, DEFAULT_LOG_LINE_RATE)), 0.0)
+    except ValueError:
+        return DEFAULT_LOG_LINE_RATE
+
+
+# ============================================================================
+# Private Helper Functions
+# ============================================================================
+
+
+def _timestamp() -> bytes:
+    """Line prefix with the current time."""
+    return datetime.now(UTC).isoformat(timespec="milliseconds").encode() + b" "
+
+
+def _write_all(fd: int, data: bytes) -> int:
+    """Append data to a file and return the file size after it."""
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+    return os.fstat(fd).st_size
@@ -0,0 +1,426 @@
+"""
+Agent Log Rotation
+==================
+
+Bounds the disk used by agent logs. The live log file of a captured run
+(see logcapture.py) is rotated into numbered segments once it exceeds
+HARNESS_LOG_SEGMENT_BYTES or is older than HARNESS_LOG_SEGMENT_AGE
+seconds. Closed segments, and the logs of an agent's earlier runs, are
+gzip-compressed in a worker thread; the agent's oldest segments are then
+deleted while all its logs together exceed HARNESS_LOG_RETENTION_BYTES.
+
+A rotated run keeps its log path for the live file and gets a manifest
+next to it (<agent_id>-<timestamp>.manifest.json):
+
+    {"segments": [{"file": "a1-20260101-120000.0001.log.gz", "start": 0, "bytes": 67108864,
+                   "compression": "gzip", "index": [[0, 0], [1048576, 201733], ...], ...}, ...],
+     "live": {"file": "a1-20260101-120000.log", "start": 134217728}}
+
+Offsets into a log (the "offset" of subscribe_logs) count bytes of the
+whole run across its segments. A compressed segment is a series of
+independent gzip members of COMPRESS_BLOCK_BYTES each, and "index" maps
+their uncompressed offsets to file positions, so LogReader only
+decompresses the block it needs. Deleted segments stay in the manifest
+("deleted": true) to keep offsets stable; reading them skips ahead to the
+oldest data kept. A log without a manifest is a plain file.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import os
+import re
+import zlib
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+LOG_SEGMENT_BYTES_ENV = "HARNESS_LOG_SEGMENT_BYTES"
+LOG_SEGMENT_AGE_ENV = "HARNESS_LOG_SEGMENT_AGE"
+LOG_RETENTION_BYTES_ENV = "HARNESS_LOG_RETENTION_BYTES"
+
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+DEFAULT_SEGMENT_AGE = 24 * 3600.0
+DEFAULT_RETENTION_BYTES = 512 * 1024 * 1024
+
+# Uncompressed bytes per gzip member of a compressed segment (unit of random access)
+COMPRESS_BLOCK_BYTES = 1024 * 1024
+
+# Bytes of a log shown by viewers (read_log_tail)
+LOG_TAIL_BYTES = 4 * 1024 * 1024
+
+# Manifest reloads when a read races a compression or rotation
+_READ_ATTEMPTS = 3
+
+# <agent_id>-<YYYYmmdd-HHMMSS>[.<segment>].log[.gz] and .manifest.json
+_RUN_NAME = r"-(\d{8}-\d{6})(?:\.(\d+))?\.(log|log\.gz|manifest\.json)"
+_RUN_STEM = re.compile(r"(.+)-(\d{8}-\d{6})")
+
+
+@dataclass
+class RotationPolicy:
+    """When to rotate an agent's log and how much of its logs to keep (0 = no limit)."""
+
+    segment_bytes: int = DEFAULT_SEGMENT_BYTES
+    segment_age: float = DEFAULT_SEGMENT_AGE  # Seconds
+    retention_bytes: int = DEFAULT_RETENTION_BYTES  # Per agent, all runs
+
+    @classmethod
+    def from_env(cls) -> RotationPolicy:
+        """Create a policy from the HARNESS_LOG_SEGMENT_* and HARNESS_LOG_RETENTION_BYTES variables."""
+        return cls(
+            segment_bytes=int(_env_number(LOG_SEGMENT_BYTES_ENV, DEFAULT_SEGMENT_BYTES)),
+            segment_age=_env_number(LOG_SEGMENT_AGE_ENV, DEFAULT_SEGMENT_AGE),
+            retention_bytes=int(_env_number(LOG_RETENTION_BYTES_ENV, DEFAULT_RETENTION_BYTES)),
+        )
+
+    def due(self, size: int, age: float) -> bool:
+        """Whether a live log of this size (bytes) and age (seconds) should be rotated."""
+        if size <= 0:
+            return False
+        return bool(self.segment_bytes and size >= self.segment_bytes) or bool(
+            self.segment_age and age >= self.segment_age
+        )
+
+
+class LogManifest:
+    """The segments of one agent run's log."""
+
+    def __init__(self, log_file: Path, segments: list[dict[str, Any]], live: dict[str, Any] | None) -> None:
+        """Initialize the manifest.
+
+        Args:
+            log_file: The run's (live) log file
+            segments: Closed segments, oldest first
+            live: {"file", "start"} of the live file, None once the run was archived
+        """
+        self.log_file = log_file
+        self.segments = segments
+        self.live = live
+
+    @property
+    def path(self) -> Path:
+        """Manifest file of the run."""
+        return manifest_path(self.log_file)
+
+    @property
+    def live_start(self) -> int:
+        """Offset of the live file's first byte in the run's log."""
+        if self.live is not None:
+            return self.live["start"]
+        return self.segments[-1]["start"] + self.segments[-1]["bytes"] if self.segments else 0
+
+    @classmethod
+    def load(cls, log_file: Path) -> LogManifest:
+        """Read a run's manifest; a run without one is a single live file."""
+        try:
+            data = json.loads(manifest_path(log_file).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return cls(log_file, [], {"file": log_file.name, "start": 0})
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning("Cannot read log manifest of %s: %s", log_file, e)
+            return cls(log_file, [], {"file": log_file.name, "start": 0})
+        return cls(log_file, data.get("segments", []), data.get("live"))
+
+    def save(self) -> None:
+        """Write the manifest atomically (readers never see a partial file)."""
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps({"segments": self.segments, "live": self.live}, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def rotate(self, keep_live: bool = True) -> Path | None:
+        """Close the live file as the next segment.
+
+        Args:
+            keep_live: Continue the run in a new (empty) live file; False
+                archives the run
+
+        Returns:
+            The new segment's path, None if the live file was missing or empty.
+        """
+        start = self.live_start
+        try:
+            size = self.log_file.stat().st_size
+        except FileNotFoundError:
+            size = 0
+        segment = None
+        if size:
+            segment = self.log_file.with_name(f"{self.log_file.stem}.{len(self.segments) + 1:04d}.log")
+            os.rename(self.log_file, segment)
+            self.segments.append(
+                {
+                    "file": segment.name,
+                    "start": start,
+                    "bytes": size,
+                    "compression": None,
+                    "closed_at": datetime.now(UTC).isoformat(),
+                }
+            )
+        if keep_live:
+            self.live = {"file": self.log_file.name, "start": start + size}
+        else:
+            self.live = None
+            with contextlib.suppress(FileNotFoundError):
+                self.log_file.unlink()  # Empty live file
+        self.save()
+        return segment
+
+
+class LogReader:
+    """Reads a (possibly rotated) run log by offset, e.g. for one log subscriber.
+
+    Reads do file I/O and decompression: run them in a worker thread. The
+    last decompressed block is kept, so reading a compressed segment in
+    chunks smaller than COMPRESS_BLOCK_BYTES decompresses each block once.
+    """
+
+    def __init__(self, log_file: Path) -> None:
+        self.log_file = log_file
+        self._block: tuple[str, int, bytes] | None = None  # (segment file, block, data)
+
+    def read(self, offset: int, size: int) -> tuple[int, bytes]:
+        """Read up to size bytes from an offset, within one segment.
+
+        The manifest is reloaded and the read retried when a segment was
+        compressed or rotated meanwhile; only a segment still missing then
+        (deleted by retention) is skipped.
+
+        Returns:
+            Tuple of (offset the data starts at, data); data is empty at the
+            end of the log. The offset is past the requested one if that part
+            of the log was deleted.
+        """
+        for attempt in range(_READ_ATTEMPTS):
+            result = self._read(LogManifest.load(self.log_file), offset, size, attempt == _READ_ATTEMPTS - 1)
+            if result is not None:
+                return result
+        return offset, b""
+
+    def _read(self, manifest: LogManifest, offset: int, size: int, last: bool) -> tuple[int, bytes] | None:
+        """One read attempt against a manifest; None if the manifest went stale."""
+        for segment in manifest.segments:
+            end = segment["start"] + segment["bytes"]
+            if offset >= end or segment.get("deleted"):
+                continue
+            begin = max(offset, segment["start"])
+            try:
+                return begin, self._read_segment(segment, begin, size)
+            except FileNotFoundError:
+                if not last:
+                    return None  # Compressed, or deleted by retention, since the manifest was read
+        if manifest.live is None:
+            return offset, b""
+        begin = max(offset, manifest.live["start"])
+        try:
+            with open(self.log_file, "rb") as f:
+                # A rotation between loading the manifest and opening the file
+                # moves the live start: the file opened may be the new live file
+                if LogManifest.load(self.log_file).live_start != manifest.live_start:
+                    return None
+                f.seek(begin - manifest.live["start"])
+                return begin, f.read(size)
+        except FileNotFoundError:
+            return None if not last else (offset, b"")
+
+    def _read_segment(self, segment: dict[str, Any], offset: int, size: int) -> bytes:
+        """Read from a closed segment; a compressed one only decompresses the block holding offset."""
+        path = self.log_file.with_name(segment["file"])
+        position = offset - segment["start"]
+        if not segment.get("compression"):
+            with open(path, "rb") as f:
+                f.seek(position)
+                return f.read(min(size, segment["bytes"] - position))
+
+        index = segment["index"]
+        block = max(i for i, (start, _) in enumerate(index) if start <= position)
+        block_start, file_start = index[block]
+        if self._block is None or self._block[:2] != (segment["file"], block):
+            with open(path, "rb") as f:
+                f.seek(file_start)
+                compressed = f.read(index[block + 1][1] - file_start) if block + 1 < len(index) else f.read()
+            self._block = (segment["file"], block, zlib.decompress(compressed, 31))
+        data = self._block[2]
+        return data[position - block_start : position - block_start + size]
+
+
+def manifest_path(log_file: Path) -> Path:
+    """Manifest file of a run's log."""
+    return log_file.with_name(f"{log_file.stem}.manifest.json")
+
+
+def log_size(log_file: Path) -> int:
+    """Length of a (possibly rotated) run log in bytes."""
+    manifest = LogManifest.load(log_file)
+    if manifest.live is None:
+        return manifest.live_start
+    try:
+        return manifest.live_start + log_file.stat().st_size
+    except FileNotFoundError:
+        return manifest.live_start
+
+
+def read_log_tail(log_file: Path, max_bytes: int = LOG_TAIL_BYTES) -> tuple[int, str]:
+    """The end of a (possibly rotated) run log, for viewers; only the segments it spans are read.
+
+    Returns:
+        Tuple of (offset of the text in the log, text). When the log is
+        longer than max_bytes the text starts at a line boundary.
+    """
+    reader = LogReader(log_file)
+    end = log_size(log_file)
+    start = offset = max(end - max_bytes, 0)
+    chunks = []
+    while offset < end:
+        begin, data = reader.read(offset, end - offset)
+        if not data:
+            break
+        if not chunks:
+            start = begin
+        chunks.append(data)
+        offset = begin + len(data)
+    data = b"".join(chunks)
+    if start > 0 and (newline := data.find(b"\n")) >= 0:
+        start, data = start + newline + 1, data[newline + 1 :]
+    return start, data.decode("utf-8", errors="replace")
+
+
+def compress_segment(path: Path) -> list[list[int]]:
+    """Gzip a closed segment into <path>.gz, in COMPRESS_BLOCK_BYTES members (runs in a worker thread).
+
+    Returns:
+        The block index: [uncompressed offset, compressed offset] per member.
+    """
+    target = path.with_name(path.name + ".gz")
+    tmp = target.with_name(target.name + ".tmp")
+    index = []
+    with open(path, "rb") as src, open(tmp, "wb") as dst:
+        position = 0
+        while block := src.read(COMPRESS_BLOCK_BYTES):
+            index.append([position, dst.tell()])
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip member
+            dst.write(compressor.compress(block) + compressor.flush())
+            position += len(block)
+        dst.flush()
+        os.fsync(dst.fileno())
+    os.replace(tmp, target)
+    return index
+
+
+def run_agent_id(log_file: Path) -> str | None:
+    """Agent ID from a run's log file name (<agent_id>-<timestamp>.log)."""
+    match = _RUN_STEM.fullmatch(log_file.stem)
+    return match.group(1) if match else None
+
+
+def agent_logs(log_dir: Path, agent_id: str) -> dict[str, list[Path]]:
+    """Log files of an agent in a log directory, by run timestamp (oldest run first)."""
+    pattern = re.compile(re.escape(agent_id) + _RUN_NAME)
+    runs: dict[str, list[Path]] = {}
+    with contextlib.suppress(FileNotFoundError):
+        for path in log_dir.iterdir():
+            match = pattern.fullmatch(path.name)
+            if match:
+                runs.setdefault(match.group(1), []).append(path)
+    return dict(sorted(runs.items()))
+
+
+def uncompressed_segments(log_dir: Path, agent_id: str, current: Path) -> list[Path]:
+    """Close the logs of an agent's earlier runs and list its segments still to compress.
+
+    Args:
+        log_dir: The agent's log directory
+        agent_id: Agent whose logs are archived
+        current: Live log of the current run (left alone)
+    """
+    pending = []
+    for stamp in agent_logs(log_dir, agent_id):
+        log_file = log_dir / f"{agent_id}-{stamp}.log"
+        manifest = LogManifest.load(log_file)
+        if log_file != current and manifest.live is not None:
+            try:
+                manifest.rotate(keep_live=False)
+            except OSError as e:
+                logger.warning("Cannot archive log %s: %s", log_file, e)
+                continue
+        pending.extend(
+            log_dir / segment["file"]
+            for segment in manifest.segments
+            if not segment.get("compression") and not segment.get("deleted")
+        )
+    return pending
+
+
+def mark_compressed(segment_path: Path, index: list[list[int]]) -> None:
+    """Point a run's manifest at the compressed copy of a segment and delete the original."""
+    run = segment_path.with_suffix("").with_suffix(".log")  # <run>.0001.log -> <run>.log
+    manifest = LogManifest.load(run)
+    for segment in manifest.segments:
+        if segment["file"] == segment_path.name:
+            segment.update(file=segment_path.name + ".gz", compression="gzip", index=index)
+    manifest.save()
+    with contextlib.suppress(FileNotFoundError):
+        segment_path.unlink()
+
+
+def enforce_retention(log_dir: Path, agent_id: str, current: Path, budget: int) -> int:
+    """Delete an agent's oldest log segments while all its logs exceed the budget.
+
+    The live log of the current run is counted but never deleted.
+
+    Returns:
+        Number of bytes freed.
+    """
+    if budget <= 0:
+        return 0
+    runs = agent_logs(log_dir, agent_id)
+    total = 0
+    for paths in runs.values():
+        for path in paths:
+            with contextlib.suppress(FileNotFoundError):
+                total += path.stat().st_size
+    freed = 0
+    for stamp in runs:
+        if total - freed <= budget:
+            break
+        log_file = log_dir / f"{agent_id}-{stamp}.log"
+        manifest = LogManifest.load(log_file)
+        if not manifest.path.exists():
+            continue  # A run that was never rotated or archived (capture off): left alone
+        for segment in manifest.segments:
+            if total - freed <= budget:
+                break
+            if segment.get("deleted"):
+                continue
+            path = log_dir / segment["file"]
+            try:
+                freed += path.stat().st_size
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            segment["deleted"] = True
+        if manifest.live is None and all(segment.get("deleted") for segment in manifest.segments):
+            manifest.path.unlink()
+        else:
+            manifest.save()
+    if freed:
+        logger.info("Deleted %d bytes of old logs of agent %s (retention budget %d bytes)", freed, agent_id, budget)
+    return freed
+
+
+# ============================================================================
+# Private Helper Functions
+# ============================================================================
+
+
+def _env_number(name: str, default: float) -> float:
+    """Read a non-negative number from the environment (default if unset or invalid)."""
+    try:
+        return max(float(os.environ.get(name, default)), 0.0)
+    except ValueError:
+        logger.warning("Ignoring invalid %s=%r", name, os.environ.get(name))
+        return default
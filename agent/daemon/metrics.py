@@ -0,0 +1,283 @@
+"""
+Daemon Metrics
+==============
+
+Prometheus text-format metrics (exposition format 0.0.4) for running the
+harness unattended: agent counts by status, per-agent session counts and
+durations, checkpoint wait times, agent restarts and daemon command
+latency.
+
+DaemonMetrics collects the counters and histograms from what the daemon
+already sees (commands, session leases, its own events); gauges of the
+current state are rendered by the daemon at scrape time. They are served
+by the "metrics" socket command and, when HARNESS_METRICS_PORT (or
+--metrics-port) is set, on http://127.0.0.1:<port>/metrics.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import math
+import os
+import socket
+from collections import Counter
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from .events import EventType
+
+logger = logging.getLogger(__name__)
+
+METRICS_PORT_ENV = "HARNESS_METRICS_PORT"
+
+# The HTTP endpoint only listens locally
+METRICS_HOST = "127.0.0.1"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Histogram buckets (seconds)
+COMMAND_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+SESSION_BUCKETS = (10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1200.0, 1800.0, 3600.0, 7200.0)
+CHECKPOINT_WAIT_BUCKETS = (30.0, 60.0, 300.0, 900.0, 1800.0, 3600.0, 4 * 3600.0, 12 * 3600.0, 24 * 3600.0)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+@dataclass
+class _HistogramSeries:
+    """Observations of one label set."""
+
+    bucket_counts: list[int]
+    total: float = 0.0
+    count: int = 0
+
+
+class Histogram:
+    """Cumulative histogram per label set."""
+
+    def __init__(self, name: str, help_text: str, buckets: tuple[float, ...]) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series: dict[Labels, _HistogramSeries] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one observation."""
+        key = tuple(sorted(labels.items()))
+        series = self._series.setdefault(key, _HistogramSeries([0] * len(self.buckets)))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series.bucket_counts[i] += 1
+        series.total += value
+        series.count += 1
+
+    def forget(self, label: str, value: str) -> None:
+        """Drop every series with a label value (e.g. a removed agent)."""
+        for key in [key for key in self._series if (label, value) in key]:
+            del self._series[key]
+
+    def render(self) -> list[str]:
+        """Render the histogram's exposition lines."""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            for bound, count in zip(self.buckets, series.bucket_counts, strict=True):
+                lines.append(_sample(f"{self.name}_bucket", (*labels, ("le", _format_value(bound))), count))
+            lines.append(_sample(f"{self.name}_bucket", (*labels, ("le", "+Inf")), series.count))
+            lines.append(_sample(f"{self.name}_sum", labels, series.total))
+            lines.append(_sample(f"{self.name}_count", labels, series.count))
+        return lines
+
+
+class DaemonMetrics:
+    """Counters and histograms collected by the daemon."""
+
+    def __init__(self) -> None:
+        self.command_latency = Histogram(
+            "harness_daemon_command_duration_seconds", "Daemon command processing time.", COMMAND_BUCKETS
+        )
+        self.session_duration = Histogram(
+            "harness_agent_session_duration_seconds",
+            "Agent session (API conversation) durations by outcome.",
+            SESSION_BUCKETS,
+        )
+        self.checkpoint_wait = Histogram(
+            "harness_checkpoint_wait_seconds",
+            "Time HITL checkpoints waited for a human decision.",
+            CHECKPOINT_WAIT_BUCKETS,
+        )
+        self._starts: Counter[str] = Counter()
+        self._restarts: Counter[str] = Counter()
+        self._limit_events: Counter[tuple[str, str]] = Counter()
+
+    def on_event(self, event: dict[str, Any]) -> None:
+        """Update metrics from a daemon event (EventBus listener)."""
+        agent_id = event.get("agent_id", "")
+        if event["event"] == EventType.AGENT_STARTED:
+            if self._starts[agent_id]:
+                self._restarts[agent_id] += 1
+            self._starts[agent_id] += 1
+        elif event["event"] == EventType.CHECKPOINT_RESOLVED:
+            wait = _seconds_between(event.get("created_at"), event.get("resolved_at"))
+            if wait is not None:
+                self.checkpoint_wait.observe(
+                    wait, agent_id=agent_id, checkpoint_type=str(event.get("checkpoint_type") or "unknown")
+                )
+        elif event["event"] == EventType.LIMIT_EXCEEDED:
+            self._limit_events[(agent_id, str(event.get("limit")))] += 1
+
+    def forget(self, agent_id: str) -> None:
+        """Drop an agent's series (agent removed)."""
+        for histogram in (self.session_duration, self.checkpoint_wait):
+            histogram.forget("agent_id", agent_id)
+        self._starts.pop(agent_id, None)
+        self._restarts.pop(agent_id, None)
+        for key in [key for key in self._limit_events if key[0] == agent_id]:
+            del self._limit_events[key]
+
+    def render(self, gauges: Iterable[list[str]] = ()) -> str:
+        """Render all metrics in Prometheus text format.
+
+        Args:
+            gauges: Rendered gauge families (see gauge()) of current state
+        """
+        lines: list[str] = []
+        for family in gauges:
+            lines.extend(family)
+        lines.extend(
+            counter(
+                "harness_agent_starts_total",
+                "Agent process starts.",
+                [({"agent_id": agent_id}, count) for agent_id, count in sorted(self._starts.items())],
+            )
+        )
+        lines.extend(
+            counter(
+                "harness_agent_restarts_total",
+                "Agent starts after the first one (since the daemon started).",
+                [({"agent_id": agent_id}, self._restarts[agent_id]) for agent_id in sorted(self._starts)],
+            )
+        )
+        lines.extend(
+            counter(
+                "harness_agent_limit_events_total",
+                "OOM and resource limit events of agent cgroups.",
+                [
+                    ({"agent_id": agent_id, "limit": limit}, count)
+                    for (agent_id, limit), count in sorted(self._limit_events.items())
+                ],
+            )
+        )
+        lines.extend(self.session_duration.render())
+        lines.extend(self.checkpoint_wait.render())
+        lines.extend(self.command_latency.render())
+        return "\n".join(lines) + "\n"
+
+
+def gauge(name: str, help_text: str, samples: Iterable[tuple[dict[str, str], float]]) -> list[str]:
+    """Render a gauge family."""
+    return _family(name, help_text, "gauge", samples)
+
+
+def counter(name: str, help_text: str, samples: Iterable[tuple[dict[str, str], float]]) -> list[str]:
+    """Render a counter family."""
+    return _family(name, help_text, "counter", samples)
+
+
+def metrics_port_from_env() -> int | None:
+    """Read the metrics HTTP port from the environment (None if unset or invalid)."""
+    try:
+        port = int(os.environ.get(METRICS_PORT_ENV, "0"))
+    except ValueError:
+        return None
+    return port if 0 < port < 65536 else None
+
+
+async def start_http_server(
+    render: Callable[[], str], port: int | None = None, sock: socket.socket | None = None
+) -> asyncio.Server:
+    """Serve GET /metrics on METRICS_HOST:port, or on an already listening socket.
+
+    Args:
+        render: Returns the metrics text
+        port: TCP port
+        sock: Listening socket to serve on instead (daemon upgrade)
+
+    Returns:
+        The listening server
+    """
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=10.0)
+            method, path, *_ = head.split(b"\r\n", 1)[0].decode("latin-1").split(" ") + ["", ""]
+            if method == "GET" and path.split("?", 1)[0] in ("/metrics", "/"):
+                status, content_type, body = "200 OK", CONTENT_TYPE, render().encode()
+            else:
+                status, content_type, body = "404 Not Found", "text/plain", b"Not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+        except (TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    if sock is not None:
+        server = await asyncio.start_server(handle, sock=sock)
+        port = sock.getsockname()[1]
+    else:
+        server = await asyncio.start_server(handle, METRICS_HOST, port)
+    logger.info("Metrics on http://%s:%d/metrics", METRICS_HOST, port)
+    return server
+
+
+# ============================================================================
+# Private Helper Functions
+# ============================================================================
+
+
+def _family(name: str, help_text: str, metric_type: str, samples: Iterable[tuple[dict[str, str], float]]) -> list[str]:
+    """Render a metric family's HELP/TYPE lines and samples."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    lines.extend(_sample(name, tuple(labels.items()), value) for labels, value in samples)
+    return lines
+
+
+def _sample(name: str, labels: Labels, value: float) -> str:
+    """Render one sample line."""
+    if not labels:
+        return f"{name} {_format_value(value)}"
+    label_text = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+    return f"{name}{{{label_text}}} {_format_value(value)}"
+
+
+def _escape(value: str) -> str:
+    """Escape a label value."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value (integers without a fraction)."""
+    if isinstance(value, float) and not math.isfinite(value):
+        return "+Inf" if value > 0 else ("-Inf" if value < 0 else "NaN")
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _seconds_between(start: Any, end: Any) -> float | None:
+    """Seconds between two ISO timestamps (None if either is missing or invalid)."""
+    if not isinstance(start, str) or not isinstance(end, str):
+        return None
+    try:
+        return max((datetime.fromisoformat(end) - datetime.fromisoformat(start)).total_seconds(), 0.0)
+    except (ValueError, TypeError):
+        return None
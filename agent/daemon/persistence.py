@@ -0,0 +1,160 @@
+"""
+Daemon State Persistence
+========================
+
+Debounced, atomic writer for daemon_state.json.
+
+Changes are only marked on the event loop (schedule()); a background task
+waits STATE_SAVE_DELAY seconds so a burst of changes (e.g. many agents
+exiting at once) collapses into one write. The snapshot is taken on the
+event loop, the JSON encoding and the atomic write (temp file + fsync +
+rename) run in a worker thread. flush() writes synchronously and is used
+on shutdown.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Seconds to coalesce state changes before writing
+STATE_SAVE_DELAY = 0.5
+
+
+class StatePersister:
+    """Coalesces state changes into atomic background writes of one JSON file."""
+
+    def __init__(self, path: Path, snapshot: Callable[[], dict[str, Any]], delay: float = STATE_SAVE_DELAY) -> None:
+        """Initialize the persister.
+
+        Args:
+            path: State file to write
+            snapshot: Returns the state to persist; called on the event loop
+            delay: Seconds to wait for further changes before writing
+        """
+        self._path = path
+        self._snapshot = snapshot
+        self._delay = delay
+        self._dirty = False
+        self._task: asyncio.Task[None] | None = None
+
+        # Writes can overlap (background write + flush); the lock and the
+        # sequence numbers keep an older snapshot from replacing a newer one
+        self._write_lock = threading.Lock()
+        self._next_seq = 0
+        self._written_seq = 0
+
+        # Statistics (see stats())
+        self._requests = 0
+        self._writes = 0
+        self._failures = 0
+        self._total_seconds = 0.0
+        self._max_seconds = 0.0
+        self._last_seconds = 0.0
+
+    def schedule(self) -> None:
+        """Mark the state as changed; it is written after the debounce delay."""
+        self._requests += 1
+        self._dirty = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (startup/teardown code paths): write now
+            self.flush()
+            return
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+
+    def flush(self) -> None:
+        """Write the current state synchronously, cancelling any pending write."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self._dirty = False
+        self._write(self._take_snapshot())
+
+    def stats(self) -> dict[str, Any]:
+        """Return write statistics.
+
+        Returns:
+            Dict with requests (schedule() calls), writes, failures,
+            coalesced (requests that did not cause a write of their own)
+            and last/avg/max write latency in milliseconds
+        """
+        return {
+            "requests": self._requests,
+            "writes": self._writes,
+            "failures": self._failures,
+            "coalesced": max(self._requests - self._writes - self._failures, 0),
+            "last_ms": round(self._last_seconds * 1000, 3),
+            "avg_ms": round(self._total_seconds / self._writes * 1000, 3) if self._writes else 0.0,
+            "max_ms": round(self._max_seconds * 1000, 3),
+        }
+
+    async def _run(self) -> None:
+        """Write once the state stopped changing for the debounce delay."""
+        try:
+            while self._dirty:
+                await asyncio.sleep(self._delay)
+                self._dirty = False
+                await asyncio.to_thread(self._write, self._take_snapshot())
+        except asyncio.CancelledError:
+            pass
+
+    def _take_snapshot(self) -> tuple[int, dict[str, Any]]:
+        """Snapshot the state on the calling (event loop) thread."""
+        self._next_seq += 1
+        return self._next_seq, self._snapshot()
+
+    def _write(self, snapshot: tuple[int, dict[str, Any]]) -> None:
+        """Write a snapshot atomically unless a newer one was already written."""
+        seq, state = snapshot
+        with self._write_lock:
+            if seq <= self._written_seq:
+                return
+            started = time.perf_counter()
+            try:
+                _write_json_atomic(self._path, state)
+            except (OSError, TypeError, ValueError) as e:
+                self._failures += 1
+                logger.warning("Failed to save state: %s", e)
+                return
+            elapsed = time.perf_counter() - started
+            self._written_seq = seq
+            self._writes += 1
+            self._last_seconds = elapsed
+            self._total_seconds += elapsed
+            self._max_seconds = max(self._max_seconds, elapsed)
+            logger.debug("Saved state to %s in %.1f ms", self._path, elapsed * 1000)
+
+
+# ============================================================================
+# Private Helper Functions
+# ============================================================================
+
+
+def _write_json_atomic(path: Path, data: dict[str, Any]) -> None:
+    """Write JSON via temp file + fsync + rename so readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}_tmp_", suffix=".json", text=True)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except Exception:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(temp_path)
+        raise
@@ -0,0 +1,249 @@
+"""
+Process Helpers (/proc)
+=======================
+
+Linux /proc helpers used by the daemon to re-adopt agent processes that
+outlived a previous daemon instance, and to sample the resource usage of
+agent process trees (CPU, memory, I/O).
+
+A PID alone does not identify a process across restarts (PIDs are reused),
+so the daemon persists the PID together with the process start time from
+/proc/<pid>/stat and only re-adopts a process whose start time matches.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import signal
+from typing import Any
+
+# Seconds between liveness checks when pidfd is unavailable
+ADOPTED_POLL_INTERVAL = 1.0
+
+# Units of /proc/<pid>/stat CPU times and RSS
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def read_process_start_time(pid: int) -> int | None:
+    """Read a process's start time (clock ticks after boot) from /proc.
+
+    Args:
+        pid: Process ID
+
+    Returns:
+        The start time, or None if the process does not exist, is a zombie,
+        or /proc is unavailable.
+    """
+    try:
+        with open(f"/proc/{pid}/stat", encoding="utf-8") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # comm (field 2) may contain spaces and parentheses; fields after it start at state (field 3)
+    fields = stat[stat.rfind(")") + 2 :].split()
+    if len(fields) < 20 or fields[0] in ("Z", "X"):
+        return None
+    try:
+        return int(fields[19])  # starttime (field 22)
+    except ValueError:
+        return None
+
+
+def read_process_memory(pid: int) -> dict[str, int] | None:
+    """Read a process's resident memory from /proc.
+
+    RSS counts every resident page, including pages shared with other
+    processes (e.g. a fork server's imported modules); PSS divides shared
+    pages among the processes sharing them.
+
+    Args:
+        pid: Process ID
+
+    Returns:
+        Dict with rss_kb and, where smaps_rollup exists, pss_kb; None if
+        the process does not exist or /proc is unavailable.
+    """
+    memory: dict[str, int] = {}
+    try:
+        with open(f"/proc/{pid}/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    memory["rss_kb"] = int(line.split()[1])
+                    break
+    except (OSError, ValueError, IndexError):
+        return None
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    memory["pss_kb"] = int(line.split()[1])
+                    break
+    except (OSError, ValueError, IndexError):
+        pass
+    return memory or None
+
+
+class AdoptedProcess:
+    """Handle for a running agent process that is not a child of this daemon.
+
+    Mirrors the parts of asyncio.subprocess.Process the daemon uses (pid,
+    returncode, terminate, kill, wait). The exit status of a non-child
+    cannot be collected, so returncode stays None and wait() returns None.
+    Signals are only sent while the PID still belongs to the adopted
+    process (start time matches), never to a process that reused the PID.
+    """
+
+    def __init__(self, pid: int, start_time: int) -> None:
+        self.pid = pid
+        self.start_time = start_time
+        self.returncode: int | None = None
+        self._exited = False
+
+    def is_alive(self) -> bool:
+        """Check whether the adopted process is still running."""
+        if not self._exited and read_process_start_time(self.pid) != self.start_time:
+            self._exited = True
+        return not self._exited
+
+    def terminate(self) -> None:
+        """Send SIGTERM to the process."""
+        self._signal(signal.SIGTERM)
+
+    def kill(self) -> None:
+        """Send SIGKILL to the process."""
+        self._signal(signal.SIGKILL)
+
+    async def wait(self) -> int | None:
+        """Wait until the process exits.
+
+        Uses a pidfd (readable once the process exits) when available and
+        polls /proc otherwise.
+
+        Returns:
+            None (exit status of a non-child is unavailable)
+        """
+        if not self.is_alive():
+            return self.returncode
+        try:
+            pidfd = os.pidfd_open(self.pid)
+        except (AttributeError, OSError):
+            pidfd = None
+
+        if pidfd is None:
+            while self.is_alive():
+                await asyncio.sleep(ADOPTED_POLL_INTERVAL)
+            return self.returncode
+
+        loop = asyncio.get_running_loop()
+        exited = loop.create_future()
+        loop.add_reader(pidfd, lambda: exited.done() or exited.set_result(None))
+        try:
+            # The PID may have been reused between is_alive() and pidfd_open()
+            if self.is_alive():
+                await exited
+        finally:
+            loop.remove_reader(pidfd)
+            os.close(pidfd)
+        self._exited = True
+        return self.returncode
+
+    def _signal(self, sig: signal.Signals) -> None:
+        """Signal the process if the PID still belongs to the adopted process.
+
+        Raises:
+            ProcessLookupError: If the process has exited
+        """
+        if not self.is_alive():
+            raise ProcessLookupError(self.pid)
+        os.kill(self.pid, sig)
+
+
+def read_process_table() -> dict[int, tuple[int, int, int]]:
+    """Read parent PID, CPU time and RSS of every process from /proc/<pid>/stat.
+
+    Returns:
+        Dict of pid -> (ppid, utime + stime in clock ticks, RSS in pages);
+        empty if /proc is unavailable. Processes that exit while /proc is
+        scanned are skipped.
+    """
+    table: dict[int, tuple[int, int, int]] = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return {}
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", encoding="utf-8") as f:
+                stat = f.read()
+            fields = stat[stat.rfind(")") + 2 :].split()
+            # ppid (field 4), utime/stime (14/15), rss (24)
+            table[int(entry)] = (int(fields[1]), int(fields[11]) + int(fields[12]), int(fields[21]))
+        except (OSError, ValueError, IndexError):
+            continue
+    return table
+
+
+def sample_process_tree(root_pid: int, table: dict[int, tuple[int, int, int]]) -> dict[str, Any] | None:
+    """Sum resource usage over a process and all its descendants.
+
+    Descendants that detached themselves (re-parented to init by a double
+    fork) are no longer part of the tree and are not counted.
+
+    Args:
+        root_pid: Root of the tree (the agent process)
+        table: Process table from read_process_table()
+
+    Returns:
+        Dict with cpu_seconds, rss_kb, pss_kb, read_bytes, write_bytes
+        (cumulative for the processes alive now) and children (descendant
+        count), or None if the root process is not in the table.
+    """
+    if root_pid not in table:
+        return None
+    children: dict[int, list[int]] = {}
+    for pid, (ppid, _, _) in table.items():
+        children.setdefault(ppid, []).append(pid)
+
+    tree = [root_pid]
+    for pid in tree:  # Grows while iterating: breadth-first walk
+        tree.extend(children.get(pid, ()))
+
+    cpu_ticks = sum(table[pid][1] for pid in tree)
+    sample: dict[str, Any] = {
+        "cpu_seconds": round(cpu_ticks / _CLOCK_TICKS, 2),
+        "rss_kb": sum(table[pid][2] for pid in tree) * _PAGE_SIZE // 1024,
+        "pss_kb": 0,
+        "read_bytes": 0,
+        "write_bytes": 0,
+        "children": len(tree) - 1,
+    }
+    for pid in tree:
+        memory = read_process_memory(pid)
+        sample["pss_kb"] += (memory or {}).get("pss_kb", 0)
+        io = _read_process_io(pid)
+        sample["read_bytes"] += io.get("read_bytes", 0)
+        sample["write_bytes"] += io.get("write_bytes", 0)
+    return sample
+
+
+# ============================================================================
+# Private Helper Functions
+# ============================================================================
+
+
+def _read_process_io(pid: int) -> dict[str, int]:
+    """Read storage I/O counters from /proc/<pid>/io (empty if unreadable)."""
+    counters: dict[str, int] = {}
+    try:
+        with open(f"/proc/{pid}/io", encoding="utf-8") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("read_bytes", "write_bytes"):
+                    counters[key] = int(value)
+    except (OSError, ValueError):
+        return {}
+    return counters
@@ -0,0 +1,130 @@
+"""
+Agent Scheduler
+===============
+
+Admission control for agent starts: a fleet-wide limit on running agents,
+a per-project limit, and a priority queue for starts that do not fit.
+
+Queued agents are admitted highest priority first, FIFO within a priority.
+An agent whose project is at its limit does not block agents of other
+projects queued behind it.
+
+Limits come from the daemon command line or the environment
+(HARNESS_MAX_RUNNING_AGENTS, HARNESS_MAX_AGENTS_PER_PROJECT) and can be
+changed at runtime with the "set_limits" command; 0 means unlimited.
+"""
+
+from __future__ import annotations
+
+import itertools
+import os
+from collections import Counter
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+MAX_RUNNING_ENV = "HARNESS_MAX_RUNNING_AGENTS"
+MAX_PER_PROJECT_ENV = "HARNESS_MAX_AGENTS_PER_PROJECT"
+
+
+@dataclass(frozen=True, order=True)
+class _QueueEntry:
+    """Queue ordering key: higher priority first, then arrival order."""
+
+    sort_priority: int  # Negated priority
+    seq: int
+    agent_id: str
+    project_dir: str
+
+
+class AgentScheduler:
+    """Decides whether an agent may start now and queues it otherwise."""
+
+    def __init__(self, max_running: int = 0, max_per_project: int = 0) -> None:
+        """Initialize the scheduler.
+
+        Args:
+            max_running: Max agents running at once across all projects (0 = unlimited)
+            max_per_project: Max agents running at once per project_dir (0 = unlimited)
+        """
+        self.max_running = max_running
+        self.max_per_project = max_per_project
+        self._queue: dict[str, _QueueEntry] = {}
+        self._seq = itertools.count()
+
+    @classmethod
+    def from_env(cls) -> AgentScheduler:
+        """Create a scheduler with limits from the environment (unset or invalid = unlimited)."""
+        return cls(_env_limit(MAX_RUNNING_ENV), _env_limit(MAX_PER_PROJECT_ENV))
+
+    def has_capacity(self, project_dir: str, active_projects: Iterable[str]) -> bool:
+        """Check whether an agent of a project can start next to the active ones.
+
+        Args:
+            project_dir: Project of the agent to start
+            active_projects: project_dir of every starting/running agent
+        """
+        counts = Counter(active_projects)
+        return self._fits(project_dir, counts)
+
+    def enqueue(self, agent_id: str, project_dir: str, priority: int = 0) -> None:
+        """Queue an agent (re-queuing an agent moves it to the back of its priority)."""
+        self._queue[agent_id] = _QueueEntry(-priority, next(self._seq), agent_id, project_dir)
+
+    def remove(self, agent_id: str) -> bool:
+        """Remove an agent from the queue.
+
+        Returns:
+            True if the agent was queued
+        """
+        return self._queue.pop(agent_id, None) is not None
+
+    def is_queued(self, agent_id: str) -> bool:
+        """Check whether an agent is waiting in the queue."""
+        return agent_id in self._queue
+
+    def position(self, agent_id: str) -> int | None:
+        """Return an agent's 1-based queue position, None if not queued."""
+        entry = self._queue.get(agent_id)
+        if entry is None:
+            return None
+        return sum(1 for other in self._queue.values() if other < entry) + 1
+
+    def pop_admissible(self, active_projects: Iterable[str]) -> list[str]:
+        """Remove and return the queued agents that fit into the free slots.
+
+        Args:
+            active_projects: project_dir of every starting/running agent
+
+        Returns:
+            Agent IDs to start, in admission order
+        """
+        counts = Counter(active_projects)
+        admitted = []
+        for entry in sorted(self._queue.values()):
+            if self.max_running and sum(counts.values()) >= self.max_running:
+                break
+            if not self._fits(entry.project_dir, counts):
+                continue
+            counts[entry.project_dir] += 1
+            admitted.append(entry.agent_id)
+            del self._queue[entry.agent_id]
+        return admitted
+
+    def _fits(self, project_dir: str, counts: Counter[str]) -> bool:
+        """Check the fleet and per-project limits against current counts."""
+        if self.max_running and sum(counts.values()) >= self.max_running:
+            return False
+        return not self.max_per_project or counts[project_dir] < self.max_per_project
+
+
+# ============================================================================
+# Private Helper Functions
+# ============================================================================
+
+
+def _env_limit(name: str) -> int:
+    """Read a non-negative limit from the environment (0 if unset or invalid)."""
+    try:
+        return max(int(os.environ.get(name, "0")), 0)
+    except ValueError:
+        return 0
@@ -7,9 +7,34 @@ Background daemon that manages agent lifecycle independently of the TUI.
 Agents run as subprocesses of the daemon, with output written to log files.
 TUI connects via Unix socket to control agents and tail logs.
 
+Protocol: newline-delimited JSON requests over the Unix socket (and, for
+federation, TCP). Requests with an "id" run concurrently and their
+responses carry the same "id"; commands that change an agent are
+serialized per agent. subscribe_logs and subscribe_events switch the
+connection to a stream of pushed messages.
+
+The daemon itself is the agent table, the command handlers and the
+process supervisor (one watcher task per agent, re-adoption of agents
+that survived a daemon restart); everything else lives in helper modules:
+
+    scheduler.py    queueing under fleet-wide and per-project running limits
+    governor.py     fleet-wide API session admission (acquire/release_session)
+    forkserver.py   launching agents from the pre-warmed zygote (zygote.py)
+    limits.py       per-agent cgroup v2 / rlimit resource limits
+    accounting.py   per-agent CPU, memory and I/O sampling
+    metrics.py      Prometheus metrics ("metrics" command, --metrics-port)
+    federation.py   TCP listener, peers and proxying of remote agents
+    upgrade.py      in-place upgrade handing sockets and agents over
+    logcapture.py   agent output pipe, rate limiting and tail buffer
+    logrotate.py    log segments, compression, retention and reads
+    persistence.py  debounced writes of the persisted agent table
+    procfs.py       /proc helpers for re-adoption and resource sampling
+    events.py       typed event stream and agent state watchers
+
 Usage:
     python -m agent.daemon              # Start daemon (foreground)
     python -m agent.daemon --background # Start daemon (background)
+    python -m agent.daemon --upgrade    # Replace the running daemon by this version
 
 Socket: /tmp/coding-harness-daemon.sock
 """
@@ -18,19 +43,38 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import codecs
 import contextlib
+import hmac
 import json
 import logging
 import os
 import signal
 import subprocess
 import sys
+import time
+from collections import Counter
 from collections.abc import Callable, Coroutine
 from dataclasses import dataclass, field
 from datetime import UTC, datetime
 from pathlib import Path
 from typing import Any, TypedDict
 
+from .accounting import ResourceAccountant
+from .client import DAEMON_TOKEN_ENV, SOCKET_ENV, DaemonClient, DaemonError, parse_address
+from .events import AgentStateWatcher, EventBus, EventType
+from .federation import LOCAL_HOST, Federation
+from .forkserver import ForkServer, LaunchMode, LaunchStats
+from .governor import RateGovernor, SessionOutcome
+from .limits import LimitEnforcer, ResourceLimits
+from .logcapture import LogCapture
+from .logrotate import LogReader, log_size
+from .metrics import DaemonMetrics, gauge, metrics_port_from_env, start_http_server
+from .persistence import StatePersister
+from .procfs import AdoptedProcess, read_process_memory, read_process_start_time
+from .scheduler import AgentScheduler
+from .upgrade import TAKEOVER_FD_ARG, Handoff, HandoffError, Successor
+
 # Configure module logger
 logger = logging.getLogger(__name__)
 
@@ -42,6 +86,7 @@ CommandResponse = dict[str, Any]
 class AgentStatus:
     """Status constants for agent processes."""
 
+    QUEUED = "queued"
     STARTING = "starting"
     RUNNING = "running"
     STOPPED = "stopped"
@@ -60,6 +105,9 @@ class AgentConfig(TypedDict, total=False):
     spec_hash: str
     file_only_mode: bool
     skip_mr_creation: bool
+    cpu_quota: float
+    memory_max_mb: int
+    pids_max: int
 
 
 # Harness root directory
@@ -77,9 +125,55 @@ DATA_DIR = Path("/app/.data") if IN_DOCKER else HARNESS_ROOT / ".data"
 # - Socket/PID in /tmp (ephemeral)
 # - State in DATA_DIR (see above)
 # - Logs in project's .claude-agent/ directory (project-scoped, persisted via $HOME mount)
-SOCKET_PATH = Path("/tmp/coding-harness-daemon.sock")
-STATE_FILE = DATA_DIR / "daemon_state.json"
-PID_FILE = Path("/tmp/coding-harness-daemon.pid")
+# - HARNESS_DAEMON_SOCKET runs another daemon on the same host (own PID and state files)
+DEFAULT_SOCKET_PATH = Path("/tmp/coding-harness-daemon.sock")
+SOCKET_PATH = Path(os.environ.get(SOCKET_ENV, str(DEFAULT_SOCKET_PATH)))
+STATE_FILE = DATA_DIR / (
+    "daemon_state.json" if SOCKET_PATH == DEFAULT_SOCKET_PATH else f"daemon_state.{SOCKET_PATH.stem}.json"
+)
+PID_FILE = SOCKET_PATH.with_suffix(".pid")
+
+# Agent output pipes (see logcapture.py)
+LOG_PIPE_DIR = SOCKET_PATH.with_name(f"{SOCKET_PATH.stem}-pipes")
+
+# TCP listen address (HOST:PORT) for federation
+DAEMON_TCP_ENV = "HARNESS_DAEMON_TCP"
+
+# Seconds a TCP client has to authenticate
+AUTH_TIMEOUT = 10.0
+
+# Seconds a replaced daemon waits for its clients to reconnect to the new one
+RECONNECT_GRACE = 5.0
+
+# The daemon unlinks its socket itself (not when handing it to a new version);
+# Python 3.13+ would otherwise remove it when the server closes
+_UNIX_SERVER_OPTIONS: dict[str, Any] = {"cleanup_socket": False} if sys.version_info >= (3, 13) else {}
+
+# Environment variable telling an agent process its daemon agent_id
+AGENT_ID_ENV = "HARNESS_AGENT_ID"
+
+# Longest a single acquire_session request waits (clients re-ask after it)
+MAX_SESSION_WAIT_SECONDS = 20.0
+
+# Log streaming
+LOG_CHUNK_BYTES = 64 * 1024  # Max data per "log" event
+LOG_FOLLOW_INTERVAL = 0.2  # Seconds between size checks of a followed log file
+SUBSCRIBER_BUFFER_BYTES = 256 * 1024  # Per-subscriber socket write buffer high-water mark
+
+# Commands that switch the connection to streaming mode
+STREAM_COMMANDS = ("subscribe_logs", "subscribe_events")
+
+# Commands serialized per agent_id (they change the agent's process or registration)
+AGENT_MUTATING_COMMANDS = frozenset({"register", "start", "stop", "remove"})
+
+# Commands a coordinator proxies to the peer running the agent
+FEDERATED_COMMANDS = frozenset({"register", "start", "stop", "status", "remove"})
+
+# Commands that place an agent unknown to the federation on the least-loaded daemon
+PLACEMENT_COMMANDS = frozenset({"register", "start"})
+
+# Commands accepted over TCP: what a federation coordinator needs, no daemon administration
+TCP_COMMANDS = FEDERATED_COMMANDS | {"ping", "list", "stats", *STREAM_COMMANDS}
 
 
 @dataclass
@@ -88,12 +182,20 @@ class AgentProcess:
 
     agent_id: str
     config: AgentConfig
-    process: subprocess.Popen | None = None
+    process: asyncio.subprocess.Process | AdoptedProcess | None = None
+    pid_start_time: int | None = None  # /proc start time of process, to re-adopt it after a restart
     log_file: Path | None = None
     status: str = AgentStatus.STARTING
     started_at: str = field(default_factory=lambda: datetime.now(UTC).isoformat())
     stopped_at: str | None = None
     exit_code: int | None = None
+    priority: int = 0
+    queued_at: str | None = None
+    state_watcher: AgentStateWatcher | None = None
+    launch_mode: str | None = None  # LaunchMode of the current run
+    spawned_at: float | None = None  # time.monotonic() at launch, until the first session
+    time_to_first_session: float | None = None
+    log_capture: LogCapture | None = None  # Daemon-side reader of the current run's output
 
     def to_dict(self) -> dict[str, Any]:
         """Convert to dict for JSON serialization."""
@@ -106,45 +208,209 @@ class AgentProcess:
             "stopped_at": self.stopped_at,
             "exit_code": self.exit_code,
             "pid": self.process.pid if self.process else None,
+            "priority": self.priority,
+            "queued_at": self.queued_at,
+            "phase": self.state_watcher.phase if self.state_watcher else None,
+            "pending_checkpoint_type": self.state_watcher.pending_checkpoint_type if self.state_watcher else None,
+            "launch_mode": self.launch_mode,
+            "time_to_first_session": self.time_to_first_session,
         }
 
 
+class LogFollower:
+    """Wakes the subscribers of one log file when it grows.
+
+    One follower is shared by all subscribers of a file, so the file is
+    checked once per interval regardless of how many clients stream it.
+    The follower stops when its last subscriber leaves.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        """Start the size-check task if not already running."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._follow())
+
+    def stop(self) -> None:
+        """Stop the size-check task."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def notify(self) -> None:
+        """Wake all waiting subscribers (file grew or agent state changed)."""
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def changed(self) -> asyncio.Event:
+        """Event set by the next notify(); take it before checking the file."""
+        return self._changed
+
+    async def _follow(self) -> None:
+        """Notify subscribers whenever the file size changes."""
+        last_size = -1
+        while True:
+            try:
+                size = os.stat(self.path).st_size
+            except OSError:
+                size = -1
+            if size != last_size:
+                last_size = size
+                self.notify()
+            await asyncio.sleep(LOG_FOLLOW_INTERVAL)
+
+
 class AgentDaemon:
     """Daemon that manages agent processes."""
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        scheduler: AgentScheduler | None = None,
+        governor: RateGovernor | None = None,
+        forkserver: ForkServer | None = None,
+        metrics_port: int | None = None,
+        tcp_address: str | None = None,
+        token: str | None = None,
+        federation: Federation | None = None,
+        argv: list[str] | None = None,
+        handoff: Handoff | None = None,
+    ) -> None:
+        """Initialize the daemon.
+
+        Args:
+            argv: Command line arguments, to start a new version with (upgrade)
+            handoff: Sockets and agents received from the daemon this one replaces
+
+        Raises:
+            ValueError: If tcp_address is set without a token, or is invalid
+        """
+        if tcp_address is not None:
+            if not token:
+                raise ValueError(f"Listening on TCP requires a token ({DAEMON_TOKEN_ENV})")
+            parse_address(tcp_address)
         self._agents: dict[str, AgentProcess] = {}
+        self._scheduler = scheduler or AgentScheduler.from_env()
+        self._governor = governor or RateGovernor.from_env()
+        self._forkserver = forkserver or ForkServer.from_env()
+        self._launch_stats = LaunchStats()
+        self._accountant = ResourceAccountant.from_env(self._running_pids)
+        self._limits = LimitEnforcer.from_env(self._on_limit_event)
+        self._metrics = DaemonMetrics()
+        self._metrics_port = metrics_port
+        self._metrics_server: asyncio.Server | None = None
+        self._started_at = time.monotonic()
         self._server: asyncio.Server | None = None
+        self._tcp_address = tcp_address
+        self._token = token
+        self._tcp_server: asyncio.Server | None = None
+        self._federation = federation
+        self._argv = argv
+        self._handoff = handoff
+        self._upgrading = False
+        self._upgrade_task: asyncio.Task[None] | None = None
+        self._draining = False  # Upgrade: in-flight commands finish, new ones are told to reconnect
+        self._handed_over = False  # Upgrade: the new daemon owns agents and state
+        self._connections: set[asyncio.StreamWriter] = set()
+        self._command_tasks: set[asyncio.Task[None]] = set()
         self._shutdown = False
         self._monitor_tasks: dict[str, asyncio.Task[None]] = {}
+        self._log_followers: dict[Path, LogFollower] = {}
+        self._events = EventBus()
+        self._events.add_listener(self._metrics.on_event)
+        self._agent_locks: dict[str, asyncio.Lock] = {}  # Serializes mutating commands per agent
+        self._persister = StatePersister(STATE_FILE, self._state_snapshot)
+        self._background_tasks: set[asyncio.Task[None]] = set()  # Queued-agent starts
 
     def _append_to_log(self, log_file: Path | None, message: str) -> None:
         """Append a message to the agent's log file."""
         if log_file and log_file.exists():
             with open(log_file, "a", encoding="utf-8") as f:
                 f.write(message)
+        self._notify_log_followers(log_file)
+
+    def _start_state_watcher(self, agent: AgentProcess) -> None:
+        """(Re)start the checkpoint/phase watcher for an agent's state directory.
+
+        Skipped until the agent's .claude-agent directory exists (it is
+        created when the agent is first started).
+        """
+        if agent.state_watcher:
+            agent.state_watcher.stop()
+            agent.state_watcher = None
+
+        config = agent.config
+        project_dir, spec_slug, spec_hash = config.get("project_dir"), config.get("spec_slug"), config.get("spec_hash")
+        if not project_dir or not spec_slug or not spec_hash:
+            return
+        watcher = AgentStateWatcher(
+            self._events,
+            agent.agent_id,
+            Path(project_dir),
+            spec_slug,
+            spec_hash,
+            skip_mr_creation=config.get("skip_mr_creation", False),
+        )
+        if not watcher.agent_dir.is_dir():
+            return
+        watcher.start()
+        agent.state_watcher = watcher
+
+    def _log_writer(self, log_file: Path) -> Callable[[], None]:
+        """Callback for a log capture: wake the log file's subscribers after each write."""
+        return lambda: self._notify_log_followers(log_file)
+
+    def _close_log_capture(self, agent: AgentProcess) -> None:
+        """Write out and close the capture of an agent's ended run, before its exit footer."""
+        if agent.log_capture:
+            agent.log_capture.close()
+            agent.log_capture = None
+
+    def _notify_log_followers(self, log_file: Path | None) -> None:
+        """Wake subscribers of a log file without waiting for the next size check."""
+        follower = self._log_followers.get(log_file) if log_file else None
+        if follower:
+            follower.notify()
 
     def _save_state(self) -> None:
-        """Save agent state to disk for persistence across daemon restarts."""
-        try:
-            STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
-            state = {
-                "agents": {
-                    agent_id: {
-                        "agent_id": agent.agent_id,
-                        "config": agent.config,
-                        "status": agent.status,
-                        "log_file": str(agent.log_file) if agent.log_file else None,
-                        "started_at": agent.started_at,
-                        "stopped_at": agent.stopped_at,
-                        "exit_code": agent.exit_code,
-                    }
-                    for agent_id, agent in self._agents.items()
+        """Schedule a save of agent state for persistence across daemon restarts.
+
+        Saves are debounced and written atomically in a worker thread (see
+        persistence.py); shutdown() flushes synchronously. Skipped once the
+        state was handed to a new daemon version.
+        """
+        if not self._handed_over:
+            self._persister.schedule()
+
+    def _state_snapshot(self) -> dict[str, Any]:
+        """Build the persisted state (called on the event loop by the persister)."""
+        return {
+            "agents": {
+                agent_id: {
+                    "agent_id": agent.agent_id,
+                    "config": dict(agent.config),
+                    "status": agent.status,
+                    "log_file": str(agent.log_file) if agent.log_file else None,
+                    "started_at": agent.started_at,
+                    "stopped_at": agent.stopped_at,
+                    "exit_code": agent.exit_code,
+                    "pid": agent.process.pid if agent.process and agent.status == AgentStatus.RUNNING else None,
+                    "pid_start_time": agent.pid_start_time if agent.status == AgentStatus.RUNNING else None,
+                    "log_pipe": (
+                        str(agent.log_capture.pipe_path)
+                        if agent.log_capture and agent.status == AgentStatus.RUNNING
+                        else None
+                    ),
+                    "priority": agent.priority,
+                    "queued_at": agent.queued_at,
                 }
+                for agent_id, agent in self._agents.items()
             }
-            STATE_FILE.write_text(json.dumps(state, indent=2), encoding="utf-8")
-        except (OSError, json.JSONDecodeError) as e:
-            logger.warning("Failed to save state: %s", e)
+        }
 
     def _read_state_file(self) -> dict[str, Any] | None:
         """Read and parse the state file.
@@ -175,10 +441,13 @@ class AgentDaemon:
                     skipped += 1
                     continue
 
-                # Restore agent (process is gone, so mark as stopped if was running)
+                # Re-adopt the process if it outlived the previous daemon,
+                # otherwise mark as stopped if it was running
                 status = agent_data.get("status", AgentStatus.STOPPED)
-                if status == AgentStatus.RUNNING:
-                    status = AgentStatus.STOPPED  # Process died with daemon
+                process = None
+                if status in (AgentStatus.RUNNING, AgentStatus.STARTING):
+                    process = _adopt_process(agent_data.get("pid"), agent_data.get("pid_start_time"))
+                    status = AgentStatus.RUNNING if process else AgentStatus.STOPPED
 
                 self._agents[agent_id] = AgentProcess(
                     agent_id=agent_data["agent_id"],
@@ -188,14 +457,42 @@ class AgentDaemon:
                     started_at=agent_data.get("started_at", datetime.now(UTC).isoformat()),
                     stopped_at=agent_data.get("stopped_at"),
                     exit_code=agent_data.get("exit_code"),
-                    process=None,  # Process is gone
+                    process=process,
+                    pid_start_time=process.start_time if process else None,
+                    priority=agent_data.get("priority", 0),
+                    queued_at=agent_data.get("queued_at"),
                 )
         except KeyError as e:
             logger.warning("Invalid state file structure, missing key: %s", e)
             return
 
+        adopted = 0
+        for agent_id, agent in self._agents.items():
+            self._start_state_watcher(agent)
+            if isinstance(agent.process, AdoptedProcess):
+                log_pipe = state["agents"][agent_id].get("log_pipe")
+                if log_pipe and agent.log_file:
+                    agent.log_capture = LogCapture.reattach(
+                        Path(log_pipe), agent.log_file, self._log_writer(agent.log_file)
+                    )
+                self._monitor_tasks[agent_id] = asyncio.create_task(self._monitor_agent(agent_id, agent.process))
+                with contextlib.suppress(ValueError):
+                    self._limits.adopt(agent_id, ResourceLimits.from_config(dict(agent.config)))
+                adopted += 1
+
         if self._agents:
             logger.info("Restored %d agent(s) from state file", len(self._agents))
+        if adopted:
+            logger.info("Re-adopted %d running agent(s)", adopted)
+
+        # Re-queue agents that were waiting for a slot, in their original order
+        queued = sorted(
+            (agent for agent in self._agents.values() if agent.status == AgentStatus.QUEUED),
+            key=lambda agent: agent.queued_at or "",
+        )
+        for agent in queued:
+            self._scheduler.enqueue(agent.agent_id, agent.config.get("project_dir", ""), agent.priority)
+        self._admit_queued()
         if skipped:
             logger.info("Skipped %d agent(s) with missing spec files", skipped)
             self._save_state()  # Save cleaned state
@@ -211,24 +508,70 @@ class AgentDaemon:
 
     async def start(self) -> None:
         """Start the daemon server."""
-        # Clean up old socket
-        if SOCKET_PATH.exists():
+        handoff = self._handoff
+        sockets = handoff.sockets if handoff else {}
+
+        # Clean up old socket (an upgrade keeps serving on it)
+        if "unix" not in sockets and SOCKET_PATH.exists():
             SOCKET_PATH.unlink()
 
-        # Load persisted state from previous daemon run
-        self._load_state()
+        # Find a cgroup subtree for agent limits (may move the daemon into a leaf cgroup)
+        self._limits.setup()
+
+        # Take over the agents of the daemon we replace, or load persisted state from the previous run
+        if handoff:
+            for key in ("max_running", "max_per_project"):
+                if isinstance(handoff.scheduler.get(key), int):
+                    setattr(self._scheduler, key, handoff.scheduler[key])
+            self._restore_agents_from_state(handoff.state)
+        else:
+            self._load_state()
 
         # Write PID file
         PID_FILE.write_text(str(os.getpid()), encoding="utf-8")
 
+        # Pre-import the agent runtime in the zygote while the server comes up
+        self._forkserver.start(_agent_environment())
+        self._accountant.start()
+        self._limits.start(lambda: list(self._running_pids()))
+
+        if "metrics" in sockets:
+            self._metrics_server = await start_http_server(self._render_metrics, sock=sockets["metrics"])
+        elif self._metrics_port:
+            try:
+                self._metrics_server = await start_http_server(self._render_metrics, self._metrics_port)
+            except OSError as e:
+                logger.warning("Failed to serve metrics on port %d: %s", self._metrics_port, e)
+
+        if "tcp" in sockets:
+            self._tcp_server = await asyncio.start_server(self._handle_tcp_client, sock=sockets["tcp"])
+        elif self._tcp_address:
+            host, port = parse_address(self._tcp_address)
+            self._tcp_server = await asyncio.start_server(self._handle_tcp_client, host, port)
+        if self._tcp_server:
+            logger.info("Listening on TCP %s", self._tcp_address)
+        if self._federation:
+            logger.info("Coordinating federation peers: %s", ", ".join(self._federation.peers))
+
         # Start Unix socket server
-        self._server = await asyncio.start_unix_server(self._handle_client, path=str(SOCKET_PATH))
+        if "unix" in sockets:
+            self._server = await asyncio.start_unix_server(
+                self._handle_client, sock=sockets["unix"], **_UNIX_SERVER_OPTIONS
+            )
+        else:
+            self._server = await asyncio.start_unix_server(
+                self._handle_client, path=str(SOCKET_PATH), **_UNIX_SERVER_OPTIONS
+            )
 
-        # Set socket permissions (readable/writable by all)
-        SOCKET_PATH.chmod(0o666)
+            # Set socket permissions (readable/writable by all)
+            SOCKET_PATH.chmod(0o666)
 
         logger.info("Agent daemon started on %s", SOCKET_PATH)
         logger.info("PID: %d", os.getpid())
+        if handoff:
+            handoff.ready()
+            self._handoff = None
+            logger.info("Took over %d agent(s) from the previous daemon version", len(self._agents))
 
         # Handle shutdown signals
         loop = asyncio.get_running_loop()
@@ -238,8 +581,13 @@ class AgentDaemon:
         async with self._server:
             await self._server.serve_forever()
 
-    async def shutdown(self) -> None:
-        """Gracefully shutdown the daemon."""
+    async def shutdown(self, keep_agents: bool = False) -> None:
+        """Gracefully shutdown the daemon.
+
+        Args:
+            keep_agents: Leave running agents alive; the next daemon
+                re-adopts them from the state file.
+        """
         if self._shutdown:
             return
         self._shutdown = True
@@ -247,12 +595,40 @@ class AgentDaemon:
         logger.info("Shutting down daemon...")
 
         # Stop all agents
-        for agent_id in list(self._agents.keys()):
-            await self._stop_agent(agent_id)
+        if not keep_agents:
+            for agent_id in list(self._agents.keys()):
+                await self._stop_agent(agent_id)
 
         # Cancel monitor tasks
         for task in self._monitor_tasks.values():
             task.cancel()
+        self._accountant.stop()
+        self._limits.stop()
+
+        # Agents left running keep their pipes; the next daemon resumes reading them
+        self._detach_log_captures()
+
+        # Stop log followers and state watchers
+        for follower in self._log_followers.values():
+            follower.stop()
+        for agent in self._agents.values():
+            if agent.state_watcher:
+                agent.state_watcher.stop()
+
+        # Write final state synchronously
+        self._persister.flush()
+        logger.info("State writes: %s", self._persister.stats())
+        logger.info("Launches: %s", self._launch_stats.stats())
+
+        # Agents forked by the zygote keep running without it
+        await self._forkserver.stop()
+
+        if self._metrics_server:
+            self._metrics_server.close()
+        if self._tcp_server:
+            self._tcp_server.close()
+        if self._federation:
+            await self._federation.close()
 
         # Stop server
         if self._server:
@@ -267,8 +643,22 @@ class AgentDaemon:
 
         logger.info("Daemon stopped.")
 
-    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
-        """Handle a client connection."""
+    async def _handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, allowed: frozenset[str] | None = None
+    ) -> None:
+        """Handle a client connection.
+
+        Requests carrying an "id" run as concurrent tasks; responses are
+        written whole under a per-connection lock so lines never interleave.
+
+        Args:
+            reader: Client stream
+            writer: Client stream
+            allowed: Commands this connection may send (None = all)
+        """
+        write_lock = asyncio.Lock()
+        in_flight: set[asyncio.Task[None]] = set()
+        self._connections.add(writer)
         try:
             while True:
                 data = await reader.readline()
@@ -277,37 +667,184 @@ class AgentDaemon:
 
                 try:
                     request = json.loads(data.decode())
-                    response = await self._process_command(request)
                 except json.JSONDecodeError:
-                    response = {"error": "Invalid JSON"}
+                    await self._write_response(writer, write_lock, {"error": "Invalid JSON"})
+                    continue
 
-                writer.write(json.dumps(response).encode() + b"\n")
-                await writer.drain()
+                if allowed is not None and (not isinstance(request, dict) or request.get("cmd") not in allowed):
+                    cmd = request.get("cmd") if isinstance(request, dict) else None
+                    response = {"status": "error", "message": f"Command not allowed on this connection: {cmd}"}
+                    if isinstance(request, dict) and "id" in request:
+                        response = {"id": request["id"], **response}
+                    await self._write_response(writer, write_lock, response)
+                    continue
+
+                if self._draining:
+                    # Upgrading: leave the request to the new daemon
+                    response = {"status": "error", "message": "Daemon is upgrading, reconnect", "reconnect": True}
+                    if isinstance(request, dict) and "id" in request:
+                        response = {"id": request["id"], **response}
+                    await self._write_response(writer, write_lock, response)
+                    if isinstance(request, dict) and request.get("cmd") in STREAM_COMMANDS:
+                        break
+                    continue
+
+                if isinstance(request, dict) and request.get("cmd") in STREAM_COMMANDS:
+                    # Connection is dedicated to the stream from here on
+                    if in_flight:
+                        await asyncio.wait(in_flight)
+                    if request["cmd"] == "subscribe_logs":
+                        await self._subscribe_logs(request, reader, writer)
+                    else:
+                        await self._subscribe_events(request, reader, writer)
+                    break
+
+                task = asyncio.create_task(self._run_command(request, writer, write_lock))
+                self._command_tasks.add(task)
+                task.add_done_callback(self._command_tasks.discard)
+                if isinstance(request, dict) and "id" in request:
+                    in_flight.add(task)
+                    task.add_done_callback(in_flight.discard)
+                else:
+                    await task
         except (ConnectionResetError, BrokenPipeError):
             pass
         finally:
+            # Let in-flight commands (e.g. a stop waiting for its process) finish
+            if in_flight:
+                await asyncio.wait(in_flight)
+            self._connections.discard(writer)
+            writer.close()
+            with contextlib.suppress(ConnectionResetError, BrokenPipeError):
+                await writer.wait_closed()
+
+    async def _handle_tcp_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Authenticate a TCP connection, then handle it like a Unix socket client limited to TCP_COMMANDS.
+
+        The first line must be {"cmd": "auth", "token": ...} with the daemon's
+        token; otherwise an error is sent and the connection closed. The
+        connection is not encrypted.
+        """
+        try:
+            data = await asyncio.wait_for(reader.readline(), timeout=AUTH_TIMEOUT)
+            request = json.loads(data.decode()) if data else None
+        except (TimeoutError, ValueError, ConnectionResetError):
+            request = None
+        token = request.get("token") if isinstance(request, dict) and request.get("cmd") == "auth" else None
+        assert self._token is not None  # Checked in __init__
+        if not isinstance(token, str) or not hmac.compare_digest(token.encode(), self._token.encode()):
+            peer = writer.get_extra_info("peername")
+            logger.warning("Rejected unauthenticated TCP client %s", peer)
+            with contextlib.suppress(ConnectionResetError, BrokenPipeError):
+                writer.write(json.dumps({"status": "error", "message": "Authentication failed"}).encode() + b"\n")
+                await writer.drain()
             writer.close()
-            await writer.wait_closed()
+            return
+        with contextlib.suppress(ConnectionResetError, BrokenPipeError):
+            writer.write(json.dumps({"status": "ok"}).encode() + b"\n")
+            await writer.drain()
+        await self._handle_client(reader, writer, TCP_COMMANDS)
+
+    async def _run_command(
+        self, request: CommandRequest, writer: asyncio.StreamWriter, write_lock: asyncio.Lock
+    ) -> None:
+        """Process one request and write its response, echoing the request id."""
+        try:
+            response = await self._process_command(request)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.exception("Command failed: %s", request)
+            response = {"status": "error", "message": f"Command failed: {e}"}
+        if isinstance(request, dict) and "id" in request:
+            response = {"id": request["id"], **response}
+        await self._write_response(writer, write_lock, response)
+
+    async def _write_response(
+        self, writer: asyncio.StreamWriter, write_lock: asyncio.Lock, response: CommandResponse
+    ) -> None:
+        """Write one response line (ignored if the client is gone)."""
+        with contextlib.suppress(ConnectionResetError, BrokenPipeError):
+            async with write_lock:
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
 
     async def _process_command(self, request: CommandRequest) -> CommandResponse:
         """Process a command from the client using command dispatch."""
+        if not isinstance(request, dict):
+            return {"status": "error", "message": "Request must be a JSON object"}
         cmd = request.get("cmd")
         if not isinstance(cmd, str):
             return {"status": "error", "message": "Command must be a string"}
         handlers: dict[str, Callable[[CommandRequest], Coroutine[Any, Any, CommandResponse]]] = {
             "ping": self._cmd_ping,
+            "stats": self._cmd_stats,
+            "metrics": self._cmd_metrics,
+            "set_limits": self._cmd_set_limits,
+            "acquire_session": self._cmd_acquire_session,
+            "release_session": self._cmd_release_session,
             "list": self._cmd_list,
             "register": self._cmd_register,
             "start": self._cmd_start,
             "stop": self._cmd_stop,
             "status": self._cmd_status,
             "remove": self._cmd_remove,
+            "start_many": self._cmd_start_many,
+            "stop_many": self._cmd_stop_many,
+            "remove_many": self._cmd_remove_many,
             "shutdown": self._cmd_shutdown,
+            "upgrade": self._cmd_upgrade,
         }
         handler = handlers.get(cmd)
-        if handler:
+        if not handler:
+            return {"status": "error", "message": f"Unknown command: {cmd}"}
+        agent_id = request.get("agent_id")
+        if self._federation is not None and not request.get("local"):
+            handler = self._federated(cmd, handler)
+        started = time.monotonic()
+        try:
+            if cmd in AGENT_MUTATING_COMMANDS and isinstance(agent_id, str):
+                async with self._agent_locks.setdefault(agent_id, asyncio.Lock()):
+                    return await handler(request)
             return await handler(request)
-        return {"status": "error", "message": f"Unknown command: {cmd}"}
+        finally:
+            self._metrics.command_latency.observe(time.monotonic() - started, cmd=cmd)
+
+    def _federated(
+        self, cmd: str, handler: Callable[[CommandRequest], Coroutine[Any, Any, CommandResponse]]
+    ) -> Callable[[CommandRequest], Coroutine[Any, Any, CommandResponse]]:
+        """Wrap a command handler to proxy remote agents' commands to their peer.
+
+        list merges the agents of all peers; register/start/stop/status/remove
+        of an agent that is not local go to the peer running it, or to the
+        least-loaded daemon for a new agent (register/start). Everything else
+        is handled locally.
+        """
+        federation = self._federation
+        assert federation is not None  # For type checker
+
+        async def federated_list(request: CommandRequest) -> CommandResponse:
+            response = await handler(request)
+            if response.get("status") != "ok":
+                return response
+            remote, unreachable = await federation.list_agents(request)
+            agents = [{**agent, "host": LOCAL_HOST} for agent in response["agents"]]
+            return {**response, "agents": agents + remote, "unreachable": unreachable}
+
+        async def federated_agent_command(request: CommandRequest) -> CommandResponse:
+            agent_id = request.get("agent_id")
+            if not isinstance(agent_id, str) or not agent_id or agent_id in self._agents:
+                return await handler(request)
+            peer = await federation.locate(agent_id)
+            if peer is None and cmd in PLACEMENT_COMMANDS:
+                peer = await federation.place(self._scheduler_info())
+            if peer is None:
+                return await handler(request)
+            return await federation.forward(peer, request)
+
+        if cmd == "list":
+            return federated_list
+        if cmd in FEDERATED_COMMANDS:
+            return federated_agent_command
+        return handler
 
     def _validate_agent_id(
         self, request: CommandRequest, must_exist: bool = True
@@ -342,20 +879,236 @@ class AgentDaemon:
         """
         return {"status": "ok", "message": "pong"}
 
-    async def _cmd_list(self, _request: CommandRequest) -> CommandResponse:
-        """Handle list command - returns all registered agents.
+    async def _cmd_stats(self, _request: CommandRequest) -> CommandResponse:
+        """Handle stats command - daemon internals for diagnostics.
 
         Args:
-            _request: Command request (unused for list).
+            _request: Command request (unused for stats).
 
         Returns:
-            Dict with status="ok" and agents list containing agent dicts.
+            Dict with status="ok" and persistence (state write counts and
+            latency, see StatePersister.stats).
         """
         return {
             "status": "ok",
-            "agents": [agent.to_dict() for agent in self._agents.values()],
+            "persistence": self._persister.stats(),
+            "scheduler": self._scheduler_info(),
+            "governor": self._governor.stats(),
+            "launch": self._launch_stats.stats(),
+            "federation": self._federation.stats() if self._federation else None,
         }
 
+    async def _cmd_metrics(self, _request: CommandRequest) -> CommandResponse:
+        """Handle metrics command - Prometheus text-format metrics.
+
+        Args:
+            _request: Command request (unused for metrics).
+
+        Returns:
+            Dict with status="ok" and metrics (exposition format text).
+        """
+        return {"status": "ok", "metrics": self._render_metrics()}
+
+    async def _cmd_acquire_session(self, request: CommandRequest) -> CommandResponse:
+        """Handle acquire_session command - wait for a fleet-wide session slot.
+
+        Args:
+            request: Command request containing agent_id and optional
+                max_wait (seconds, capped at MAX_SESSION_WAIT_SECONDS).
+
+        Returns:
+            Dict with status="ok" and lease_id (None if not granted within
+            max_wait; ask again) plus cooldown_seconds.
+        """
+        agent_id = request.get("agent_id")
+        if not isinstance(agent_id, str) or not agent_id:
+            return {"status": "error", "message": "agent_id required"}
+        max_wait = request.get("max_wait", MAX_SESSION_WAIT_SECONDS)
+        if not isinstance(max_wait, int | float) or isinstance(max_wait, bool) or max_wait < 0:
+            return {"status": "error", "message": "max_wait must be a non-negative number"}
+
+        self._record_first_session(agent_id)
+        lease_id = await self._governor.acquire(agent_id, min(max_wait, MAX_SESSION_WAIT_SECONDS))
+        return {"status": "ok", "lease_id": lease_id, "cooldown_seconds": self._governor.cooldown_remaining()}
+
+    async def _cmd_release_session(self, request: CommandRequest) -> CommandResponse:
+        """Handle release_session command - return a session slot with its outcome.
+
+        Args:
+            request: Command request containing lease_id, outcome ("ok",
+                "rate_limited" or "error") and optional retry_after seconds.
+
+        Returns:
+            Dict with status="ok", or error if outcome is invalid.
+        """
+        lease_id = request.get("lease_id")
+        outcome = request.get("outcome", SessionOutcome.OK)
+        retry_after = request.get("retry_after")
+        if not isinstance(lease_id, str):
+            return {"status": "error", "message": "lease_id required"}
+        if outcome not in SessionOutcome.ALL:
+            return {"status": "error", "message": f"outcome must be one of {sorted(SessionOutcome.ALL)}"}
+        if retry_after is not None and (not isinstance(retry_after, int | float) or isinstance(retry_after, bool)):
+            return {"status": "error", "message": "retry_after must be a number"}
+
+        lease = self._governor.lease(lease_id)
+        if lease:
+            self._metrics.session_duration.observe(lease[1], agent_id=lease[0], outcome=outcome)
+        known = self._governor.release(lease_id, outcome, retry_after)
+        return {"status": "ok", "released": known}
+
+    async def _cmd_set_limits(self, request: CommandRequest) -> CommandResponse:
+        """Handle set_limits command - change the scheduler's running limits.
+
+        Args:
+            request: Command request with optional max_running and
+                max_per_project (non-negative integers, 0 = unlimited).
+
+        Returns:
+            Dict with status="ok" and the scheduler limits, or error if a
+            limit is invalid. Raising a limit admits queued agents at once.
+        """
+        limits = {key: request[key] for key in ("max_running", "max_per_project") if key in request}
+        for key, value in limits.items():
+            if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+                return {"status": "error", "message": f"{key} must be a non-negative integer"}
+        if "max_running" in limits:
+            self._scheduler.max_running = limits["max_running"]
+        if "max_per_project" in limits:
+            self._scheduler.max_per_project = limits["max_per_project"]
+        self._admit_queued()
+        return {"status": "ok", "scheduler": self._scheduler_info()}
+
+    def _scheduler_info(self) -> dict[str, Any]:
+        """Scheduler limits and occupancy for stats/set_limits responses."""
+        return {
+            "max_running": self._scheduler.max_running,
+            "max_per_project": self._scheduler.max_per_project,
+            "active": len(self._active_projects()),
+            "queued": sum(1 for agent in self._agents.values() if agent.status == AgentStatus.QUEUED),
+            "cpu_count": os.cpu_count() or 1,
+        }
+
+    def _render_metrics(self) -> str:
+        """Render daemon metrics with gauges of the current agent and governor state."""
+        statuses = Counter(agent.status for agent in self._agents.values())
+        all_statuses = (
+            AgentStatus.QUEUED,
+            AgentStatus.STARTING,
+            AgentStatus.RUNNING,
+            AgentStatus.STOPPED,
+            AgentStatus.FAILED,
+            AgentStatus.READY,
+        )
+        governor = self._governor.stats()
+        resources = {agent_id: self._accountant.latest(agent_id) for agent_id in self._running_pids()}
+        return self._metrics.render(
+            [
+                gauge(
+                    "harness_daemon_uptime_seconds",
+                    "Seconds since the daemon started.",
+                    [({}, round(time.monotonic() - self._started_at, 3))],
+                ),
+                gauge(
+                    "harness_agents",
+                    "Registered agents by status.",
+                    [({"status": status}, statuses[status]) for status in all_statuses],
+                ),
+                gauge("harness_sessions_in_flight", "Agent sessions holding a lease.", [({}, governor["in_flight"])]),
+                gauge("harness_sessions_waiting", "Agents waiting for a session lease.", [({}, governor["waiting"])]),
+                gauge(
+                    "harness_session_cooldown_seconds",
+                    "Remaining rate-limit cooldown.",
+                    [({}, governor["cooldown_seconds"])],
+                ),
+                gauge(
+                    "harness_agent_cpu_seconds",
+                    "CPU time of the agent's process tree (latest sample).",
+                    [
+                        ({"agent_id": agent_id}, sample["cpu_seconds"])
+                        for agent_id, sample in resources.items()
+                        if sample
+                    ],
+                ),
+                gauge(
+                    "harness_agent_rss_bytes",
+                    "Resident memory of the agent's process tree (latest sample).",
+                    [
+                        ({"agent_id": agent_id}, sample["rss_kb"] * 1024)
+                        for agent_id, sample in resources.items()
+                        if sample
+                    ],
+                ),
+            ]
+        )
+
+    def _running_pids(self) -> dict[str, int]:
+        """PIDs of running agents, for resource accounting."""
+        return {
+            agent_id: agent.process.pid
+            for agent_id, agent in self._agents.items()
+            if agent.status == AgentStatus.RUNNING and agent.process is not None
+        }
+
+    def _agent_info(self, agent: AgentProcess) -> dict[str, Any]:
+        """Agent dict for list/status: to_dict() plus its latest resource sample."""
+        info = agent.to_dict()
+        info["resources"] = self._accountant.latest(agent.agent_id) if agent.status == AgentStatus.RUNNING else None
+        info["limits"] = self._limits.info(agent.agent_id)
+        info["log_capture"] = agent.log_capture.stats() if agent.log_capture else None
+        return info
+
+    def _on_limit_event(self, agent_id: str, limit: str, count: int) -> None:
+        """Publish an OOM/limit counter increase of an agent's cgroup."""
+        logger.warning("Agent %s hit a resource limit: %s (%d)", agent_id, limit, count)
+        self._events.publish(EventType.LIMIT_EXCEEDED, agent_id, limit=limit, count=count)
+
+    def _record_first_session(self, agent_id: str) -> None:
+        """Record launch metrics when an agent run asks for its first session."""
+        agent = self._agents.get(agent_id)
+        if not agent or agent.spawned_at is None or agent.launch_mode is None or agent.process is None:
+            return
+        agent.time_to_first_session = round(time.monotonic() - agent.spawned_at, 3)
+        agent.spawned_at = None
+        self._launch_stats.record_first_session(
+            agent.launch_mode, agent.time_to_first_session, read_process_memory(agent.process.pid)
+        )
+
+    async def _cmd_list(self, request: CommandRequest) -> CommandResponse:
+        """Handle list command - returns registered agents.
+
+        Args:
+            request: Command request with optional filters: status (str or
+                list of str), project_dir (str), and fields (list of agent
+                dict keys to return; agent_id is always included).
+
+        Returns:
+            Dict with status="ok" and agents list containing agent dicts.
+        """
+        statuses = request.get("status")
+        if isinstance(statuses, str):
+            statuses = [statuses]
+        if statuses is not None and not _is_str_list(statuses):
+            return {"status": "error", "message": "status must be a string or list of strings"}
+        project_dir = request.get("project_dir")
+        if project_dir is not None and not isinstance(project_dir, str):
+            return {"status": "error", "message": "project_dir must be a string"}
+        fields = request.get("fields")
+        if fields is not None and not _is_str_list(fields):
+            return {"status": "error", "message": "fields must be a list of strings"}
+
+        agents = []
+        for agent in self._agents.values():
+            if statuses is not None and agent.status not in statuses:
+                continue
+            if project_dir is not None and agent.config.get("project_dir") != project_dir:
+                continue
+            info = self._agent_info(agent)
+            if fields is not None:
+                info = {key: info[key] for key in ("agent_id", *fields) if key in info}
+            agents.append(info)
+        return {"status": "ok", "agents": agents}
+
     async def _cmd_register(self, request: CommandRequest) -> CommandResponse:
         """Handle register command - register agent without starting it.
 
@@ -378,6 +1131,7 @@ class AgentDaemon:
             status=AgentStatus.READY,
         )
         self._agents[agent_id] = agent
+        self._start_state_watcher(agent)
         self._save_state()
         return {"status": "ok", "agent": agent.to_dict()}
 
@@ -385,25 +1139,47 @@ class AgentDaemon:
         """Handle start command - start a new or existing agent.
 
         Args:
-            request: Command request containing agent_id and config.
+            request: Command request containing agent_id, config and optional
+                priority (higher starts first when queued, default 0).
 
         Returns:
-            Dict with status="ok" and agent dict, or error if agent_id missing/already running.
+            Dict with status="ok" and agent dict (status "queued" if no slot
+            is free), or error if agent_id missing/already running.
         """
         config: AgentConfig = request.get("config", {})
         agent_id = request.get("agent_id")
         if not agent_id:
             return {"status": "error", "message": "agent_id required"}
+        priority = request.get("priority", 0)
+        if not isinstance(priority, int) or isinstance(priority, bool):
+            return {"status": "error", "message": "priority must be an integer"}
+        validation_error = self._validate_start_config(config.get("spec_file"), config.get("project_dir"))
+        if validation_error:
+            return validation_error
+        try:
+            ResourceLimits.from_config(dict(config))
+        except ValueError as e:
+            return {"status": "error", "message": str(e)}
 
-        # If agent exists and is stopped/ready, start it
         if agent_id in self._agents:
             existing = self._agents[agent_id]
-            if existing.status == AgentStatus.RUNNING:
+            if existing.status in (AgentStatus.STARTING, AgentStatus.RUNNING):
                 return {"status": "error", "message": f"Agent {agent_id} already running"}
+            if existing.status == AgentStatus.QUEUED:
+                return {"status": "error", "message": f"Agent {agent_id} already queued"}
+
+        # Queue if the fleet or the project is at its running limit
+        if not self._scheduler.has_capacity(config.get("project_dir", ""), self._active_projects()):
+            return self._queue_agent(agent_id, config, priority)
+
+        # If agent exists and is stopped/ready, start it
+        if agent_id in self._agents:
+            existing = self._agents[agent_id]
             # Update config and start
             existing.config = config
+            existing.priority = priority
             return await self._start_existing_agent(agent_id, config)
-        return await self._start_agent(agent_id, config)
+        return await self._start_agent(agent_id, config, priority)
 
     async def _cmd_stop(self, request: CommandRequest) -> CommandResponse:
         """Handle stop command - stop a running agent.
@@ -427,13 +1203,16 @@ class AgentDaemon:
             request: Command request containing agent_id.
 
         Returns:
-            Dict with status="ok" and agent dict, or error if agent not found.
+            Dict with status="ok" and agent dict (with resource_history, the
+            agent's recent resource samples), or error if agent not found.
         """
         agent_id, error = self._validate_agent_id(request)
         if error:
             return error
         assert agent_id is not None  # For type checker
-        return {"status": "ok", "agent": self._agents[agent_id].to_dict()}
+        info = self._agent_info(self._agents[agent_id])
+        info["resource_history"] = self._accountant.history(agent_id)
+        return {"status": "ok", "agent": info}
 
     async def _cmd_remove(self, request: CommandRequest) -> CommandResponse:
         """Handle remove command - stop and remove an agent.
@@ -450,40 +1229,516 @@ class AgentDaemon:
         assert agent_id is not None  # For type checker
 
         agent = self._agents[agent_id]
+        self._scheduler.remove(agent_id)
         if agent.status == AgentStatus.RUNNING:
             await self._stop_agent(agent_id)
 
+        if agent.state_watcher:
+            agent.state_watcher.stop()
         del self._agents[agent_id]
+        # Still held by this command; later commands for the ID get a new lock
+        self._agent_locks.pop(agent_id, None)
+        self._accountant.forget(agent_id)
+        self._limits.forget(agent_id)
+        self._metrics.forget(agent_id)
         self._save_state()
+        self._admit_queued()
         return {"status": "ok", "message": f"Agent {agent_id} removed"}
 
-    async def _cmd_shutdown(self, _request: CommandRequest) -> CommandResponse:
+    async def _cmd_start_many(self, request: CommandRequest) -> CommandResponse:
+        """Handle start_many command - start several agents concurrently.
+
+        Args:
+            request: Command request containing agents, a list of
+                {"agent_id": ..., "config": ..., "priority": ...} items
+                (priority optional).
+
+        Returns:
+            Dict with status="ok" and per-item results (see _run_bulk).
+        """
+        items = request.get("agents")
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            return {"status": "error", "message": "agents must be a list of {agent_id, config} objects"}
+        return await self._run_bulk(
+            [
+                {
+                    "cmd": "start",
+                    "agent_id": item.get("agent_id"),
+                    "config": item.get("config", {}),
+                    "priority": item.get("priority", 0),
+                }
+                for item in items
+            ]
+        )
+
+    async def _cmd_stop_many(self, request: CommandRequest) -> CommandResponse:
+        """Handle stop_many command - stop several agents concurrently.
+
+        Args:
+            request: Command request containing agent_ids.
+
+        Returns:
+            Dict with status="ok" and per-item results (see _run_bulk).
+        """
+        agent_ids = request.get("agent_ids")
+        if not _is_str_list(agent_ids):
+            return {"status": "error", "message": "agent_ids must be a list of strings"}
+        return await self._run_bulk([{"cmd": "stop", "agent_id": agent_id} for agent_id in agent_ids])
+
+    async def _cmd_remove_many(self, request: CommandRequest) -> CommandResponse:
+        """Handle remove_many command - stop and remove several agents concurrently.
+
+        Args:
+            request: Command request containing agent_ids.
+
+        Returns:
+            Dict with status="ok" and per-item results (see _run_bulk).
+        """
+        agent_ids = request.get("agent_ids")
+        if not _is_str_list(agent_ids):
+            return {"status": "error", "message": "agent_ids must be a list of strings"}
+        return await self._run_bulk([{"cmd": "remove", "agent_id": agent_id} for agent_id in agent_ids])
+
+    async def _run_bulk(self, requests: list[CommandRequest]) -> CommandResponse:
+        """Run single-agent commands concurrently (each under its agent lock).
+
+        Returns:
+            Dict with status="ok", succeeded/failed counts and results, one
+            {"agent_id", "status", "agent" or "message"} dict per request in
+            request order.
+        """
+        responses = await asyncio.gather(*(self._process_command(req) for req in requests), return_exceptions=True)
+        results = []
+        for req, response in zip(requests, responses, strict=True):
+            if isinstance(response, BaseException):
+                response = {"status": "error", "message": f"Command failed: {response}"}
+            results.append({"agent_id": req.get("agent_id"), **response})
+        failed = sum(1 for result in results if result.get("status") != "ok")
+        return {"status": "ok", "succeeded": len(results) - failed, "failed": failed, "results": results}
+
+    async def _cmd_shutdown(self, request: CommandRequest) -> CommandResponse:
         """Handle shutdown command - gracefully shutdown the daemon.
 
         Args:
-            _request: Command request (unused for shutdown).
+            request: Command request with optional keep_agents (leave agents
+                running for the next daemon to re-adopt).
 
         Returns:
             Dict with status="ok" and shutdown message.
         """
-        asyncio.create_task(self.shutdown())
+        asyncio.create_task(self.shutdown(keep_agents=bool(request.get("keep_agents", False))))
         return {"status": "ok", "message": "Shutting down"}
 
+    async def _cmd_upgrade(self, _request: CommandRequest) -> CommandResponse:
+        """Handle upgrade command - hand the daemon over to the installed harness version.
+
+        Args:
+            _request: Command request (unused for upgrade).
+
+        Returns:
+            Dict with status="ok" and the new daemon's pid once it started
+            (the handoff then completes in the background), or error if it
+            could not be started.
+        """
+        if self._argv is None:
+            return {"status": "error", "message": "Upgrade requires a daemon started with python -m agent.daemon"}
+        if self._upgrading or self._shutdown:
+            return {"status": "error", "message": "Daemon is already upgrading or shutting down"}
+        self._upgrading = True
+        try:
+            successor = await Successor.spawn(_successor_argv(self._argv), _agent_environment(), HARNESS_ROOT)
+        except HandoffError as e:
+            self._upgrading = False
+            return {"status": "error", "message": str(e)}
+        self._upgrade_task = asyncio.create_task(self._hand_over(successor))
+        return {"status": "ok", "pid": successor.process.pid, "message": "Upgrading"}
+
+    async def _hand_over(self, successor: Successor) -> None:
+        """Hand agents and listening sockets to the new daemon version, then retire.
+
+        Falls back to this version (and resumes admitting queued agents) if
+        the new one fails to take over.
+        """
+        self._draining = True
+        # Let in-flight commands and queued-agent starts finish, so the agent table is final
+        while pending := self._command_tasks | self._background_tasks:
+            await asyncio.wait(pending)
+        self._detach_log_captures()
+        self._persister.flush()
+        self._handed_over = True
+
+        servers = {"unix": self._server, "tcp": self._tcp_server, "metrics": self._metrics_server}
+        sockets = {name: server.sockets[0].fileno() for name, server in servers.items() if server and server.sockets}
+        scheduler = {"max_running": self._scheduler.max_running, "max_per_project": self._scheduler.max_per_project}
+        try:
+            await successor.hand_over(self._state_snapshot(), scheduler, sockets)
+        except HandoffError as e:
+            logger.error("Upgrade failed, continuing with this version: %s", e)
+            await successor.abort()
+            self._handed_over = False
+            self._draining = False
+            self._upgrading = False
+            self._resume_log_captures()
+            self._admit_queued()
+            return
+        logger.info("New daemon version (PID %d) took over", successor.process.pid)
+        await self._retire()
+
+    def _detach_log_captures(self) -> None:
+        """Stop reading the output pipes of running agents and write out what was read.
+
+        The pipes stay (and stay in the state) for the next daemon to reattach.
+        """
+        for agent in self._agents.values():
+            if agent.log_capture:
+                agent.log_capture.close(remove_pipe=False)
+
+    def _resume_log_captures(self) -> None:
+        """Read the output pipes of running agents again (failed upgrade)."""
+        for agent in self._agents.values():
+            if agent.log_capture:
+                try:
+                    agent.log_capture.start()
+                except OSError as e:
+                    logger.warning("Cannot resume log capture of %s: %s", agent.agent_id, e)
+                    agent.log_capture = None
+
+    async def _retire(self) -> None:
+        """Stop supervising after an upgrade and move clients to the new daemon.
+
+        Agents, the socket path, the PID file and the state file now belong
+        to the new daemon and are left alone.
+        """
+        self._shutdown = True
+        for task in self._monitor_tasks.values():
+            task.cancel()
+        self._accountant.stop()
+        self._limits.stop()
+        for follower in self._log_followers.values():
+            follower.stop()
+        for agent in self._agents.values():
+            if agent.state_watcher:
+                agent.state_watcher.stop()
+        await self._forkserver.stop()
+        if self._federation:
+            await self._federation.close()
+
+        # Clients close their end once they moved to the new daemon
+        notice = json.dumps({"event": "reconnect"}).encode() + b"\n"
+        for writer in list(self._connections):
+            with contextlib.suppress(ConnectionResetError, BrokenPipeError):
+                writer.write(notice)
+        deadline = time.monotonic() + RECONNECT_GRACE
+        while self._connections and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        for writer in list(self._connections):
+            writer.close()
+
+        for server in (self._metrics_server, self._tcp_server, self._server):
+            if server:
+                server.close()
+        logger.info("Daemon replaced by the new version.")
+
+    async def _subscribe_logs(
+        self, request: CommandRequest, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Handle subscribe_logs command - stream an agent's log to the client.
+
+        Streams the log of the agent's current run from the requested byte
+        offset until the run has ended and everything was sent, or the client
+        disconnects. A chunk is only read after the previous one drained.
+        After the ok response the client receives {"event": "log", "offset",
+        "data"} messages, then {"event": "log_end"}; with "tail": N instead
+        of an offset the stream starts with the last N lines.
+
+        Args:
+            request: Command request containing agent_id and optional offset or tail.
+            reader: Client stream, only watched for disconnects.
+            writer: Client stream the events are written to.
+        """
+        remote_id = request.get("agent_id")
+        if (
+            self._federation is not None
+            and not request.get("local")
+            and isinstance(remote_id, str)
+            and remote_id not in self._agents
+        ):
+            peer = await self._federation.locate(remote_id)
+            if peer is not None:
+                await self._relay_logs(peer, request, reader, writer)
+                return
+
+        agent_id, error = self._validate_agent_id(request)
+        if error:
+            writer.write(json.dumps(error).encode() + b"\n")
+            await writer.drain()
+            return
+        assert agent_id is not None  # For type checker
+
+        agent = self._agents[agent_id]
+        log_file = agent.log_file
+        if log_file is None:
+            writer.write(json.dumps({"status": "error", "message": f"Agent {agent_id} has no log"}).encode() + b"\n")
+            await writer.drain()
+            return
+
+        offset = request.get("offset", 0)
+        if not isinstance(offset, int) or offset < 0:
+            offset = 0
+        # "tail": start with the last N lines, served from the capture's ring buffer when it has them
+        tail = request.get("tail")
+        recent = None
+        if isinstance(tail, int) and not isinstance(tail, bool) and tail > 0:
+            recent = agent.log_capture.tail(tail) if agent.log_capture else None
+            offset = recent[0] if recent else await asyncio.to_thread(_tail_offset, log_file, tail)
+
+        follower = self._log_followers.get(log_file)
+        if follower is None:
+            follower = self._log_followers[log_file] = LogFollower(log_file)
+        follower.subscribers += 1
+        follower.start()
+        writer.transport.set_write_buffer_limits(high=SUBSCRIBER_BUFFER_BYTES)
+        disconnected = asyncio.create_task(reader.read())
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        log_reader = LogReader(log_file)
+
+        try:
+            writer.write(json.dumps({"status": "ok", "agent_id": agent_id, "offset": offset}).encode() + b"\n")
+            if recent:
+                offset += len(recent[1])
+                event = {"event": "log", "agent_id": agent_id, "offset": offset, "data": decoder.decode(recent[1])}
+                writer.write(json.dumps(event).encode() + b"\n")
+            await writer.drain()
+
+            while True:
+                # Check for the end of the run before reading, so the last
+                # chunk written before the exit footer is never missed
+                run_ended = (
+                    agent.status not in (AgentStatus.STARTING, AgentStatus.RUNNING) or agent.log_file != log_file
+                )
+                changed_event = follower.changed()
+                # File I/O and decompression of rotated segments stay off the event loop
+                start, chunk = await asyncio.to_thread(log_reader.read, offset, LOG_CHUNK_BYTES)
+                if chunk:
+                    offset = start + len(chunk)
+                    event = {"event": "log", "agent_id": agent_id, "offset": offset, "data": decoder.decode(chunk)}
+                    writer.write(json.dumps(event).encode() + b"\n")
+                    await writer.drain()
+                    continue
+
+                if run_ended or self._agents.get(agent_id) is not agent:
+                    end = {"event": "log_end", "agent_id": agent_id, "offset": offset}
+                    writer.write(json.dumps(end).encode() + b"\n")
+                    await writer.drain()
+                    return
+
+                changed = asyncio.create_task(changed_event.wait())
+                await asyncio.wait({changed, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                changed.cancel()
+                if disconnected.done():
+                    return
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            disconnected.cancel()
+            follower.subscribers -= 1
+            if follower.subscribers == 0:
+                follower.stop()
+                self._log_followers.pop(log_file, None)
+
+    async def _subscribe_events(
+        self, request: CommandRequest, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Handle subscribe_events command - push daemon events to the client.
+
+        Streams events matching the optional "events" (types) and "agent_ids"
+        filters until the client disconnects. A client that falls more than
+        MAX_QUEUED_EVENTS behind gets an "overflow" event and is disconnected;
+        it should resync with list and subscribe again.
+
+        Args:
+            request: Command request with optional events and agent_ids lists.
+            reader: Client stream, only watched for disconnects.
+            writer: Client stream the events are written to.
+        """
+        event_types = request.get("events")
+        agent_ids = request.get("agent_ids")
+        error: CommandResponse | None = None
+        if event_types is not None and (
+            not isinstance(event_types, list) or not set(event_types).issubset(EventType.ALL)
+        ):
+            error = {"status": "error", "message": f"events must be a list of: {', '.join(sorted(EventType.ALL))}"}
+        elif agent_ids is not None and (
+            not isinstance(agent_ids, list) or not all(isinstance(a, str) for a in agent_ids)
+        ):
+            error = {"status": "error", "message": "agent_ids must be a list of strings"}
+        if error:
+            writer.write(json.dumps(error).encode() + b"\n")
+            await writer.drain()
+            return
+
+        subscription = self._events.subscribe(
+            frozenset(event_types) if event_types is not None else None,
+            frozenset(agent_ids) if agent_ids is not None else None,
+        )
+        # A coordinator also streams its peers' events (tagged with "host")
+        relays = (
+            self._federation.relay_events(subscription)
+            if self._federation is not None and not request.get("local")
+            else []
+        )
+        disconnected = asyncio.create_task(reader.read())
+        try:
+            writer.write(json.dumps({"status": "ok"}).encode() + b"\n")
+            await writer.drain()
+
+            while True:
+                next_event = asyncio.create_task(subscription.queue.get())
+                await asyncio.wait({next_event, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if not next_event.done():
+                    next_event.cancel()
+                    return
+                event = next_event.result()
+                writer.write(json.dumps(event).encode() + b"\n")
+                await writer.drain()
+                if event["event"] == EventType.OVERFLOW:
+                    return  # Relayed from a peer that dropped us
+                if subscription.overflowed and subscription.queue.empty():
+                    writer.write(json.dumps({"event": EventType.OVERFLOW}).encode() + b"\n")
+                    await writer.drain()
+                    return
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            disconnected.cancel()
+            for relay in relays:
+                relay.cancel()
+            self._events.unsubscribe(subscription)
+
+    async def _relay_logs(
+        self, peer: str, request: CommandRequest, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Relay subscribe_logs of an agent running on a federation peer.
+
+        Args:
+            peer: Address of the peer running the agent.
+            request: The client's subscribe_logs request.
+            reader: Client stream, only watched for disconnects.
+            writer: Client stream the peer's log events are written to.
+        """
+        federation = self._federation
+        assert federation is not None  # For type checker
+        agent_id = request["agent_id"]
+        status = await federation.forward(peer, {"cmd": "status", "agent_id": agent_id})
+        if status.get("status") == "ok" and not status["agent"].get("log_file"):
+            status = {"status": "error", "message": f"Agent {agent_id} has no log"}
+        if status.get("status") != "ok":
+            writer.write(json.dumps(status).encode() + b"\n")
+            await writer.drain()
+            return
+
+        offset = request.get("offset", 0)
+        if not isinstance(offset, int) or offset < 0:
+            offset = 0
+
+        async def pump() -> None:
+            async with contextlib.aclosing(federation.relay_logs(peer, request)) as stream:
+                async for message in stream:
+                    writer.write(json.dumps(message).encode() + b"\n")
+                    await writer.drain()
+
+        writer.transport.set_write_buffer_limits(high=SUBSCRIBER_BUFFER_BYTES)
+        response = {"status": "ok", "agent_id": agent_id, "offset": offset, "host": peer}
+        writer.write(json.dumps(response).encode() + b"\n")
+        await writer.drain()
+        relay = asyncio.create_task(pump())
+        disconnected = asyncio.create_task(reader.read())
+        try:
+            await asyncio.wait({relay, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if relay.done() and not relay.cancelled() and relay.exception():
+                logger.warning("Log relay of %s from %s failed: %s", agent_id, peer, relay.exception())
+        finally:
+            relay.cancel()
+            disconnected.cancel()
+
     async def _start_existing_agent(self, agent_id: str, config: AgentConfig) -> CommandResponse:
         """Start an existing (registered) agent process."""
         agent = self._agents[agent_id]
         return await self._do_start_agent(agent, config)
 
-    async def _start_agent(self, agent_id: str, config: AgentConfig) -> CommandResponse:
+    async def _start_agent(self, agent_id: str, config: AgentConfig, priority: int = 0) -> CommandResponse:
         """Start a new agent process (registers and starts)."""
         agent = AgentProcess(
             agent_id=agent_id,
             config=config,
             status=AgentStatus.STARTING,
+            priority=priority,
         )
         self._agents[agent_id] = agent
         return await self._do_start_agent(agent, config)
 
+    def _queue_agent(self, agent_id: str, config: AgentConfig, priority: int) -> CommandResponse:
+        """Register an agent as queued until the scheduler admits it."""
+        agent = self._agents.get(agent_id)
+        if agent is None:
+            agent = AgentProcess(agent_id=agent_id, config=config, status=AgentStatus.QUEUED)
+            self._agents[agent_id] = agent
+        agent.config = config
+        agent.status = AgentStatus.QUEUED
+        agent.priority = priority
+        agent.queued_at = datetime.now(UTC).isoformat()
+        self._start_state_watcher(agent)
+
+        self._scheduler.enqueue(agent_id, config.get("project_dir", ""), priority)
+        position = self._scheduler.position(agent_id)
+        self._save_state()
+        self._events.publish(EventType.AGENT_QUEUED, agent_id, priority=priority, position=position)
+        return {
+            "status": "ok",
+            "agent": agent.to_dict(),
+            "message": f"Agent {agent_id} queued (position {position})",
+        }
+
+    def _active_projects(self) -> list[str]:
+        """Return the project_dir of every starting or running agent (scheduler input)."""
+        return [
+            agent.config.get("project_dir", "")
+            for agent in self._agents.values()
+            if agent.status in (AgentStatus.STARTING, AgentStatus.RUNNING)
+        ]
+
+    def _admit_queued(self) -> None:
+        """Start queued agents that fit into free slots (each start runs as a task)."""
+        if self._shutdown or self._handed_over:
+            return
+        for agent_id in self._scheduler.pop_admissible(self._active_projects()):
+            agent = self._agents.get(agent_id)
+            if agent is None or agent.status != AgentStatus.QUEUED:
+                continue
+            agent.status = AgentStatus.STARTING  # Counts against the limits from now on
+            task = asyncio.create_task(self._start_queued_agent(agent_id))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+
+    async def _start_queued_agent(self, agent_id: str) -> None:
+        """Start an agent admitted from the queue."""
+        if agent_id not in self._agents:
+            return  # Removed since it was admitted (do not recreate its lock)
+        async with self._agent_locks.setdefault(agent_id, asyncio.Lock()):
+            agent = self._agents.get(agent_id)
+            if agent is None or agent.status != AgentStatus.STARTING:
+                return  # Stopped or removed while waiting for the lock
+            agent.queued_at = None
+            response = await self._do_start_agent(agent, agent.config)
+            if response.get("status") == "ok":
+                return
+            logger.warning("Failed to start queued agent %s: %s", agent_id, response.get("message"))
+            if agent.status == AgentStatus.STARTING:
+                agent.status = AgentStatus.FAILED
+                self._save_state()
+                self._events.publish(EventType.AGENT_FAILED, agent_id, message=response.get("message"))
+        self._admit_queued()
+
     def _validate_start_config(self, spec_file: str | None, project_dir: str | None) -> CommandResponse | None:
         """Validate required config fields for starting an agent.
 
@@ -580,6 +1835,11 @@ class AgentDaemon:
         assert spec_file is not None
         assert project_dir is not None
 
+        try:
+            limits = ResourceLimits.from_config(dict(config))
+        except ValueError as e:
+            return {"status": "error", "message": str(e)}
+
         # Create log file in project's agent directory (project-scoped, persisted)
         spec_slug = config.get("spec_slug", "unknown")
         spec_hash = config.get("spec_hash", "00000")
@@ -603,10 +1863,8 @@ class AgentDaemon:
         )
 
         # Set up environment
-        env = os.environ.copy()
-        # Add harness directory to PYTHONPATH so agent.cli can be found
-        harness_dir = str(Path(__file__).parent.parent.parent)
-        env["PYTHONPATH"] = harness_dir + os.pathsep + env.get("PYTHONPATH", "")
+        env = _agent_environment()
+        env[AGENT_ID_ENV] = agent_id
 
         # Update agent record
         agent.log_file = log_file
@@ -620,22 +1878,59 @@ class AgentDaemon:
                 log_f.write(f"Command: {' '.join(cmd)}\n")
                 log_f.write(f"Working directory: {project_dir}\n")
                 log_f.write("=" * 60 + "\n\n")
-                log_f.flush()
-
-                process = subprocess.Popen(
-                    cmd,
-                    stdout=log_f,
-                    stderr=subprocess.STDOUT,
-                    cwd=project_dir,
-                    env=env,
-                    start_new_session=True,  # Detach from terminal
+
+            # Output goes through a pipe the daemon reads (direct to the log file if unavailable)
+            capture = LogCapture.create(LOG_PIPE_DIR, log_file.stem, log_file, self._log_writer(log_file))
+            output = capture.pipe_path if capture else log_file
+
+            # Prepared before the launch: the agent applies them to itself before it runs
+            launch_limits = await self._limits.prepare(agent_id, limits)
+
+            # Fork from the pre-warmed zygote; exec if it is unavailable
+            spawn_started = time.monotonic()
+            launch_mode = LaunchMode.FORKSERVER
+            try:
+                process: asyncio.subprocess.Process | AdoptedProcess | None = await self._forkserver.spawn(
+                    cmd, project_dir, env, output, launch_limits.to_request() if launch_limits else None
                 )
+                if process is None:
+                    launch_mode = LaunchMode.EXEC
+                    # The pipe is opened read-write, so the agent never gets EPIPE while no daemon reads it
+                    output_fd = os.open(output, os.O_RDWR if capture else os.O_WRONLY | os.O_APPEND)
+                    try:
+                        process = await asyncio.create_subprocess_exec(
+                            *(launch_limits.wrap_command(cmd) if launch_limits else cmd),
+                            stdout=output_fd,
+                            stderr=subprocess.STDOUT,
+                            cwd=project_dir,
+                            env=env,
+                            start_new_session=True,  # Detach from terminal
+                        )
+                    finally:
+                        os.close(output_fd)
+            except (OSError, subprocess.SubprocessError):
+                if capture:
+                    capture.close()
+                raise
+            agent.log_capture = capture
+            agent.spawned_at = time.monotonic()
+            self._launch_stats.record_spawn(launch_mode, agent.spawned_at - spawn_started)
+            self._limits.apply(agent_id, process.pid, launch_limits)
 
             agent.process = process
+            agent.pid_start_time = read_process_start_time(process.pid)
+            agent.launch_mode = launch_mode
+            agent.time_to_first_session = None
             agent.status = AgentStatus.RUNNING
 
-            # Start monitor task
-            self._monitor_tasks[agent_id] = asyncio.create_task(self._monitor_agent(agent_id))
+            # Watch for exit
+            self._monitor_tasks[agent_id] = asyncio.create_task(self._monitor_agent(agent_id, process))
+
+            # Watch checkpoints/phase (config may have changed since registration)
+            self._start_state_watcher(agent)
+            self._events.publish(
+                EventType.AGENT_STARTED, agent_id, pid=process.pid, log_file=str(log_file), launch_mode=launch_mode
+            )
 
             # Persist state
             self._save_state()
@@ -649,6 +1944,8 @@ class AgentDaemon:
         except (OSError, subprocess.SubprocessError) as e:
             agent.status = AgentStatus.FAILED
             self._save_state()
+            self._events.publish(EventType.AGENT_FAILED, agent_id, message=str(e))
+            self._admit_queued()
             return {"status": "error", "message": f"Failed to start agent: {e}"}
 
     async def _stop_agent(self, agent_id: str) -> CommandResponse:
@@ -657,57 +1954,77 @@ class AgentDaemon:
         if not agent:
             return {"status": "error", "message": f"Agent {agent_id} not found"}
 
-        if agent.process and agent.process.poll() is None:
+        # A queued agent has no process: just leave the queue
+        if self._scheduler.remove(agent_id):
+            agent.status = AgentStatus.STOPPED
+            agent.queued_at = None
+            self._save_state()
+            self._events.publish(EventType.AGENT_EXITED, agent_id, exit_code=None, status=agent.status)
+            return {"status": "ok", "agent": agent.to_dict()}
+
+        # Stop watching first so the exit is recorded once, as "stopped"
+        if agent_id in self._monitor_tasks:
+            self._monitor_tasks.pop(agent_id).cancel()
+
+        process = agent.process
+        if process and process.returncode is None:
             # Process is running, terminate it
-            agent.process.terminate()
+            with contextlib.suppress(ProcessLookupError):
+                process.terminate()
             try:
                 # Wait up to 5 seconds for graceful shutdown
-                await asyncio.wait_for(
-                    asyncio.create_task(asyncio.to_thread(agent.process.wait)),
-                    timeout=5.0,
-                )
+                await asyncio.wait_for(process.wait(), timeout=5.0)
             except TimeoutError:
                 # Force kill
-                agent.process.kill()
-                agent.process.wait()
+                with contextlib.suppress(ProcessLookupError):
+                    process.kill()
+                await process.wait()
 
-            agent.exit_code = agent.process.returncode
+            agent.exit_code = process.returncode
 
         agent.status = AgentStatus.STOPPED
         agent.stopped_at = datetime.now(UTC).isoformat()
 
-        # Append to log
+        # Append to log, after the rest of the run's output
+        self._close_log_capture(agent)
         self._append_to_log(
             agent.log_file,
             f"\n=== Agent stopped at {agent.stopped_at} ===\nExit code: {agent.exit_code}\n",
         )
 
-        # Cancel monitor task
-        if agent_id in self._monitor_tasks:
-            self._monitor_tasks[agent_id].cancel()
-            del self._monitor_tasks[agent_id]
-
         # Persist state
         self._save_state()
+        self._limits.poll(agent_id)
+        self._limits.release(agent_id)
+        self._events.publish(EventType.AGENT_EXITED, agent_id, exit_code=agent.exit_code, status=agent.status)
+        self._governor.release_agent(agent_id)
+        self._admit_queued()
 
         return {"status": "ok", "agent": agent.to_dict()}
 
-    async def _monitor_agent(self, agent_id: str) -> None:
-        """Monitor an agent process for completion."""
-        agent = self._agents.get(agent_id)
-        if not agent or not agent.process:
-            return
+    async def _monitor_agent(self, agent_id: str, process: asyncio.subprocess.Process | AdoptedProcess) -> None:
+        """Wait for an agent process to exit and record it.
 
+        Args:
+            agent_id: Agent whose process is watched.
+            process: The process started for this run (a restarted agent gets
+                a new watcher, so a stale one never touches the new run).
+        """
         try:
-            while agent.process.poll() is None:
-                await asyncio.sleep(1.0)
+            exit_code = await process.wait()
+
+            agent = self._agents.get(agent_id)
+            if not agent or agent.process is not process:
+                return
+            self._monitor_tasks.pop(agent_id, None)
 
             # Process has exited
-            agent.exit_code = agent.process.returncode
+            agent.exit_code = exit_code
             agent.status = AgentStatus.STOPPED
             agent.stopped_at = datetime.now(UTC).isoformat()
 
-            # Append to log
+            # Append to log, after the rest of the run's output
+            self._close_log_capture(agent)
             self._append_to_log(
                 agent.log_file,
                 f"\n=== Agent exited at {agent.stopped_at} ===\nExit code: {agent.exit_code}\n",
@@ -715,11 +2032,87 @@ class AgentDaemon:
 
             # Persist state
             self._save_state()
+            self._limits.poll(agent_id)
+            self._limits.release(agent_id)
+            self._events.publish(EventType.AGENT_EXITED, agent_id, exit_code=exit_code, status=agent.status)
+            self._governor.release_agent(agent_id)
+            self._admit_queued()
 
         except asyncio.CancelledError:
             pass
 
 
+def _agent_environment() -> dict[str, str]:
+    """Build the base environment of agent processes (and the zygote)."""
+    env = os.environ.copy()
+    # Add harness directory to PYTHONPATH so agent.cli can be found
+    harness_dir = str(Path(__file__).parent.parent.parent)
+    env["PYTHONPATH"] = harness_dir + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def _tail_offset(log_file: Path, lines: int) -> int:
+    """Byte offset of the last lines of a (possibly rotated) log, looking back at most LOG_CHUNK_BYTES.
+
+    Runs in a worker thread (file I/O, decompression).
+
+    Returns:
+        The offset, 0 if the log is missing.
+    """
+    log_reader = LogReader(log_file)
+    end = log_size(log_file)
+    start, data = log_reader.read(max(end - LOG_CHUNK_BYTES, 0), LOG_CHUNK_BYTES)
+    while data and start + len(data) < end:
+        _, more = log_reader.read(start + len(data), end - start - len(data))  # Crosses a segment
+        if not more:
+            break
+        data += more
+    cut = len(data)
+    for _ in range(lines + 1 if data.endswith(b"\n") else lines):
+        cut = data.rfind(b"\n", 0, cut)
+        if cut < 0:
+            return start
+    return start + cut + 1
+
+
+def _adopt_process(pid: Any, start_time: Any) -> AdoptedProcess | None:
+    """Re-adopt a persisted agent process if it is still the same running process.
+
+    Returns:
+        Handle for the process, or None if it exited (or its PID was reused).
+    """
+    if not isinstance(pid, int) or not isinstance(start_time, int):
+        return None
+    if read_process_start_time(pid) != start_time:
+        return None
+    return AdoptedProcess(pid, start_time)
+
+
+def _successor_argv(argv: list[str]) -> list[str]:
+    """Arguments for the daemon that replaces this one (without one-shot and handoff options)."""
+    result: list[str] = []
+    skip_value = False
+    for arg in argv:
+        if skip_value:
+            skip_value = False
+        elif arg == TAKEOVER_FD_ARG:
+            skip_value = True
+        elif arg not in ("--background", "--upgrade") and not arg.startswith(f"{TAKEOVER_FD_ARG}="):
+            result.append(arg)
+    return result
+
+
+def _is_str_list(value: Any) -> bool:
+    """Check that a request field is a list of strings."""
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+async def _request_upgrade() -> int:
+    """Ask the running daemon to hand over to this version; returns the new daemon's PID."""
+    async with DaemonClient() as client:
+        return await client.upgrade_daemon()
+
+
 def main() -> None:
     """Main entry point."""
     # Configure logging for the daemon
@@ -730,8 +2123,55 @@ def main() -> None:
 
     parser = argparse.ArgumentParser(description="Coding Harness Agent Daemon")
     parser.add_argument("--background", action="store_true", help="Run in background")
+    parser.add_argument("--max-running", type=int, default=None, help="Max agents running at once (0 = unlimited)")
+    parser.add_argument(
+        "--max-per-project", type=int, default=None, help="Max agents running at once per project (0 = unlimited)"
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=metrics_port_from_env(),
+        help="Serve Prometheus metrics on http://127.0.0.1:PORT/metrics",
+    )
+    parser.add_argument(
+        "--tcp",
+        default=os.environ.get(DAEMON_TCP_ENV) or None,
+        metavar="HOST:PORT",
+        help=f"Also listen on TCP (requires {DAEMON_TOKEN_ENV})",
+    )
+    parser.add_argument(
+        "--peer",
+        action="append",
+        default=None,
+        metavar="HOST:PORT",
+        help="Coordinate a federation with this peer daemon (repeatable)",
+    )
+    parser.add_argument(
+        "--upgrade", action="store_true", help="Replace the running daemon by this version, keeping its agents"
+    )
+    parser.add_argument(TAKEOVER_FD_ARG, type=int, default=None, help=argparse.SUPPRESS)
     args = parser.parse_args()
 
+    if args.upgrade:
+        try:
+            pid = asyncio.run(_request_upgrade())
+        except DaemonError as e:
+            logger.error("Upgrade failed: %s", e)
+            sys.exit(1)
+        logger.info("New daemon version started (PID: %d), taking over", pid)
+        return
+
+    token = os.environ.get(DAEMON_TOKEN_ENV) or None
+    peers = args.peer if args.peer is not None else Federation.peers_from_env()
+    try:
+        if args.tcp is not None:
+            parse_address(args.tcp)
+        if (args.tcp or peers) and not token:
+            raise ValueError(f"--tcp and --peer require {DAEMON_TOKEN_ENV}")
+        federation = Federation(peers, token or "") if peers else None
+    except ValueError as e:
+        parser.error(str(e))
+
     if args.background:
         # Fork and run in background
         pid = os.fork()
@@ -742,7 +2182,29 @@ def main() -> None:
         # Child continues
         os.setsid()
 
-    daemon = AgentDaemon()
+    scheduler = AgentScheduler.from_env()
+    if args.max_running is not None:
+        scheduler.max_running = max(args.max_running, 0)
+    if args.max_per_project is not None:
+        scheduler.max_per_project = max(args.max_per_project, 0)
+
+    handoff = None
+    if args.takeover_fd is not None:
+        try:
+            handoff = Handoff.receive(args.takeover_fd)
+        except HandoffError as e:
+            logger.error("%s", e)
+            sys.exit(1)
+
+    daemon = AgentDaemon(
+        scheduler,
+        metrics_port=args.metrics_port,
+        tcp_address=args.tcp,
+        token=token,
+        federation=federation,
+        argv=sys.argv[1:],
+        handoff=handoff,
+    )
     with contextlib.suppress(KeyboardInterrupt, asyncio.CancelledError):
         asyncio.run(daemon.start())
 
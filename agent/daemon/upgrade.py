@@ -0,0 +1,207 @@
+"""
+Daemon Upgrade Handoff
+======================
+
+Zero-downtime replacement of a running daemon by a new version (the
+"upgrade" command).
+
+The running daemon starts the new version with the same arguments plus
+--takeover-fd FD, one end of a Unix socketpair. Over that channel:
+
+1. new -> old: {"event": "hello"} once the new code imported and parsed
+   its arguments (a broken update fails here and the old daemon keeps
+   running),
+2. old -> new: its listening sockets (Unix socket, TCP, metrics) over
+   SCM_RIGHTS, followed by one JSON line with the agent table (the
+   persisted state: PIDs, /proc start times, log files, ...) and the
+   scheduler limits,
+3. new -> old: {"event": "ready"} once it re-adopted the agents and serves
+   on the inherited sockets.
+
+The socket path never disappears, so clients only see their connection end
+(see "reconnect" in server.py) and reconnect to the new daemon.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+import socket
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO
+
+logger = logging.getLogger(__name__)
+
+TAKEOVER_FD_ARG = "--takeover-fd"
+
+# Seconds the new daemon has to start (import) and to take over
+HANDOFF_TIMEOUT = 60.0
+
+# Most listening sockets handed over (Unix socket, TCP, metrics)
+MAX_HANDOFF_FDS = 8
+
+
+class HandoffError(Exception):
+    """The handoff between the old and the new daemon failed."""
+
+
+@dataclass
+class Handoff:
+    """What the new daemon received from the one it replaces."""
+
+    state: dict[str, Any]  # Persisted daemon state (agents)
+    scheduler: dict[str, Any]  # Scheduler limits in effect
+    sockets: dict[str, socket.socket]  # Listening sockets by name ("unix", "tcp", "metrics")
+    channel: socket.socket
+
+    @classmethod
+    def receive(cls, fd: int) -> Handoff:
+        """Announce the new daemon on the handoff channel and receive the old one's sockets and state.
+
+        Args:
+            fd: Channel fd (the --takeover-fd argument)
+
+        Raises:
+            HandoffError: If the old daemon does not complete the handoff
+        """
+        channel = socket.socket(fileno=fd)
+        channel.settimeout(HANDOFF_TIMEOUT)
+        try:
+            _send_message(channel, {"event": "hello"})
+            _, fds, _, _ = socket.recv_fds(channel, 1, MAX_HANDOFF_FDS)
+            with channel.makefile("rb") as reader:
+                message = _receive_message(reader)
+        except (OSError, ValueError) as e:
+            channel.close()
+            raise HandoffError(f"Handoff from the old daemon failed: {e}") from e
+        names = message.get("sockets", {})
+        sockets = {name: socket.socket(fileno=fds[index]) for name, index in names.items() if index < len(fds)}
+        return cls(message.get("state", {}), message.get("scheduler", {}), sockets, channel)
+
+    def ready(self) -> None:
+        """Tell the old daemon that this one took over, and close the channel."""
+        with contextlib.suppress(OSError):
+            _send_message(self.channel, {"event": "ready"})
+        self.channel.close()
+
+
+class Successor:
+    """The new daemon started by the old one during an upgrade."""
+
+    def __init__(self, process: subprocess.Popen[bytes], channel: socket.socket) -> None:
+        self.process = process
+        self._channel = channel
+        self._reader = channel.makefile("rb")
+
+    @classmethod
+    async def spawn(cls, argv: list[str], env: dict[str, str], cwd: Path) -> Successor:
+        """Start the new daemon version and wait until it is up.
+
+        Args:
+            argv: Daemon arguments (without --background)
+            env: Environment of the new daemon
+            cwd: Working directory (harness root)
+
+        Raises:
+            HandoffError: If it fails to start or does not answer in time
+        """
+        channel, child_channel = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            process = subprocess.Popen(  # pylint: disable=consider-using-with
+                [sys.executable, "-m", "agent.daemon", *argv, TAKEOVER_FD_ARG, str(child_channel.fileno())],
+                pass_fds=(child_channel.fileno(),),
+                env=env,
+                cwd=cwd,
+                start_new_session=True,
+            )
+        except OSError as e:
+            channel.close()
+            raise HandoffError(f"Failed to start new daemon: {e}") from e
+        finally:
+            child_channel.close()
+
+        logger.info("Started new daemon version (PID %d)", process.pid)
+        channel.settimeout(HANDOFF_TIMEOUT)
+        successor = cls(process, channel)
+        try:
+            await successor._expect("hello")
+        except HandoffError:
+            await successor.abort()
+            raise
+        return successor
+
+    async def hand_over(self, state: dict[str, Any], scheduler: dict[str, Any], sockets: dict[str, int]) -> None:
+        """Send the listening sockets and agent table, then wait until the new daemon took over.
+
+        Args:
+            state: Persisted daemon state
+            scheduler: Scheduler limits in effect
+            sockets: Listening socket fds by name
+
+        Raises:
+            HandoffError: If the new daemon fails to take over
+        """
+        names = list(sockets)
+        message = {"state": state, "scheduler": scheduler, "sockets": {name: i for i, name in enumerate(names)}}
+
+        def send() -> None:
+            socket.send_fds(self._channel, [b"F"], [sockets[name] for name in names])
+            _send_message(self._channel, message)
+
+        try:
+            await asyncio.to_thread(send)
+        except OSError as e:
+            raise HandoffError(f"Failed to send handoff: {e}") from e
+        await self._expect("ready")
+        self._close_channel()
+
+    async def abort(self) -> None:
+        """Kill the new daemon (handoff failed)."""
+        self._close_channel()
+        if self.process.poll() is None:
+            self.process.kill()
+        await asyncio.to_thread(self.process.wait)
+
+    async def _expect(self, event: str) -> None:
+        """Wait for an event from the new daemon."""
+        try:
+            message = await asyncio.to_thread(_receive_message, self._reader)
+        except (OSError, ValueError) as e:
+            raise HandoffError(f"New daemon did not report {event}: {e}") from e
+        if message.get("event") != event:
+            raise HandoffError(f"New daemon sent {message.get('event')!r} instead of {event!r}")
+
+    def _close_channel(self) -> None:
+        """Close the handoff channel."""
+        self._reader.close()
+        self._channel.close()
+
+
+# ============================================================================
+# Private Helper Functions
+# ============================================================================
+
+
+def _send_message(channel: socket.socket, message: dict[str, Any]) -> None:
+    """Send one JSON line."""
+    channel.sendall(json.dumps(message).encode() + b"\n")
+
+
+def _receive_message(reader: BinaryIO) -> dict[str, Any]:
+    """Receive one JSON line.
+
+    Raises:
+        ValueError: If the channel closed or the line is not a JSON object
+    """
+    data = reader.readline()
+    if not data:
+        raise ValueError("channel closed")
+    message = json.loads(data)
+    if not isinstance(message, dict):
+        raise ValueError("invalid message")
+    return message
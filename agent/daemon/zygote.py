@@ -0,0 +1,176 @@
+"""
+Agent Zygote
+============
+
+Pre-warmed fork server for agent processes (like multiprocessing's
+forkserver). Started by the daemon as ``python -m agent.daemon.zygote``; it
+imports the agent runtime (claude_agent_sdk, agent.cli and everything it
+pulls in: prompts, core, common) once, then forks a child per agent that
+runs agent.cli.main() without re-importing anything. Pages of the imported
+modules stay shared with the zygote until written.
+
+Protocol (newline-delimited JSON; requests on stdin, replies on stdout):
+    -> {"id": 1, "args": [...], "cwd": "...", "env": {...}, "log_file": "...", "limits": {...}}
+    <- {"id": 1, "pid": 1234}                 (or {"id": 1, "error": "..."})
+    <- {"event": "exit", "pid": 1234, "returncode": 0}
+
+"args" are agent.cli's command line arguments. The child starts a new
+session, appends its stdout/stderr to log_file and replaces its environment
+with env. With "limits" (see limits.apply_to_self()) it joins the agent's
+cgroup and sets its rlimits before running the agent. The zygote reaps its children and reports their exit codes.
+It must stay single-threaded with no event loop, so forking is safe.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import selectors
+import signal
+import socket
+import stat
+import sys
+import traceback
+from typing import Any
+
+from .limits import apply_to_self
+
+
+def main() -> None:
+    """Pre-import the agent runtime, then serve spawn requests until stdin closes."""
+    # The point of the zygote: pay these imports once
+    from agent import cli  # noqa: F401  # pylint: disable=import-outside-toplevel,unused-import
+
+    protocol_out = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8", buffering=1)
+    # Nothing else may write to the protocol channel
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, sys.stdout.fileno())
+    os.close(devnull)
+
+    wakeup_read, wakeup_write = socket.socketpair()
+    wakeup_read.setblocking(False)
+    wakeup_write.setblocking(False)
+    signal.set_wakeup_fd(wakeup_write.fileno())
+    signal.signal(signal.SIGCHLD, lambda *_: None)  # Handler needed for the wakeup fd to fire
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Stopped by closing stdin, not by the terminal
+
+    selector = selectors.DefaultSelector()
+    selector.register(sys.stdin.fileno(), selectors.EVENT_READ, "request")
+    selector.register(wakeup_read, selectors.EVENT_READ, "signal")
+    zygote_fds = (protocol_out.fileno(), wakeup_read.fileno(), wakeup_write.fileno())
+    _send(protocol_out, {"event": "ready", "pid": os.getpid()})
+
+    pending = b""
+    while True:
+        for key, _ in selector.select():
+            if key.data == "signal":
+                with contextlib.suppress(BlockingIOError):
+                    while wakeup_read.recv(4096):
+                        pass
+                _reap_children(protocol_out)
+                continue
+
+            data = os.read(sys.stdin.fileno(), 65536)
+            if not data:
+                return  # Daemon went away; running agents keep running
+            pending += data
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                try:
+                    pid = _fork_agent(request, zygote_fds)
+                except (OSError, KeyError, TypeError, AttributeError) as e:
+                    _send(protocol_out, {"id": request.get("id"), "error": str(e)})
+                else:
+                    _send(protocol_out, {"id": request.get("id"), "pid": pid})
+
+
+# ============================================================================
+# Private Helper Functions
+# ============================================================================
+
+
+def _send(out: Any, message: dict[str, Any]) -> None:
+    """Write one protocol message."""
+    out.write(json.dumps(message) + "\n")
+    out.flush()
+
+
+def _reap_children(out: Any) -> None:
+    """Collect exited children and report their exit codes."""
+    while True:
+        try:
+            pid, wait_status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        _send(out, {"event": "exit", "pid": pid, "returncode": os.waitstatus_to_exitcode(wait_status)})
+
+
+def _fork_agent(request: dict[str, Any], zygote_fds: tuple[int, ...]) -> int:
+    """Fork a child that runs agent.cli with the requested arguments.
+
+    Returns:
+        The child's PID (in the zygote)
+    """
+    args = [str(arg) for arg in request["args"]]
+    cwd = str(request["cwd"])
+    env = {str(key): str(value) for key, value in request["env"].items()}
+    log_file = str(request["log_file"])
+    limits = request.get("limits")
+    # A daemon capture pipe is opened read-write, so the agent never gets EPIPE while no daemon reads it
+    try:
+        is_pipe = stat.S_ISFIFO(os.stat(log_file).st_mode)
+    except FileNotFoundError:
+        is_pipe = False
+    log_fd = os.open(log_file, os.O_RDWR if is_pipe else os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    pid = os.fork()
+    if pid:
+        os.close(log_fd)
+        return pid
+
+    # Child: never returns into the zygote loop
+    exit_code = 1
+    try:
+        os.setsid()
+        if limits:
+            apply_to_self(limits)
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        for fd in zygote_fds:
+            os.close(fd)
+        stdin_fd = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(stdin_fd, 0)
+        os.close(stdin_fd)
+        os.dup2(log_fd, 1)
+        os.dup2(log_fd, 2)
+        os.close(log_fd)
+        os.chdir(cwd)
+        os.environ.clear()
+        os.environ.update(env)
+
+        from agent import cli  # pylint: disable=import-outside-toplevel
+
+        sys.argv = ["agent.cli", *args]
+        cli.main()
+        exit_code = 0
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException:  # pylint: disable=broad-exception-caught
+        traceback.print_exc()
+    finally:
+        with contextlib.suppress(Exception):
+            sys.stdout.flush()
+            sys.stderr.flush()
+        os._exit(exit_code)  # Skip the zygote's atexit handlers and buffered state
+
+
+if __name__ == "__main__":
+    main()
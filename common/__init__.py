@@ -6,14 +6,19 @@ since they are tightly coupled with the daemon communication implementation.
 
 # Explicit re-exports for proper package API
 # pylint: disable=useless-import-alias
+from .checkpoint_index import CheckpointIndex as CheckpointIndex
+from .checkpoint_journal import CheckpointJournal as CheckpointJournal
 from .exceptions import CheckpointError as CheckpointError
 from .exceptions import CodingHarnessError as CodingHarnessError
 from .exceptions import StateError as StateError
+from .sqlite_state import SqliteStateRepository as SqliteStateRepository
 from .state import AgentState as AgentState
+from .state import CachingStateRepository as CachingStateRepository
 from .state import FileStateRepository as FileStateRepository
 from .state import MilestoneState as MilestoneState
 from .state import StateRepository as StateRepository
 from .state import WorkspaceInfo as WorkspaceInfo
+from .state import create_state_repository as create_state_repository
 from .types import CheckpointData as CheckpointData
 from .types import CheckpointStatus as CheckpointStatus
 from .types import CheckpointType as CheckpointType
@@ -26,16 +31,22 @@ from .utils import validate_required_env_vars as validate_required_env_vars
 # pylint: enable=useless-import-alias
 
 __all__ = [
+    # Checkpoint index / journal
+    "CheckpointIndex",
+    "CheckpointJournal",
     # Exceptions
     "CheckpointError",
     "CodingHarnessError",
     "StateError",
     # State
     "AgentState",
+    "CachingStateRepository",
     "FileStateRepository",
     "MilestoneState",
+    "SqliteStateRepository",
     "StateRepository",
     "WorkspaceInfo",
+    "create_state_repository",
     # Types
     "CheckpointData",
     "CheckpointStatus",
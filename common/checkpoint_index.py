@@ -0,0 +1,174 @@
+"""
+Checkpoint Log Index
+====================
+
+Maintained index over a HITL checkpoint log so that the common queries
+(latest pending checkpoint, latest checkpoint of a type, lookup by id) do
+not scan every checkpoint of every issue.
+
+The index is updated incrementally: update() compares each entry's
+signature with what was indexed before and only touches entries that were
+added, changed or removed.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+# Signature of an indexed entry: (checkpoint_type, status, completed, created_at)
+_EntrySignature = tuple[str | None, str | None, bool, str]
+
+
+class CheckpointIndex:
+    """Index of a checkpoint log ({issue_key: [checkpoint dicts]}).
+
+    Maintains:
+    - pending: checkpoint ids with completed=False
+    - latest per checkpoint_type (by created_at)
+    - checkpoint_id -> (issue_key, position) location
+
+    The log data passed to update() is retained (not copied) and must not be
+    mutated afterwards; pass a freshly parsed log for each change.
+    """
+
+    def __init__(self) -> None:
+        self._log_data: dict[str, list[dict[str, Any]]] = {}
+        self._locations: dict[str, tuple[str, int]] = {}
+        self._signatures: dict[str, _EntrySignature] = {}
+        self._pending: dict[str, None] = {}  # Insertion-ordered set
+        self._ids_by_type: dict[str, dict[str, None]] = {}
+        self._latest_by_type: dict[str, str] = {}
+        self._latest_pending: str | None = None
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    @property
+    def pending_ids(self) -> frozenset[str]:
+        """Ids of all checkpoints not yet completed."""
+        return frozenset(self._pending)
+
+    def update(self, log_data: dict[str, list[dict[str, Any]]]) -> None:
+        """Bring the index in line with a newly loaded checkpoint log.
+
+        Args:
+            log_data: Parsed checkpoint log ({issue_key: [checkpoint dicts]})
+        """
+        locations: dict[str, tuple[str, int]] = {}
+        dirty_types: set[str] = set()
+        pending_dirty = False
+
+        for issue_key, checkpoints in log_data.items():
+            if not isinstance(checkpoints, list):
+                continue
+            for position, ckpt in enumerate(checkpoints):
+                if not isinstance(ckpt, dict):
+                    continue
+                checkpoint_id = ckpt.get("checkpoint_id")
+                if not isinstance(checkpoint_id, str) or checkpoint_id in locations:
+                    # Entries without a (unique) id are still indexed, keyed by location
+                    checkpoint_id = f"@{issue_key}:{position}"
+                locations[checkpoint_id] = (issue_key, position)
+
+                signature: _EntrySignature = (
+                    ckpt.get("checkpoint_type"),
+                    ckpt.get("status"),
+                    bool(ckpt.get("completed", False)),
+                    str(ckpt.get("created_at", "")),
+                )
+                previous = self._signatures.get(checkpoint_id)
+                if previous == signature:
+                    continue
+                if previous is not None:
+                    pending_dirty |= self._remove_entry(checkpoint_id, dirty_types)
+                self._add_entry(checkpoint_id, signature)
+
+        for checkpoint_id in [cid for cid in self._signatures if cid not in locations]:
+            pending_dirty |= self._remove_entry(checkpoint_id, dirty_types)
+
+        self._log_data = log_data
+        self._locations = locations
+
+        # Only recompute "latest" pointers whose entry was changed or removed
+        for checkpoint_type in dirty_types:
+            latest = self._latest_of(self._ids_by_type.get(checkpoint_type, {}))
+            if latest is None:
+                self._latest_by_type.pop(checkpoint_type, None)
+            else:
+                self._latest_by_type[checkpoint_type] = latest
+        if pending_dirty:
+            self._latest_pending = self._latest_of(self._pending)
+
+    def get(self, checkpoint_id: str) -> dict[str, Any] | None:
+        """Get a checkpoint dict by id."""
+        location = self._locations.get(checkpoint_id)
+        if location is None:
+            return None
+        issue_key, position = location
+        return self._log_data[issue_key][position]
+
+    def locate(self, checkpoint_id: str) -> tuple[str, int] | None:
+        """Get (issue_key, position) of a checkpoint in the log."""
+        return self._locations.get(checkpoint_id)
+
+    def latest_pending(self) -> dict[str, Any] | None:
+        """Most recent checkpoint (by created_at) with completed=False."""
+        if self._latest_pending is None:
+            return None
+        return self.get(self._latest_pending)
+
+    def latest_of_type(self, checkpoint_type: str) -> dict[str, Any] | None:
+        """Most recent checkpoint (by created_at) of the given type value."""
+        checkpoint_id = self._latest_by_type.get(checkpoint_type)
+        if checkpoint_id is None:
+            return None
+        return self.get(checkpoint_id)
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+
+    def _add_entry(self, checkpoint_id: str, signature: _EntrySignature) -> None:
+        """Index a new or changed entry, advancing "latest" pointers if newer."""
+        checkpoint_type, _status, completed, created_at = signature
+        self._signatures[checkpoint_id] = signature
+
+        if checkpoint_type is not None:
+            self._ids_by_type.setdefault(checkpoint_type, {})[checkpoint_id] = None
+            if self._is_newer(created_at, self._latest_by_type.get(checkpoint_type)):
+                self._latest_by_type[checkpoint_type] = checkpoint_id
+
+        if not completed:
+            self._pending[checkpoint_id] = None
+            if self._is_newer(created_at, self._latest_pending):
+                self._latest_pending = checkpoint_id
+
+    def _remove_entry(self, checkpoint_id: str, dirty_types: set[str]) -> bool:
+        """Drop an entry from the index.
+
+        Returns:
+            True if it was the latest pending checkpoint (pointer needs recomputing).
+        """
+        checkpoint_type = self._signatures.pop(checkpoint_id)[0]
+
+        if checkpoint_type is not None:
+            self._ids_by_type.get(checkpoint_type, {}).pop(checkpoint_id, None)
+            if self._latest_by_type.get(checkpoint_type) == checkpoint_id:
+                del self._latest_by_type[checkpoint_type]
+                dirty_types.add(checkpoint_type)
+
+        self._pending.pop(checkpoint_id, None)
+        if self._latest_pending != checkpoint_id:
+            return False
+        self._latest_pending = None
+        return True
+
+    def _is_newer(self, created_at: str, current_id: str | None) -> bool:
+        """True if created_at is later than the current pointer's entry."""
+        return current_id is None or created_at > self._signatures[current_id][3]
+
+    def _latest_of(self, checkpoint_ids: dict[str, None]) -> str | None:
+        """Id with the greatest created_at among the given ids (first wins ties)."""
+        if not checkpoint_ids:
+            return None
+        return max(checkpoint_ids, key=lambda cid: self._signatures[cid][3])
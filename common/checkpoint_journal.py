@@ -0,0 +1,300 @@
+"""
+Checkpoint Journal
+==================
+
+Append-only JSONL journal of checkpoint events written next to the HITL
+checkpoint log snapshot (.hitl_checkpoint_log.json).
+
+Recording a resolution used to rewrite the whole snapshot (indent=2 dump +
+fsync + rename), which grows with the checkpoint history. Harness writes
+now append one small fsync'd line instead:
+
+    {"op": "resolve", "checkpoint_id": "...", "fields": {"status": "approved", ...}}
+
+Event ops:
+- create: add a checkpoint ({"issue_key": ..., "checkpoint": {...}})
+- resolve: record the human decision ({"fields": {...}})
+- complete: mark a checkpoint done ({"fields": {"completed": true, ...}})
+
+Readers fold the journal over the snapshot. compact() periodically folds it
+into a new snapshot and truncates the journal; it runs before every agent
+session (so the snapshot file stays readable on its own) and when the journal grows
+past COMPACT_THRESHOLD_BYTES. Replaying events is idempotent, so a crash
+between rewriting the snapshot and truncating the journal is harmless.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import fcntl
+import json
+import os
+import tempfile
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+JOURNAL_FILE = ".hitl_checkpoint_journal.jsonl"
+SNAPSHOT_FILE = ".hitl_checkpoint_log.json"
+LOCK_FILE = ".hitl_checkpoint_journal.lock"
+
+JOURNAL_OPS = ("create", "resolve", "complete")
+
+# Compact on append once the journal is this large (bounds reader fold cost)
+COMPACT_THRESHOLD_BYTES = 64 * 1024
+
+
+class CheckpointJournal:
+    """Checkpoint event journal for one agent state directory.
+
+    Appends and compaction are serialized across processes (TUI, agent)
+    with an flock on a sidecar lock file.
+    """
+
+    def __init__(self, agent_dir: Path) -> None:
+        self.agent_dir = agent_dir
+        self.path = agent_dir / JOURNAL_FILE
+        self.snapshot_path = agent_dir / SNAPSHOT_FILE
+        self._lock_path = agent_dir / LOCK_FILE
+
+    def signature(self) -> tuple[int, int, int] | None:
+        """Get (inode, mtime_ns, size) of the journal, or None if missing/empty."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        if st.st_size == 0:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def read_events(self) -> list[dict[str, Any]]:
+        """Read all journal events, skipping torn or malformed lines."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                lines = f.readlines()
+        except OSError:
+            return []
+
+        events = []
+        for line in lines:
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(event, dict) and event.get("op") in JOURNAL_OPS:
+                events.append(event)
+        return events
+
+    def load(self) -> dict[str, Any]:
+        """Load the current checkpoint log (snapshot with journal folded in)."""
+        # Journal first: a compaction in between then only replays events
+        # already in the new snapshot, which is idempotent
+        events = self.read_events()
+        return fold_events(_read_snapshot(self.snapshot_path), events)
+
+    def append(self, event: dict[str, Any]) -> None:
+        """Durably append one event, compacting if the journal grew too large.
+
+        Raises:
+            ValueError: If the event op is unknown
+        """
+        if event.get("op") not in JOURNAL_OPS:
+            raise ValueError(f"Unknown checkpoint journal op: {event.get('op')!r}")
+        with self._locked():
+            self._append_locked(event)
+
+    def update(self, checkpoint_id: str, update_fn: Callable[[dict], None], op: str = "resolve") -> dict | None:
+        """Update a checkpoint and journal the fields that changed.
+
+        The log is read, compared and appended to under the journal lock, so
+        a concurrent update from another process is never overwritten with
+        fields computed from a stale copy.
+
+        Args:
+            checkpoint_id: Unique checkpoint ID to update
+            update_fn: Function that modifies the checkpoint dict in-place
+            op: Journal event op ("resolve" or "complete")
+
+        Returns:
+            The updated checkpoint dict, or None if not found
+
+        Raises:
+            ValueError: If the op is unknown
+        """
+        if op not in JOURNAL_OPS:
+            raise ValueError(f"Unknown checkpoint journal op: {op!r}")
+        with self._locked():
+            for checkpoints in self.load().values():
+                if not isinstance(checkpoints, list):
+                    continue
+                for ckpt_dict in checkpoints:
+                    if isinstance(ckpt_dict, dict) and ckpt_dict.get("checkpoint_id") == checkpoint_id:
+                        # Apply update function to a copy and journal only what changed
+                        updated = dict(ckpt_dict)
+                        update_fn(updated)
+                        fields = {k: v for k, v in updated.items() if k not in ckpt_dict or ckpt_dict[k] != v}
+                        self._append_locked({"op": op, "checkpoint_id": checkpoint_id, "fields": fields})
+                        return updated
+        return None
+
+    @contextlib.contextmanager
+    def rewriting(self) -> Iterator[None]:
+        """Hold the journal lock while the caller rewrites the snapshot itself.
+
+        For writers that keep the folded log elsewhere (the SQLite backend):
+        the new snapshot must include the journal's events (load() inside
+        the block); the journal is truncated when the block succeeds.
+        """
+        with self._locked():
+            yield
+            with contextlib.suppress(FileNotFoundError):
+                os.truncate(self.path, 0)
+
+    def compact(self) -> bool:
+        """Fold the journal into the snapshot and truncate it.
+
+        Returns:
+            True if there were events to compact.
+        """
+        if self.signature() is None:
+            return False
+        with self._locked():
+            return self._compact_locked()
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold an exclusive lock on the journal for the duration of the block."""
+        self.agent_dir.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)  # Releases the lock
+
+    def _append_locked(self, event: dict[str, Any]) -> None:
+        """append() body; caller holds the lock."""
+        line = (json.dumps(event, separators=(",", ":")) + "\n").encode("utf-8")
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            size = os.fstat(fd).st_size
+            if size and not _ends_with_newline(self.path, size):
+                # Previous writer crashed mid-line; keep our event parseable
+                line = b"\n" + line
+            os.write(fd, line)
+            os.fsync(fd)
+            size += len(line)
+        finally:
+            os.close(fd)
+
+        if size > COMPACT_THRESHOLD_BYTES:
+            self._compact_locked()
+
+    def _compact_locked(self) -> bool:
+        """compact() body; caller holds the lock."""
+        events = self.read_events()
+        if not events:
+            # Drop torn/malformed leftovers
+            with contextlib.suppress(FileNotFoundError):
+                os.truncate(self.path, 0)
+            return False
+
+        snapshot = _read_snapshot(self.snapshot_path)
+        _write_snapshot(self.snapshot_path, fold_events(snapshot, events))
+        os.truncate(self.path, 0)
+        return True
+
+
+def fold_events(log_data: dict[str, Any], events: list[dict[str, Any]]) -> dict[str, Any]:
+    """Apply checkpoint events to a log ({issue_key: [checkpoint dicts]}).
+
+    Returns log_data itself when there are no events. Otherwise only the
+    containers and checkpoints touched by events are copied; the input log
+    is not mutated. Events for unknown checkpoints are ignored and
+    creates of an existing checkpoint_id are skipped, so replay is idempotent.
+    """
+    if not events:
+        return log_data
+
+    folded: dict[str, Any] = dict(log_data)
+    locations: dict[str, tuple[str, int]] = {}
+    for issue_key, checkpoints in folded.items():
+        if not isinstance(checkpoints, list):
+            continue
+        for position, ckpt in enumerate(checkpoints):
+            if isinstance(ckpt, dict) and isinstance(ckpt.get("checkpoint_id"), str):
+                locations.setdefault(ckpt["checkpoint_id"], (issue_key, position))
+
+    copied: set[str] = set()
+
+    def _writable_list(issue_key: str) -> list[Any]:
+        if issue_key not in copied:
+            existing = folded.get(issue_key)
+            folded[issue_key] = list(existing) if isinstance(existing, list) else []
+            copied.add(issue_key)
+        return folded[issue_key]
+
+    for event in events:
+        if event["op"] == "create":
+            checkpoint = event.get("checkpoint")
+            if not isinstance(checkpoint, dict):
+                continue
+            checkpoint_id = checkpoint.get("checkpoint_id")
+            if not isinstance(checkpoint_id, str) or checkpoint_id in locations:
+                continue
+            issue_key = str(event.get("issue_key", "global"))
+            checkpoints = _writable_list(issue_key)
+            locations[checkpoint_id] = (issue_key, len(checkpoints))
+            checkpoints.append(dict(checkpoint))
+            continue
+
+        location = locations.get(event.get("checkpoint_id", ""))
+        fields = event.get("fields")
+        if location is None or not isinstance(fields, dict):
+            continue
+        issue_key, position = location
+        checkpoints = _writable_list(issue_key)
+        checkpoints[position] = {**checkpoints[position], **fields}
+
+    return folded
+
+
+# ============================================================================
+# Private Helper Functions
+# ============================================================================
+
+
+def _ends_with_newline(path: Path, size: int) -> bool:
+    """Check whether the last byte of a non-empty file is a newline."""
+    with open(path, "rb") as f:
+        f.seek(size - 1)
+        return f.read(1) == b"\n"
+
+
+def _read_snapshot(path: Path) -> dict[str, Any]:
+    """Read the checkpoint log snapshot, empty if missing or invalid."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _write_snapshot(path: Path, log_data: dict[str, Any]) -> None:
+    """Write the snapshot atomically (temp file + fsync + rename)."""
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=".hitl_tmp_", suffix=".json", text=True)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(log_data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except Exception:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(temp_path)
+        raise
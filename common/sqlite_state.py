@@ -0,0 +1,398 @@
+"""
+SQLite State Repository
+=======================
+
+Optional StateRepository backend that keeps agent state in a per-spec
+SQLite database (WAL mode) instead of re-reading JSON files.
+
+Enable with STATE_BACKEND=sqlite. The database lives next to the JSON files:
+
+    .claude-agent/<slug>-<hash>/.state.sqlite3
+
+JSON compatibility:
+- Existing JSON files are imported on first use
+- Prompts still read/write the JSON files directly, so any JSON file that
+  changed on disk (by inode, mtime_ns, size) is re-imported before queries
+- Checkpoint journal events (common/checkpoint_journal.py, appended by
+  processes on the JSON backend) are folded in when the checkpoint log is
+  imported, so both backends resolve the same checkpoints
+- Harness writes go to the database first, then the affected JSON file is
+  re-exported (atomic temp + rename) so prompts see the same state; a
+  checkpoint write holds the journal lock and truncates the journal, whose
+  events are then in the exported log
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import sqlite3
+import tempfile
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+from common.checkpoint_journal import JOURNAL_FILE, CheckpointJournal
+from common.state import AgentState, FileStateRepository, MilestoneState, WorkspaceInfo
+from common.types import CheckpointData, CheckpointStatus, CheckpointType
+
+DB_FILE = ".state.sqlite3"
+
+# Seconds a connection waits for another process's write lock
+_BUSY_TIMEOUT_MS = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    checkpoint_id TEXT PRIMARY KEY,
+    issue_key TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    checkpoint_type TEXT,
+    status TEXT,
+    completed INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_checkpoints_pending ON checkpoints (completed, created_at);
+CREATE INDEX IF NOT EXISTS idx_checkpoints_type ON checkpoints (checkpoint_type, created_at);
+CREATE INDEX IF NOT EXISTS idx_checkpoints_status ON checkpoints (status);
+
+CREATE TABLE IF NOT EXISTS milestone_state (
+    file_name TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS workspace_info (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS json_sources (
+    file_name TEXT PRIMARY KEY,
+    signature TEXT
+);
+"""
+
+
+class SqliteStateRepository:
+    """SQLite-backed state repository (implements StateRepository).
+
+    One connection is kept per agent directory. Reads are single indexed
+    queries; the JSON files are only parsed when they changed on disk.
+    """
+
+    WORKSPACE_FILE = FileStateRepository.WORKSPACE_FILE
+    GITLAB_MILESTONE_FILE = FileStateRepository.GITLAB_MILESTONE_FILE
+    FILE_MILESTONE_FILE = FileStateRepository.FILE_MILESTONE_FILE
+    CHECKPOINT_LOG_FILE = FileStateRepository.CHECKPOINT_LOG_FILE
+
+    def __init__(self) -> None:
+        self._connections: dict[Path, sqlite3.Connection] = {}
+
+    def close(self) -> None:
+        """Close all open database connections."""
+        for conn in self._connections.values():
+            with contextlib.suppress(sqlite3.Error):
+                conn.close()
+        self._connections.clear()
+
+    # ------------------------------------------------------------------
+    # StateRepository protocol
+    # ------------------------------------------------------------------
+
+    def load(self, project_dir: Path, spec_slug: str, spec_hash: str) -> AgentState:
+        """Load complete agent state from the database."""
+        agent_dir = self._get_agent_dir(project_dir, spec_slug, spec_hash)
+        conn = self._sync(agent_dir)
+
+        row = conn.execute("SELECT data FROM workspace_info WHERE id = 1").fetchone()
+        workspace = WorkspaceInfo.from_dict(json.loads(row[0])) if row else None
+
+        file_only_mode = workspace.file_only_mode if workspace else False
+        milestone_file = self.FILE_MILESTONE_FILE if file_only_mode else self.GITLAB_MILESTONE_FILE
+        row = conn.execute("SELECT data FROM milestone_state WHERE file_name = ?", (milestone_file,)).fetchone()
+        milestone_data = json.loads(row[0]) if row else None
+        milestone = MilestoneState.from_dict(milestone_data) if milestone_data else None
+
+        return AgentState(
+            milestone=milestone,
+            workspace=workspace,
+            checkpoint_log=self._checkpoint_log(conn),
+        )
+
+    def load_pending_checkpoint(self, project_dir: Path, spec_slug: str, spec_hash: str) -> CheckpointData | None:
+        """Load the most recent pending checkpoint."""
+        conn = self._sync(self._get_agent_dir(project_dir, spec_slug, spec_hash))
+        row = conn.execute(
+            "SELECT data FROM checkpoints WHERE completed = 0 ORDER BY created_at DESC, seq ASC LIMIT 1"
+        ).fetchone()
+        return CheckpointData.from_dict(json.loads(row[0])) if row else None
+
+    def is_checkpoint_type_approved(
+        self,
+        project_dir: Path,
+        spec_slug: str,
+        spec_hash: str,
+        checkpoint_type: CheckpointType,
+    ) -> bool:
+        """Check if the latest checkpoint of a type has been approved."""
+        conn = self._sync(self._get_agent_dir(project_dir, spec_slug, spec_hash))
+        row = conn.execute(
+            "SELECT status FROM checkpoints WHERE checkpoint_type = ? ORDER BY created_at DESC, seq ASC LIMIT 1",
+            (checkpoint_type.value,),
+        ).fetchone()
+        return row is not None and row[0] == CheckpointStatus.APPROVED.value
+
+    # ------------------------------------------------------------------
+    # Write paths
+    # ------------------------------------------------------------------
+
+    def add_checkpoint(
+        self,
+        project_dir: Path,
+        spec_slug: str,
+        spec_hash: str,
+        issue_key: str,
+        checkpoint: dict[str, Any],
+    ) -> None:
+        """Insert a checkpoint under an issue key and re-export the JSON log.
+
+        Args:
+            project_dir: Project directory
+            spec_slug: Spec slug identifier
+            spec_hash: 8-character base62 hash
+            issue_key: Issue IID or "global"
+            checkpoint: Checkpoint dict (must have a unique checkpoint_id)
+        """
+        agent_dir = self._get_agent_dir(project_dir, spec_slug, spec_hash)
+        conn = self._connect(agent_dir)
+        with CheckpointJournal(agent_dir).rewriting(), self._write_transaction(conn):
+            self._import_changed_files(conn, agent_dir)
+            (seq,) = conn.execute("SELECT COALESCE(MAX(seq), -1) + 1 FROM checkpoints").fetchone()
+            conn.execute(
+                "INSERT INTO checkpoints "
+                "(checkpoint_id, issue_key, seq, checkpoint_type, status, completed, created_at, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (checkpoint["checkpoint_id"], issue_key, seq, *_checkpoint_columns(checkpoint), json.dumps(checkpoint)),
+            )
+            self._export_json(conn, agent_dir, self.CHECKPOINT_LOG_FILE, self._checkpoint_log(conn))
+
+    def update_checkpoint(
+        self,
+        project_dir: Path,
+        spec_slug: str,
+        spec_hash: str,
+        checkpoint_id: str,
+        update_fn: Callable[[dict], None],
+    ) -> dict | None:
+        """Atomically update a checkpoint and re-export the JSON log.
+
+        Args:
+            project_dir: Project directory
+            spec_slug: Spec slug identifier
+            spec_hash: 8-character base62 hash
+            checkpoint_id: Unique checkpoint ID to update
+            update_fn: Function that modifies the checkpoint dict in-place
+
+        Returns:
+            The updated checkpoint dict, or None if not found
+        """
+        agent_dir = self._get_agent_dir(project_dir, spec_slug, spec_hash)
+        conn = self._connect(agent_dir)
+        with CheckpointJournal(agent_dir).rewriting(), self._write_transaction(conn):
+            # Pick up any JSON edits and journal events before modifying
+            self._import_changed_files(conn, agent_dir)
+            row = conn.execute("SELECT data FROM checkpoints WHERE checkpoint_id = ?", (checkpoint_id,)).fetchone()
+            if row is None:
+                return None
+            ckpt_dict = json.loads(row[0])
+            update_fn(ckpt_dict)
+            conn.execute(
+                "UPDATE checkpoints SET checkpoint_type = ?, status = ?, completed = ?, created_at = ?, data = ? "
+                "WHERE checkpoint_id = ?",
+                (*_checkpoint_columns(ckpt_dict), json.dumps(ckpt_dict), checkpoint_id),
+            )
+            self._export_json(conn, agent_dir, self.CHECKPOINT_LOG_FILE, self._checkpoint_log(conn))
+        return ckpt_dict
+
+    # ------------------------------------------------------------------
+    # Connection and sync helpers
+    # ------------------------------------------------------------------
+
+    def _get_agent_dir(self, project_dir: Path, spec_slug: str, spec_hash: str) -> Path:
+        """Get the agent state directory."""
+        return project_dir / ".claude-agent" / f"{spec_slug}-{spec_hash}"
+
+    def _connect(self, agent_dir: Path) -> sqlite3.Connection:
+        """Get (or open) the connection for an agent directory."""
+        conn = self._connections.get(agent_dir)
+        if conn is not None:
+            return conn
+
+        agent_dir.mkdir(parents=True, exist_ok=True)
+        # isolation_level=None: explicit BEGIN/COMMIT, autocommit for reads
+        conn = sqlite3.connect(agent_dir / DB_FILE, isolation_level=None, check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout = {_BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.executescript(_SCHEMA)
+        self._connections[agent_dir] = conn
+        return conn
+
+    def _sync(self, agent_dir: Path) -> sqlite3.Connection:
+        """Connect and re-import any JSON file that changed on disk."""
+        conn = self._connect(agent_dir)
+        if self._changed_files(conn, agent_dir):
+            with self._write_transaction(conn):
+                self._import_changed_files(conn, agent_dir)
+        return conn
+
+    @contextlib.contextmanager
+    def _write_transaction(self, conn: sqlite3.Connection) -> Iterator[None]:
+        """Run a block inside BEGIN IMMEDIATE ... COMMIT (rollback on error)."""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _source_files(self) -> tuple[str, ...]:
+        """JSON files mirrored into the database."""
+        return (
+            self.WORKSPACE_FILE,
+            self.GITLAB_MILESTONE_FILE,
+            self.FILE_MILESTONE_FILE,
+            self.CHECKPOINT_LOG_FILE,
+            JOURNAL_FILE,
+        )
+
+    def _changed_files(self, conn: sqlite3.Connection, agent_dir: Path) -> list[tuple[str, str | None]]:
+        """List (file_name, signature) for JSON files that differ from the last import/export."""
+        recorded = dict(conn.execute("SELECT file_name, signature FROM json_sources").fetchall())
+        changed: list[tuple[str, str | None]] = []
+        for file_name in self._source_files():
+            signature = _file_signature(agent_dir / file_name)
+            if file_name not in recorded or recorded[file_name] != signature:
+                changed.append((file_name, signature))
+        return changed
+
+    def _import_changed_files(self, conn: sqlite3.Connection, agent_dir: Path) -> None:
+        """Re-import changed JSON files. Must run inside a write transaction."""
+        changed = self._changed_files(conn, agent_dir)
+        for file_name, signature in changed:
+            if file_name == self.WORKSPACE_FILE:
+                self._import_workspace(conn, _read_json(agent_dir / file_name))
+            elif file_name not in (self.CHECKPOINT_LOG_FILE, JOURNAL_FILE):
+                self._import_milestone(conn, file_name, _read_json(agent_dir / file_name))
+            conn.execute(
+                "INSERT OR REPLACE INTO json_sources (file_name, signature) VALUES (?, ?)",
+                (file_name, signature),
+            )
+        # Snapshot or journal changed: import the log with the journal folded in
+        if any(file_name in (self.CHECKPOINT_LOG_FILE, JOURNAL_FILE) for file_name, _ in changed):
+            self._import_checkpoint_log(conn, CheckpointJournal(agent_dir).load())
+
+    def _import_workspace(self, conn: sqlite3.Connection, data: dict[str, Any] | None) -> None:
+        """Replace workspace info from parsed JSON (None clears it)."""
+        if data is None:
+            conn.execute("DELETE FROM workspace_info")
+        else:
+            conn.execute("INSERT OR REPLACE INTO workspace_info (id, data) VALUES (1, ?)", (json.dumps(data),))
+
+    def _import_milestone(self, conn: sqlite3.Connection, file_name: str, data: dict[str, Any] | None) -> None:
+        """Replace one milestone file's state from parsed JSON (None clears it)."""
+        if data is None:
+            conn.execute("DELETE FROM milestone_state WHERE file_name = ?", (file_name,))
+        else:
+            conn.execute(
+                "INSERT OR REPLACE INTO milestone_state (file_name, data) VALUES (?, ?)",
+                (file_name, json.dumps(data)),
+            )
+
+    def _import_checkpoint_log(self, conn: sqlite3.Connection, data: dict[str, Any] | None) -> None:
+        """Replace all checkpoints from a parsed checkpoint log."""
+        conn.execute("DELETE FROM checkpoints")
+        if not isinstance(data, dict):
+            return
+        rows = []
+        seen: set[str] = set()
+        for issue_key, checkpoints in data.items():
+            if not isinstance(checkpoints, list):
+                continue
+            for ckpt in checkpoints:
+                if not isinstance(ckpt, dict):
+                    continue
+                checkpoint_id = ckpt.get("checkpoint_id")
+                if not isinstance(checkpoint_id, str) or checkpoint_id in seen:
+                    # Keep entries without a unique id addressable by position
+                    checkpoint_id = f"@{issue_key}:{len(rows)}"
+                seen.add(checkpoint_id)
+                rows.append((checkpoint_id, str(issue_key), len(rows), *_checkpoint_columns(ckpt), json.dumps(ckpt)))
+        conn.executemany(
+            "INSERT INTO checkpoints "
+            "(checkpoint_id, issue_key, seq, checkpoint_type, status, completed, created_at, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+
+    def _checkpoint_log(self, conn: sqlite3.Connection) -> dict[str, list[dict[str, Any]]]:
+        """Rebuild the {issue_key: [checkpoints]} log from the database."""
+        log: dict[str, list[dict[str, Any]]] = {}
+        for issue_key, data in conn.execute("SELECT issue_key, data FROM checkpoints ORDER BY seq"):
+            log.setdefault(issue_key, []).append(json.loads(data))
+        return log
+
+    def _export_json(self, conn: sqlite3.Connection, agent_dir: Path, file_name: str, data: Any) -> None:
+        """Write a JSON export atomically and record its signature as in sync."""
+        path = agent_dir / file_name
+        fd, temp_path = tempfile.mkstemp(dir=agent_dir, prefix=".state_tmp_", suffix=".json", text=True)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        except Exception:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(temp_path)
+            raise
+        conn.execute(
+            "INSERT OR REPLACE INTO json_sources (file_name, signature) VALUES (?, ?)",
+            (file_name, _file_signature(path)),
+        )
+
+
+# ============================================================================
+# Private Helper Functions
+# ============================================================================
+
+
+def _checkpoint_columns(ckpt: dict[str, Any]) -> tuple[str | None, str | None, int, str]:
+    """Extract indexed columns (type, status, completed, created_at) from a checkpoint dict."""
+    return (
+        ckpt.get("checkpoint_type"),
+        ckpt.get("status"),
+        1 if ckpt.get("completed", False) else 0,
+        str(ckpt.get("created_at", "")),
+    )
+
+
+def _file_signature(path: Path) -> str | None:
+    """Get "inode:mtime_ns:size" for a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return f"{st.st_ino}:{st.st_mtime_ns}:{st.st_size}"
+
+
+def _read_json(path: Path) -> dict[str, Any] | None:
+    """Read a JSON object file, return None if missing or invalid."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return None
+    return data if isinstance(data, dict) else None
@@ -4,20 +4,35 @@ Unified State Management
 
 Provides a single interface for all state operations.
 Replaces scattered JSON file access with a clean repository pattern.
+
+Implementations:
+- FileStateRepository: Reads the JSON state files on every call
+- CachingStateRepository: Same files, parsed once per on-disk version
+- SqliteStateRepository: SQLite (WAL) database mirroring the JSON files
+  (common/sqlite_state.py, enabled with STATE_BACKEND=sqlite)
+
+Use create_state_repository() to get the configured backend.
 """
 
 from __future__ import annotations
 
 import json
+import os
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import TYPE_CHECKING, Any, Protocol
 
+from common.checkpoint_index import CheckpointIndex
+from common.checkpoint_journal import CheckpointJournal, fold_events
 from common.types import CheckpointData, CheckpointStatus
 
 if TYPE_CHECKING:
     from common.types import CheckpointType
 
+# Environment variable selecting the state backend ("json" or "sqlite")
+STATE_BACKEND_ENV = "STATE_BACKEND"
+STATE_BACKENDS = ("json", "sqlite")
+
 
 @dataclass
 class MilestoneState:
@@ -180,7 +195,7 @@ class FileStateRepository:
     Maintains backward compatibility with existing file structure:
     - .workspace_info.json
     - .gitlab_milestone.json / .file_milestone.json
-    - .hitl_checkpoint_log.json
+    - .hitl_checkpoint_log.json (+ .hitl_checkpoint_journal.jsonl folded in)
     """
 
     WORKSPACE_FILE = ".workspace_info.json"
@@ -202,6 +217,15 @@ class FileStateRepository:
         except (json.JSONDecodeError, OSError):
             return None
 
+    def _read_checkpoint_log(self, agent_dir: Path) -> dict[str, Any] | None:
+        """Read the checkpoint log snapshot with pending journal events folded in."""
+        # Journal first: a compaction in between only replays folded events
+        events = CheckpointJournal(agent_dir).read_events()
+        checkpoint_data = self._read_json(agent_dir / self.CHECKPOINT_LOG_FILE)
+        if not events:
+            return checkpoint_data
+        return fold_events(checkpoint_data if isinstance(checkpoint_data, dict) else {}, events)
+
     def load(self, project_dir: Path, spec_slug: str, spec_hash: str) -> AgentState:
         """Load complete agent state from files."""
         agent_dir = self._get_agent_dir(project_dir, spec_slug, spec_hash)
@@ -217,7 +241,7 @@ class FileStateRepository:
         milestone = MilestoneState.from_dict(milestone_data) if milestone_data else None
 
         # Load checkpoint log
-        checkpoint_data = self._read_json(agent_dir / self.CHECKPOINT_LOG_FILE)
+        checkpoint_data = self._read_checkpoint_log(agent_dir)
         checkpoint_log = checkpoint_data if isinstance(checkpoint_data, dict) else {}
 
         return AgentState(
@@ -226,28 +250,20 @@ class FileStateRepository:
             checkpoint_log=checkpoint_log,
         )
 
-    def load_pending_checkpoint(self, project_dir: Path, spec_slug: str, spec_hash: str) -> CheckpointData | None:
-        """Load the most recent pending checkpoint."""
+    def checkpoint_index(self, project_dir: Path, spec_slug: str, spec_hash: str) -> CheckpointIndex:
+        """Build an index over the checkpoint log."""
         agent_dir = self._get_agent_dir(project_dir, spec_slug, spec_hash)
-        checkpoint_data = self._read_json(agent_dir / self.CHECKPOINT_LOG_FILE)
+        checkpoint_data = self._read_checkpoint_log(agent_dir)
 
-        if not checkpoint_data or not isinstance(checkpoint_data, dict):
-            return None
-
-        # Find all pending checkpoints across all issues
-        all_pending: list[dict[str, Any]] = []
-        for checkpoints in checkpoint_data.values():
-            if isinstance(checkpoints, list):
-                for ckpt in checkpoints:
-                    if not ckpt.get("completed", False):
-                        all_pending.append(ckpt)
+        index = CheckpointIndex()
+        if checkpoint_data and isinstance(checkpoint_data, dict):
+            index.update(checkpoint_data)
+        return index
 
-        if not all_pending:
-            return None
-
-        # Return most recent by created_at
-        latest = max(all_pending, key=lambda x: x.get("created_at", ""))
-        return CheckpointData.from_dict(latest)
+    def load_pending_checkpoint(self, project_dir: Path, spec_slug: str, spec_hash: str) -> CheckpointData | None:
+        """Load the most recent pending checkpoint."""
+        latest = self.checkpoint_index(project_dir, spec_slug, spec_hash).latest_pending()
+        return CheckpointData.from_dict(latest) if latest else None
 
     def is_checkpoint_type_approved(
         self,
@@ -256,24 +272,132 @@ class FileStateRepository:
         spec_hash: str,
         checkpoint_type: CheckpointType,
     ) -> bool:
-        """Check if a checkpoint type has been approved."""
+        """Check if the latest checkpoint of a type has been approved."""
+        latest = self.checkpoint_index(project_dir, spec_slug, spec_hash).latest_of_type(checkpoint_type.value)
+        return latest is not None and latest.get("status") == CheckpointStatus.APPROVED.value
+
+
+class CachingStateRepository(FileStateRepository):
+    """FileStateRepository that memoizes parsed JSON files.
+
+    Each file is parsed once per on-disk version, identified by
+    (inode, mtime_ns, size). A cache hit costs a single stat() instead of
+    open + read + json.load. Atomic rewrites (temp file + rename) always
+    change the inode, so they are never served stale.
+
+    The checkpoint log index is kept per log file and updated incrementally
+    only when the log (snapshot or journal) changes, so checkpoint queries
+    are O(1) on a hit.
+
+    Parsed data is shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self) -> None:
+        self._cache: dict[Path, tuple[tuple[int, int, int], dict[str, Any] | None]] = {}
+        self._indexes: dict[Path, tuple[dict[str, Any] | None, CheckpointIndex]] = {}
+        self._folded: dict[Path, tuple[dict[str, Any] | None, tuple[int, int, int], dict[str, Any]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def cache_stats(self) -> dict[str, int]:
+        """Return hit/miss counters and number of cached files."""
+        return {"hits": self.hits, "misses": self.misses, "files": len(self._cache)}
+
+    def invalidate(self, path: Path | None = None) -> None:
+        """Drop cached data for one file, or for all files if path is None."""
+        if path is None:
+            self._cache.clear()
+            self._indexes.clear()
+            self._folded.clear()
+        else:
+            self._cache.pop(path, None)
+            self._indexes.pop(path, None)
+            self._folded.pop(path.parent, None)
+
+    def checkpoint_index(self, project_dir: Path, spec_slug: str, spec_hash: str) -> CheckpointIndex:
+        """Get the checkpoint log index, updating it only if the log changed."""
         agent_dir = self._get_agent_dir(project_dir, spec_slug, spec_hash)
-        checkpoint_data = self._read_json(agent_dir / self.CHECKPOINT_LOG_FILE)
+        path = agent_dir / self.CHECKPOINT_LOG_FILE
+        checkpoint_data = self._read_checkpoint_log(agent_dir)
+
+        indexed_data, index = self._indexes.get(path, (None, None))
+        if index is None:
+            index = CheckpointIndex()
+        elif indexed_data is checkpoint_data:
+            # Same parsed/folded object from the cache: log unchanged
+            return index
+
+        index.update(checkpoint_data if isinstance(checkpoint_data, dict) else {})
+        self._indexes[path] = (checkpoint_data, index)
+        return index
+
+    def _read_checkpoint_log(self, agent_dir: Path) -> dict[str, Any] | None:
+        """Read the folded checkpoint log, re-folding only when snapshot or journal changed."""
+        journal = CheckpointJournal(agent_dir)
+        signature = journal.signature()
+        path = agent_dir / self.CHECKPOINT_LOG_FILE
+        checkpoint_data = self._read_json(path)
+        if signature is None:
+            self._folded.pop(agent_dir, None)
+            return checkpoint_data
+
+        cached = self._folded.get(agent_dir)
+        if cached is not None and cached[0] is checkpoint_data and cached[1] == signature:
+            return cached[2]
+
+        events = journal.read_events()
+        # Re-read after the journal in case a compaction ran in between
+        checkpoint_data = self._read_json(path)
+        folded = fold_events(checkpoint_data if isinstance(checkpoint_data, dict) else {}, events)
+        self._folded[agent_dir] = (checkpoint_data, signature, folded)
+        return folded
+
+    def _read_json(self, path: Path) -> dict[str, Any] | None:
+        """Read JSON file through the cache, return None on error."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            self._cache.pop(path, None)
+            return None
 
-        if not checkpoint_data or not isinstance(checkpoint_data, dict):
-            return False
+        cached = self._cache.get(path)
+        if cached is not None and cached[0] == (st.st_ino, st.st_mtime_ns, st.st_size):
+            self.hits += 1
+            return cached[1]
 
-        # Find all checkpoints of this type
-        matching: list[dict[str, Any]] = []
-        for checkpoints in checkpoint_data.values():
-            if isinstance(checkpoints, list):
-                for ckpt in checkpoints:
-                    if ckpt.get("checkpoint_type") == checkpoint_type.value:
-                        matching.append(ckpt)
+        self.misses += 1
+        try:
+            with open(path, encoding="utf-8") as f:
+                # Key on the descriptor we actually read, in case the file was
+                # replaced between stat() and open()
+                fst = os.fstat(f.fileno())
+                data = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            self._cache.pop(path, None)
+            return None
 
-        if not matching:
-            return False
+        self._cache[path] = ((fst.st_ino, fst.st_mtime_ns, fst.st_size), data)
+        return data
 
-        # Check if latest is approved
-        latest = max(matching, key=lambda x: x.get("created_at", ""))
-        return latest.get("status") == CheckpointStatus.APPROVED.value
+
+def create_state_repository(backend: str | None = None) -> StateRepository:
+    """Create the configured state repository.
+
+    Args:
+        backend: "json" or "sqlite" (defaults to STATE_BACKEND env var, then "json")
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    if backend is None:
+        backend = os.getenv(STATE_BACKEND_ENV, "json")
+    backend = backend.strip().lower() or "json"
+    if backend not in STATE_BACKENDS:
+        raise ValueError(f"Unknown state backend: {backend!r} (expected one of {', '.join(STATE_BACKENDS)})")
+
+    if backend == "sqlite":
+        # Imported here, not at module level: sqlite_state imports this module
+        from common.sqlite_state import SqliteStateRepository  # pylint: disable=import-outside-toplevel
+
+        return SqliteStateRepository()
+    return CachingStateRepository()
@@ -151,6 +151,9 @@ class SpecConfig:  # pylint: disable=too-many-instance-attributes
         name: Human-readable display name for this spec
         max_iterations: Optional[int] = None - Maximum iterations allowed (None = unlimited)
         model: str - Claude model ID to use (default from CLAUDE_MODEL env var or claude-opus-4-5-20251101)
+        cpu_quota: Optional[float] = None - CPUs the agent's process tree may use (None = unlimited)
+        memory_max_mb: Optional[int] = None - Memory limit of the agent's process tree in MiB (None = unlimited)
+        pids_max: Optional[int] = None - Max processes in the agent's process tree (None = unlimited)
 
     Properties:
         agent_dir: Path to the agent's state directory for this spec
@@ -181,6 +184,9 @@ class SpecConfig:  # pylint: disable=too-many-instance-attributes
     skip_puppeteer: bool = False  # If True, skip Puppeteer/browser automation
     skip_test_suite: bool = False  # If True, skip test suite execution
     skip_regression_testing: bool = False  # If True, skip feature regression checks
+    cpu_quota: float | None = None  # Resource limits enforced by the daemon (None = unlimited)
+    memory_max_mb: int | None = None
+    pids_max: int | None = None
 
     def __post_init__(self) -> None:
         """
@@ -234,6 +240,14 @@ class SpecConfig:  # pylint: disable=too-many-instance-attributes
         if self.max_iterations is not None and self.max_iterations <= 0:
             raise ValueError(f"max_iterations must be a positive integer or None, got: {self.max_iterations}")
 
+        # Validate resource limits
+        if self.cpu_quota is not None and self.cpu_quota <= 0:
+            raise ValueError(f"cpu_quota must be a positive number or None, got: {self.cpu_quota}")
+        if self.memory_max_mb is not None and self.memory_max_mb <= 0:
+            raise ValueError(f"memory_max_mb must be a positive integer or None, got: {self.memory_max_mb}")
+        if self.pids_max is not None and self.pids_max <= 0:
+            raise ValueError(f"pids_max must be a positive integer or None, got: {self.pids_max}")
+
         # Validate model
         if not isinstance(self.model, str) or not self.model.strip():
             raise ValueError(f"model must be a non-empty string, got: {self.model}")
@@ -294,6 +308,9 @@ class SpecConfig:  # pylint: disable=too-many-instance-attributes
             "skip_puppeteer": self.skip_puppeteer,
             "skip_test_suite": self.skip_test_suite,
             "skip_regression_testing": self.skip_regression_testing,
+            "cpu_quota": self.cpu_quota,
+            "memory_max_mb": self.memory_max_mb,
+            "pids_max": self.pids_max,
         }
 
     @classmethod
@@ -361,4 +378,7 @@ class SpecConfig:  # pylint: disable=too-many-instance-attributes
             skip_puppeteer=data.get("skip_puppeteer", False),
             skip_test_suite=data.get("skip_test_suite", False),
             skip_regression_testing=data.get("skip_regression_testing", False),
+            cpu_quota=data.get("cpu_quota"),
+            memory_max_mb=data.get("memory_max_mb"),
+            pids_max=data.get("pids_max"),
         )
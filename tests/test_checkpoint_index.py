@@ -0,0 +1,72 @@
+"""Tests for common.checkpoint_index."""
+
+from __future__ import annotations
+
+from common.checkpoint_index import CheckpointIndex
+
+
+def _ckpt(checkpoint_id: str, created_at: str, checkpoint_type: str = "plan", completed: bool = False) -> dict:
+    return {
+        "checkpoint_id": checkpoint_id,
+        "checkpoint_type": checkpoint_type,
+        "status": "pending",
+        "completed": completed,
+        "created_at": created_at,
+    }
+
+
+def test_empty_index():
+    index = CheckpointIndex()
+    index.update({})
+    assert len(index) == 0
+    assert index.latest_pending() is None
+    assert index.latest_of_type("plan") is None
+    assert index.get("a") is None
+
+
+def test_latest_pending_and_of_type():
+    index = CheckpointIndex()
+    index.update(
+        {
+            "global": [_ckpt("a", "2026-01-01T00:00:00"), _ckpt("b", "2026-01-03T00:00:00", completed=True)],
+            "7": [_ckpt("c", "2026-01-02T00:00:00", checkpoint_type="review")],
+        }
+    )
+    assert len(index) == 3
+    assert index.pending_ids == frozenset({"a", "c"})
+    assert index.latest_pending()["checkpoint_id"] == "c"
+    assert index.latest_of_type("plan")["checkpoint_id"] == "b"
+    assert index.latest_of_type("review")["checkpoint_id"] == "c"
+    assert index.locate("c") == ("7", 0)
+
+
+def test_update_recomputes_changed_entries():
+    index = CheckpointIndex()
+    index.update({"global": [_ckpt("a", "2026-01-01T00:00:00"), _ckpt("b", "2026-01-02T00:00:00")]})
+    assert index.latest_pending()["checkpoint_id"] == "b"
+
+    # Completing the latest pending checkpoint falls back to the next one
+    index.update({"global": [_ckpt("a", "2026-01-01T00:00:00"), _ckpt("b", "2026-01-02T00:00:00", completed=True)]})
+    assert index.pending_ids == frozenset({"a"})
+    assert index.latest_pending()["checkpoint_id"] == "a"
+    assert index.get("b")["completed"] is True
+
+
+def test_update_drops_removed_entries():
+    index = CheckpointIndex()
+    index.update({"global": [_ckpt("a", "2026-01-01T00:00:00"), _ckpt("b", "2026-01-02T00:00:00")]})
+
+    index.update({"global": [_ckpt("a", "2026-01-01T00:00:00")]})
+
+    assert len(index) == 1
+    assert index.get("b") is None
+    assert index.latest_pending()["checkpoint_id"] == "a"
+    assert index.latest_of_type("plan")["checkpoint_id"] == "a"
+
+
+def test_entries_without_unique_id_are_keyed_by_location():
+    index = CheckpointIndex()
+    index.update({"global": [_ckpt("a", "2026-01-01T00:00:00"), _ckpt("a", "2026-01-02T00:00:00"), "junk"]})
+    assert len(index) == 2
+    assert index.get("a")["created_at"] == "2026-01-01T00:00:00"
+    assert index.get("@global:1")["created_at"] == "2026-01-02T00:00:00"
@@ -0,0 +1,101 @@
+"""Tests for common.checkpoint_journal."""
+
+from __future__ import annotations
+
+import pytest
+
+from common.checkpoint_journal import CheckpointJournal, fold_events
+
+
+def _create(checkpoint_id: str, issue_key: str = "global", **fields) -> dict:
+    return {"op": "create", "issue_key": issue_key, "checkpoint": {"checkpoint_id": checkpoint_id, **fields}}
+
+
+def test_fold_without_events_returns_input():
+    log_data = {"global": [{"checkpoint_id": "a"}]}
+    assert fold_events(log_data, []) is log_data
+
+
+def test_fold_applies_creates_and_updates_in_order():
+    events = [
+        _create("a", status="pending"),
+        _create("b", issue_key="12"),
+        {"op": "resolve", "checkpoint_id": "a", "fields": {"status": "approved"}},
+        {"op": "complete", "checkpoint_id": "a", "fields": {"completed": True}},
+    ]
+    folded = fold_events({}, events)
+    assert folded == {
+        "global": [{"checkpoint_id": "a", "status": "approved", "completed": True}],
+        "12": [{"checkpoint_id": "b"}],
+    }
+
+
+def test_fold_does_not_mutate_input():
+    checkpoint = {"checkpoint_id": "a", "status": "pending"}
+    log_data = {"global": [checkpoint]}
+    folded = fold_events(log_data, [{"op": "resolve", "checkpoint_id": "a", "fields": {"status": "approved"}}])
+    assert folded["global"][0]["status"] == "approved"
+    assert checkpoint == {"checkpoint_id": "a", "status": "pending"}
+    assert log_data == {"global": [checkpoint]}
+
+
+def test_fold_replay_is_idempotent():
+    events = [_create("a", n=1), {"op": "resolve", "checkpoint_id": "a", "fields": {"n": 2}}]
+    once = fold_events({}, events)
+    assert fold_events(once, events) == once
+
+
+def test_fold_ignores_unknown_and_malformed_events():
+    log_data = {"global": [{"checkpoint_id": "a"}]}
+    events = [
+        {"op": "resolve", "checkpoint_id": "missing", "fields": {"status": "approved"}},
+        {"op": "resolve", "checkpoint_id": "a", "fields": "not a dict"},
+        {"op": "create", "checkpoint": {"no_id": True}},
+        {"op": "create", "checkpoint": "not a dict"},
+    ]
+    assert fold_events(log_data, events) == log_data
+
+
+def test_journal_update_appends_changed_fields(tmp_path):
+    journal = CheckpointJournal(tmp_path)
+    journal.append(_create("a", status="pending", note="x"))
+
+    updated = journal.update("a", lambda c: c.update(status="approved"))
+
+    assert updated == {"checkpoint_id": "a", "status": "approved", "note": "x"}
+    assert journal.read_events()[-1] == {"op": "resolve", "checkpoint_id": "a", "fields": {"status": "approved"}}
+    assert journal.load()["global"] == [updated]
+
+
+def test_journal_update_unknown_checkpoint(tmp_path):
+    journal = CheckpointJournal(tmp_path)
+    assert journal.update("missing", lambda c: c.update(status="approved")) is None
+    assert journal.read_events() == []
+
+
+def test_journal_rejects_unknown_op(tmp_path):
+    journal = CheckpointJournal(tmp_path)
+    with pytest.raises(ValueError):
+        journal.append({"op": "delete", "checkpoint_id": "a"})
+
+
+def test_journal_compact_folds_into_snapshot(tmp_path):
+    journal = CheckpointJournal(tmp_path)
+    journal.append(_create("a"))
+    journal.append({"op": "complete", "checkpoint_id": "a", "fields": {"completed": True}})
+
+    assert journal.compact()
+    assert journal.signature() is None
+    assert journal.load() == {"global": [{"checkpoint_id": "a", "completed": True}]}
+    assert not journal.compact()
+
+
+def test_journal_skips_torn_trailing_line(tmp_path):
+    journal = CheckpointJournal(tmp_path)
+    journal.append(_create("a"))
+    with open(journal.path, "ab") as f:
+        f.write(b'{"op": "resolve", "checkpoint_id": "a", "fie')
+
+    assert journal.load() == {"global": [{"checkpoint_id": "a"}]}
+    journal.append({"op": "resolve", "checkpoint_id": "a", "fields": {"status": "approved"}})
+    assert journal.load() == {"global": [{"checkpoint_id": "a", "status": "approved"}]}
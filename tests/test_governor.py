@@ -0,0 +1,94 @@
+"""Tests for agent.daemon.governor."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from agent.daemon.governor import BACKOFF_BASE_SECONDS, RateGovernor, SessionOutcome
+
+
+async def _acquire_all(governor: RateGovernor, count: int) -> list[str | None]:
+    return [await governor.acquire(f"agent{i}", timeout=0.05) for i in range(count)]
+
+
+def test_retry_after_sets_cooldown():
+    governor = RateGovernor()
+    governor.release("unknown", SessionOutcome.RATE_LIMITED, retry_after=30)
+    assert governor.cooldown_remaining() == pytest.approx(30, abs=1)
+    assert governor.stats()["rate_limited"] == 1
+
+
+def test_backoff_doubles_without_hint_and_resets_on_success():
+    governor = RateGovernor()
+    governor.release("x", SessionOutcome.RATE_LIMITED)
+    assert governor.cooldown_remaining() == pytest.approx(BACKOFF_BASE_SECONDS, abs=1)
+    governor.release("x", SessionOutcome.RATE_LIMITED)
+    assert governor.cooldown_remaining() == pytest.approx(2 * BACKOFF_BASE_SECONDS, abs=1)
+
+    governor.release("x", SessionOutcome.OK)
+    governor._cooldown_until = 0.0  # End the cooldown early
+    governor.release("x", SessionOutcome.RATE_LIMITED)
+    assert governor.cooldown_remaining() == pytest.approx(BACKOFF_BASE_SECONDS, abs=1)
+
+
+def test_no_lease_during_cooldown():
+    async def scenario():
+        governor = RateGovernor()
+        governor.release("x", SessionOutcome.RATE_LIMITED, retry_after=60)
+        lease_id = await governor.acquire("a", timeout=0.05)
+        return lease_id, governor.stats()["waiting"]
+
+    assert asyncio.run(scenario()) == (None, 0)
+
+
+def test_cap_halves_once_per_cooldown_and_grows_back():
+    async def scenario():
+        governor = RateGovernor(max_concurrent=4)
+        leases = await _acquire_all(governor, 4)
+        assert None not in leases
+        governor.release(leases[0], SessionOutcome.RATE_LIMITED, retry_after=60)
+        assert governor.stats()["concurrency_cap"] == 2.0
+        # Rate limits of sessions in flight with the first do not shrink it again
+        governor.release(leases[1], SessionOutcome.RATE_LIMITED, retry_after=60)
+        assert governor.stats()["concurrency_cap"] == 2.0
+
+        governor.release(leases[2], SessionOutcome.OK)
+        assert governor.stats()["concurrency_cap"] == 2.5
+        governor.release(leases[3], SessionOutcome.OK)
+        assert governor.stats()["concurrency_cap"] == 2.9
+        for _ in range(3):
+            governor.release("x", SessionOutcome.OK)
+        assert governor.stats()["concurrency_cap"] == 3.83
+        governor.release("x", SessionOutcome.OK)
+        assert governor.stats()["concurrency_cap"] is None  # Back at max_concurrent
+
+    asyncio.run(scenario())
+
+
+def test_concurrency_limit_waits_for_release():
+    async def scenario():
+        governor = RateGovernor(max_concurrent=1)
+        first = await governor.acquire("a", timeout=0.05)
+        assert first is not None
+        assert await governor.acquire("b", timeout=0.05) is None
+
+        waiter = asyncio.ensure_future(governor.acquire("b", timeout=5))
+        await asyncio.sleep(0)
+        assert governor.release(first, SessionOutcome.OK)
+        assert await waiter is not None
+        assert governor.stats()["in_flight"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_release_agent_drops_its_leases():
+    async def scenario():
+        governor = RateGovernor(max_concurrent=1)
+        lease_id = await governor.acquire("a", timeout=0.05)
+        governor.release_agent("a")
+        assert governor.lease(lease_id) is None
+        assert await governor.acquire("b", timeout=0.05) is not None
+
+    asyncio.run(scenario())
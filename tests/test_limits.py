@@ -0,0 +1,35 @@
+"""Tests for the rlimit fallback of agent.daemon.limits."""
+
+from __future__ import annotations
+
+import os
+import resource
+
+from agent.daemon import limits
+from agent.daemon.limits import ResourceLimits, _rlimit_values
+
+
+def test_no_limits():
+    assert _rlimit_values(ResourceLimits()) == ((), [])
+
+
+def test_memory_becomes_rlimit_data():
+    rlimits, unenforced = _rlimit_values(ResourceLimits(memory_max_mb=512))
+    assert rlimits == (("memory_max_mb", resource.RLIMIT_DATA, 512 * 1024 * 1024),)
+    assert unenforced == []
+
+
+def test_pids_are_added_to_the_users_threads(monkeypatch):
+    monkeypatch.setattr(limits, "_count_user_threads", lambda uid: 40)
+    rlimits, _ = _rlimit_values(ResourceLimits(pids_max=100))
+    assert rlimits == (("pids_max", resource.RLIMIT_NPROC, 140),)
+
+
+def test_cpu_quota_is_unenforced():
+    rlimits, unenforced = _rlimit_values(ResourceLimits(cpu_quota=1.5, memory_max_mb=1))
+    assert [key for key, _, _ in rlimits] == ["memory_max_mb"]
+    assert unenforced == ["cpu_quota"]
+
+
+def test_count_user_threads_includes_own_process():
+    assert limits._count_user_threads(os.getuid()) >= 1
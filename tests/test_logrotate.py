@@ -0,0 +1,114 @@
+"""Tests for agent.daemon.logrotate."""
+
+from __future__ import annotations
+
+from agent.daemon.logrotate import (
+    LogManifest,
+    LogReader,
+    RotationPolicy,
+    compress_segment,
+    log_size,
+    manifest_path,
+    mark_compressed,
+    read_log_tail,
+)
+
+
+def _rotated_log(tmp_path, chunks: list[bytes]):
+    """A run log rotated after each chunk but the last."""
+    log_file = tmp_path / "a1-20260101-120000.log"
+    for i, chunk in enumerate(chunks):
+        log_file.write_bytes(chunk)
+        if i < len(chunks) - 1:
+            LogManifest.load(log_file).rotate()
+    return log_file
+
+
+def test_missing_manifest_is_a_single_live_file(tmp_path):
+    log_file = tmp_path / "a1-20260101-120000.log"
+    manifest = LogManifest.load(log_file)
+    assert manifest.segments == []
+    assert manifest.live == {"file": log_file.name, "start": 0}
+
+
+def test_corrupt_manifest_falls_back_to_live_file(tmp_path):
+    log_file = tmp_path / "a1-20260101-120000.log"
+    log_file.write_bytes(b"hello\n")
+    manifest_path(log_file).write_text("{not json", encoding="utf-8")
+
+    manifest = LogManifest.load(log_file)
+    assert manifest.live == {"file": log_file.name, "start": 0}
+    assert LogReader(log_file).read(0, 100) == (0, b"hello\n")
+
+
+def test_interrupted_save_keeps_previous_manifest(tmp_path):
+    log_file = _rotated_log(tmp_path, [b"one\n", b"two\n"])
+    tmp = manifest_path(log_file).with_name(manifest_path(log_file).name + ".tmp")
+    tmp.write_text("{partial", encoding="utf-8")
+
+    manifest = LogManifest.load(log_file)
+    assert [segment["bytes"] for segment in manifest.segments] == [4]
+    assert manifest.live_start == 4
+
+
+def test_rotation_keeps_offsets_continuous(tmp_path):
+    log_file = _rotated_log(tmp_path, [b"one\n", b"two\n", b"three\n"])
+    manifest = LogManifest.load(log_file)
+    assert [(s["start"], s["bytes"]) for s in manifest.segments] == [(0, 4), (4, 4)]
+    assert manifest.live_start == 8
+    assert log_size(log_file) == 14
+    assert read_log_tail(log_file) == (0, "one\ntwo\nthree\n")
+
+
+def test_rotate_empty_live_file_adds_no_segment(tmp_path):
+    log_file = tmp_path / "a1-20260101-120000.log"
+    log_file.write_bytes(b"")
+    assert LogManifest.load(log_file).rotate() is None
+    assert LogManifest.load(log_file).segments == []
+
+
+def test_archive_closes_the_run(tmp_path):
+    log_file = _rotated_log(tmp_path, [b"one\n", b"two\n"])
+    LogManifest.load(log_file).rotate(keep_live=False)
+
+    manifest = LogManifest.load(log_file)
+    assert manifest.live is None
+    assert not log_file.exists()
+    assert log_size(log_file) == 8
+    assert LogReader(log_file).read(8, 100) == (8, b"")
+
+
+def test_reader_reads_compressed_segments(tmp_path):
+    log_file = _rotated_log(tmp_path, [b"one\n", b"two\n"])
+    segment = tmp_path / LogManifest.load(log_file).segments[0]["file"]
+    mark_compressed(segment, compress_segment(segment))
+
+    assert not segment.exists()
+    assert LogManifest.load(log_file).segments[0]["compression"] == "gzip"
+    assert LogReader(log_file).read(1, 100) == (1, b"ne\n")
+    assert read_log_tail(log_file) == (0, "one\ntwo\n")
+
+
+def test_reader_skips_deleted_segments(tmp_path):
+    log_file = _rotated_log(tmp_path, [b"one\n", b"two\n", b"three\n"])
+    manifest = LogManifest.load(log_file)
+    (tmp_path / manifest.segments[0]["file"]).unlink()
+    manifest.segments[0]["deleted"] = True
+    manifest.save()
+
+    assert LogReader(log_file).read(0, 100) == (4, b"two\n")
+
+
+def test_reader_skips_segment_missing_without_manifest_update(tmp_path):
+    log_file = _rotated_log(tmp_path, [b"one\n", b"two\n"])
+    (tmp_path / LogManifest.load(log_file).segments[0]["file"]).unlink()
+
+    assert LogReader(log_file).read(0, 100) == (4, b"two\n")
+
+
+def test_rotation_policy():
+    policy = RotationPolicy(segment_bytes=100, segment_age=60)
+    assert not policy.due(0, 3600)
+    assert policy.due(100, 0)
+    assert policy.due(1, 60)
+    assert not RotationPolicy(segment_bytes=0, segment_age=0).due(10**9, 10**9)
@@ -0,0 +1,59 @@
+"""Tests for agent.daemon.scheduler."""
+
+from __future__ import annotations
+
+from agent.daemon.scheduler import MAX_PER_PROJECT_ENV, MAX_RUNNING_ENV, AgentScheduler
+
+
+def test_unlimited_always_has_capacity():
+    scheduler = AgentScheduler()
+    assert scheduler.has_capacity("p", ["p"] * 100)
+
+
+def test_fleet_and_project_limits():
+    scheduler = AgentScheduler(max_running=3, max_per_project=2)
+    assert scheduler.has_capacity("p", ["p"])
+    assert not scheduler.has_capacity("p", ["p", "p"])
+    assert scheduler.has_capacity("q", ["p", "p"])
+    assert not scheduler.has_capacity("q", ["p", "p", "q"])
+
+
+def test_admission_by_priority_then_fifo():
+    scheduler = AgentScheduler(max_running=2)
+    scheduler.enqueue("low", "p")
+    scheduler.enqueue("high", "p", priority=5)
+    scheduler.enqueue("low2", "p")
+    assert scheduler.position("high") == 1
+    assert scheduler.position("low2") == 3
+
+    assert scheduler.pop_admissible([]) == ["high", "low"]
+    assert scheduler.is_queued("low2")
+    assert scheduler.pop_admissible(["p", "p"]) == []
+    assert scheduler.pop_admissible(["p"]) == ["low2"]
+
+
+def test_project_at_limit_does_not_block_others():
+    scheduler = AgentScheduler(max_running=4, max_per_project=1)
+    scheduler.enqueue("a1", "a")
+    scheduler.enqueue("a2", "a")
+    scheduler.enqueue("b1", "b")
+    assert scheduler.pop_admissible(["a"]) == ["b1"]
+    assert scheduler.position("a1") == 1
+
+
+def test_requeue_moves_to_back_and_remove():
+    scheduler = AgentScheduler()
+    scheduler.enqueue("x", "p")
+    scheduler.enqueue("y", "p")
+    scheduler.enqueue("x", "p")
+    assert scheduler.position("x") == 2
+    assert scheduler.remove("x")
+    assert not scheduler.remove("x")
+    assert scheduler.position("x") is None
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.setenv(MAX_RUNNING_ENV, "4")
+    monkeypatch.setenv(MAX_PER_PROJECT_ENV, "bogus")
+    scheduler = AgentScheduler.from_env()
+    assert (scheduler.max_running, scheduler.max_per_project) == (4, 0)
@@ -3,9 +3,11 @@
 TUI Application - Terminal-based agent runner
 
 Uses daemon architecture: agents run in background daemon process,
-TUI connects to display output and control agents.
+TUI connects to display output and control agents. Agent status, pending
+checkpoints and session phases are pushed by the daemon's event stream.
 """
 
+import asyncio
 import contextlib
 import json
 import re
@@ -26,7 +28,6 @@ from textual.widgets.option_list import Option  # noqa: E402
 
 from agent.core import (  # noqa: E402
     approve_checkpoint,
-    get_pending_checkpoint_type,
     is_checkpoint_pending,
     load_pending_checkpoint,
     reject_checkpoint,
@@ -34,7 +35,14 @@ from agent.core import (  # noqa: E402
 )
 
 # Import agent functionality for orchestration
-from agent.daemon import DaemonClient, DaemonError, DaemonNotRunningError  # noqa: E402
+from agent.daemon import (  # noqa: E402
+    DaemonClient,
+    DaemonError,
+    DaemonEventOverflowError,
+    DaemonNotRunningError,
+    EventType,
+    read_log_tail,
+)
 from common import (  # noqa: E402
     CheckpointStatus,
     SpecConfig,
@@ -65,8 +73,13 @@ from .screens import (  # noqa: E402
 
 # Agent status constants
 STATUS_READY = "ready"
+STATUS_QUEUED = "queued"
 STATUS_RUNNING = "running"
 STATUS_STOPPED = "stopped"
+STATUS_FAILED = "failed"
+
+# Seconds before resubscribing after the daemon event stream dropped
+_EVENT_RECONNECT_DELAY = 5.0
 
 
 @dataclass
@@ -83,6 +96,8 @@ class AgentSession:
         spec_slug: Unique spec identifier
         name: Display name
         auto_accept: Whether auto-accept mode is enabled for this agent
+        phase: Session phase reported by the daemon (initializer/coding/mr_creation)
+        pending_checkpoint_type: Type of the pending HITL checkpoint reported by the daemon
     """
 
     agent_id: str
@@ -90,6 +105,8 @@ class AgentSession:
     terminal: LogTerminal | None = None
     status: str = STATUS_READY
     log_file: Path | None = None
+    phase: str | None = None
+    pending_checkpoint_type: str | None = None
     # Computed fields (set in __post_init__)
     agent_dir: Path = field(init=False)
     spec_slug: str = field(init=False)
@@ -113,7 +130,7 @@ class CodingHarnessApp(App):
     Uses daemon architecture:
     - Agents run as subprocesses of the daemon (not TUI)
     - TUI connects to daemon to start/stop/list agents
-    - TUI tails log files to display agent output
+    - TUI streams agent output and receives status/checkpoint events
     - TUI can exit/restart without affecting running agents
     """
 
@@ -182,6 +199,8 @@ class CodingHarnessApp(App):
         Binding("d", "delete_agent", "▸Del"),
         Binding("a", "toggle_auto_accept", "▸Auto"),
         Binding("b", "change_branch", "▸Branch"),
+        Binding("S", "start_all_agents", "Start all", show=False),
+        Binding("K", "stop_all_agents", "Stop all", show=False),
         # Checkpoint commands (require agent + checkpoint) - prefixed with ◆
         Binding("r", "review_checkpoint", "◆Review"),
         Binding("y", "hitl_approve", "◆Yes"),
@@ -236,6 +255,7 @@ class CodingHarnessApp(App):
             return
         await self._sync_agents_from_daemon()
         await self._initialize_agents()
+        self.run_worker(self._listen_for_daemon_events(), group="daemon-events")
 
     async def _connect_to_daemon(self) -> bool:
         """Connect to the daemon service.
@@ -289,8 +309,7 @@ class CodingHarnessApp(App):
                     try:
                         spec_config = SpecConfig.from_dict(config_dict)
                         session = AgentSession(agent_id, spec_config)
-                        session.status = agent_info.get("status", STATUS_STOPPED)
-                        session.log_file = Path(agent_info["log_file"]) if agent_info.get("log_file") else None
+                        self._apply_agent_info(session, agent_info)
                         self.agents[agent_id] = session
                         restored_count += 1
                     except (KeyError, ValueError) as e:
@@ -312,6 +331,81 @@ class CodingHarnessApp(App):
         except DaemonError as e:
             self.notify(f"Failed to sync with daemon: {e}", severity="error")
 
+    def _apply_agent_info(self, session: AgentSession, agent_info: dict) -> None:
+        """Copy daemon-reported state (list/status response) onto a session."""
+        session.status = agent_info.get("status", STATUS_STOPPED)
+        session.log_file = Path(agent_info["log_file"]) if agent_info.get("log_file") else None
+        session.phase = agent_info.get("phase")
+        session.pending_checkpoint_type = agent_info.get("pending_checkpoint_type")
+
+    async def _listen_for_daemon_events(self) -> None:
+        """Apply daemon events to the sessions for as long as the app runs.
+
+        The daemon pushes status, checkpoint and phase changes, so nothing
+        is polled. After the stream drops (overflow, daemon restart) the
+        sessions are resynced with one list call before resubscribing.
+        """
+        client = DaemonClient()
+        resync = False
+        while True:
+            try:
+                if resync:
+                    agent_infos = await self._daemon_client.list_agents(
+                        fields=["status", "log_file", "phase", "pending_checkpoint_type"]
+                    )
+                    for agent_info in agent_infos:
+                        session = self.agents.get(agent_info.get("agent_id", ""))
+                        if session:
+                            self._apply_agent_info(session, agent_info)
+                    self._update_info_bar()
+                async for event in client.subscribe_events():
+                    self._on_daemon_event(event)
+            except DaemonEventOverflowError:
+                resync = True
+                continue
+            except DaemonError as e:
+                self.log.warning(f"Daemon event stream lost: {e}")
+            resync = True
+            await asyncio.sleep(_EVENT_RECONNECT_DELAY)
+
+    def _on_daemon_event(self, event: dict) -> None:
+        """Update the affected session from one daemon event."""
+        session = self.agents.get(event.get("agent_id", ""))
+        if session is None:
+            return
+
+        event_type = event.get("event")
+        if event_type == EventType.AGENT_QUEUED:
+            session.status = STATUS_QUEUED
+        elif event_type == EventType.AGENT_STARTED:
+            was_queued = session.status == STATUS_QUEUED
+            session.status = STATUS_RUNNING
+            session.log_file = Path(event["log_file"]) if event.get("log_file") else session.log_file
+            if was_queued:
+                # Admitted by the daemon scheduler: no start response will create the terminal
+                self.run_worker(self._create_log_terminal(session.agent_id))
+        elif event_type == EventType.AGENT_EXITED:
+            session.status = event.get("status", STATUS_STOPPED)
+            if event.get("exit_code"):
+                self.notify(f"{session.name} exited with code {event['exit_code']}", severity="warning")
+        elif event_type == EventType.AGENT_FAILED:
+            session.status = STATUS_FAILED
+            self.notify(f"{session.name} failed to start: {event.get('message')}", severity="error")
+        elif event_type == EventType.PHASE_CHANGED:
+            session.phase = event.get("phase")
+        elif event_type in (
+            EventType.CHECKPOINT_CREATED,
+            EventType.CHECKPOINT_RESOLVED,
+            EventType.CHECKPOINT_COMPLETED,
+        ):
+            session.pending_checkpoint_type = event.get("pending_checkpoint_type")
+            if event_type == EventType.CHECKPOINT_CREATED and event.get("status") == CheckpointStatus.PENDING.value:
+                checkpoint_type = str(event.get("checkpoint_type", "")).replace("_", " ").title()
+                self.notify(f"{session.name}: {checkpoint_type} checkpoint awaiting review")
+
+        if session.agent_id == self.selected_agent:
+            self._update_info_bar()
+
     def _get_selected_session(self, require_running: bool = False) -> AgentSession | None:
         """Get the currently selected agent session with validation.
 
@@ -350,9 +444,7 @@ class CodingHarnessApp(App):
             no_mr_indicator = " NO-MR" if session.config.skip_mr_creation else " MR"
 
             hitl_indicator = ""
-            checkpoint_type = get_pending_checkpoint_type(
-                session.config.project_dir, session.spec_slug, session.config.spec_hash
-            )
+            checkpoint_type = session.pending_checkpoint_type
             if checkpoint_type:
                 hitl_labels = {
                     "project_verification": "PROJ",
@@ -364,7 +456,7 @@ class CodingHarnessApp(App):
                     "mr_phase_transition": "MR-GATE",
                     "mr_review": "MR",
                 }
-                hitl_label = hitl_labels.get(checkpoint_type.value, "HITL")
+                hitl_label = hitl_labels.get(checkpoint_type, "HITL")
                 hitl_indicator = f" [HITL:{hitl_label}]"
 
             iters_indicator = "" if session.config.max_iterations is None else f" | max:{session.config.max_iterations}"
@@ -452,11 +544,16 @@ class CodingHarnessApp(App):
         except NoMatches:
             if session.log_file and session.status in (STATUS_RUNNING, STATUS_STOPPED):
                 # Create terminal to tail log file
-                terminal = LogTerminal(log_file=session.log_file, id=term_id, classes="agent-terminal")
+                terminal = LogTerminal(
+                    log_file=session.log_file, agent_id=agent_id, id=term_id, classes="agent-terminal"
+                )
                 terminal_area = self.query_one("#terminal-area", Container)
                 terminal_area.mount(terminal)
                 session.terminal = terminal
                 terminal.start()
+            elif session.status == STATUS_QUEUED:
+                status.display = True
+                status.update(f"Agent: {session.name}\n\nQueued - starts when the daemon has a free slot")
             else:
                 status.display = True
                 status.update(f"Agent: {session.name}\n\nPress 's' to start")
@@ -501,6 +598,12 @@ class CodingHarnessApp(App):
             agent_info = await self._daemon_client.start_agent(agent_id, config_dict)
 
             session.status = agent_info.get("status", STATUS_RUNNING)
+            if session.status == STATUS_QUEUED:
+                # The terminal is created by the agent_started event on admission
+                self._show_terminal(self.selected_agent)
+                self._update_info_bar()
+                self.notify(f"Queued: {session.name} (daemon running limit reached)")
+                return
             session.log_file = Path(agent_info["log_file"]) if agent_info.get("log_file") else None
 
             # Create terminal to tail the log file
@@ -513,6 +616,66 @@ class CodingHarnessApp(App):
         except DaemonError as e:
             self.notify(f"Failed to start agent: {e}", severity="error")
 
+    async def _start_agents_via_daemon(self, agent_ids: list[str]) -> None:
+        """Start several agents via the daemon in one request."""
+        configs = {
+            agent_id: self.agents[agent_id].config.to_dict() for agent_id in agent_ids if agent_id in self.agents
+        }
+        try:
+            results = await self._daemon_client.start_many(configs)
+        except DaemonError as e:
+            self.notify(f"Failed to start agents: {e}", severity="error")
+            return
+
+        failed = queued = 0
+        for result in results:
+            session = self.agents.get(result.get("agent_id", ""))
+            if session is None:
+                continue
+            if result.get("status") != "ok":
+                failed += 1
+                continue
+            agent_info = result.get("agent", {})
+            session.status = agent_info.get("status", STATUS_RUNNING)
+            if session.status == STATUS_QUEUED:
+                queued += 1
+                continue
+            session.log_file = Path(agent_info["log_file"]) if agent_info.get("log_file") else None
+            await self._create_log_terminal(session.agent_id)
+
+        self._show_terminal(self.selected_agent)
+        self._update_info_bar()
+        started = len(results) - failed - queued
+        queued_note = f", {queued} queued" if queued else ""
+        if failed:
+            self.notify(f"Started {started} agent(s){queued_note}, {failed} failed", severity="warning")
+        else:
+            self.notify(f"Started {started} agent(s){queued_note}")
+
+    async def _stop_agents_via_daemon(self, agent_ids: list[str]) -> None:
+        """Stop several agents via the daemon in one request."""
+        try:
+            results = await self._daemon_client.stop_many(agent_ids)
+        except DaemonError as e:
+            self.notify(f"Failed to stop agents: {e}", severity="error")
+            return
+
+        failed = 0
+        for result in results:
+            session = self.agents.get(result.get("agent_id", ""))
+            if session is None:
+                continue
+            if result.get("status") != "ok":
+                failed += 1
+                continue
+            session.status = result.get("agent", {}).get("status", STATUS_STOPPED)
+
+        self._update_info_bar()
+        if failed:
+            self.notify(f"Stopped {len(results) - failed} agent(s), {failed} failed", severity="warning")
+        else:
+            self.notify(f"Stopped {len(results)} agent(s)")
+
     async def _create_log_terminal(self, agent_id: str) -> None:
         """Create a LogTerminal widget to tail the agent's log file."""
         if agent_id not in self.agents:
@@ -533,7 +696,7 @@ class CodingHarnessApp(App):
             pass
 
         # Create new terminal
-        terminal = LogTerminal(log_file=session.log_file, id=term_id, classes="agent-terminal")
+        terminal = LogTerminal(log_file=session.log_file, agent_id=agent_id, id=term_id, classes="agent-terminal")
         terminal_area = self.query_one("#terminal-area", Container)
         terminal_area.mount(terminal)
 
@@ -705,6 +868,7 @@ class CodingHarnessApp(App):
 
   n  New agent      s  Start agent
   k  Stop agent     d  Delete agent
+  S  Start all      K  Stop all
   b  Change branch  a  Toggle auto-accept
   r  Review checkpoint (detailed view)
   y  Approve HITL   x  Reject HITL
@@ -734,6 +898,9 @@ Daemon Architecture:
         if session.status == STATUS_RUNNING:
             self.notify("Agent already running", severity="warning")
             return
+        if session.status == STATUS_QUEUED:
+            self.notify("Agent already queued", severity="warning")
+            return
 
         # Start via daemon (async)
         self.run_worker(self._start_agent_via_daemon(session.agent_id))
@@ -746,6 +913,30 @@ Daemon Architecture:
 
         self.run_worker(self._stop_agent_via_daemon(session.agent_id))
 
+    def action_start_all_agents(self) -> None:
+        """Start every agent that is not running."""
+        agent_ids = [
+            agent_id
+            for agent_id, session in self.agents.items()
+            if session.status not in (STATUS_RUNNING, STATUS_QUEUED)
+        ]
+        if not agent_ids:
+            self.notify("No stopped agents", severity="warning")
+            return
+
+        self.run_worker(self._start_agents_via_daemon(agent_ids))
+
+    def action_stop_all_agents(self) -> None:
+        """Stop every running agent."""
+        agent_ids = [
+            agent_id for agent_id, session in self.agents.items() if session.status in (STATUS_RUNNING, STATUS_QUEUED)
+        ]
+        if not agent_ids:
+            self.notify("No running agents", severity="warning")
+            return
+
+        self.run_worker(self._stop_agents_via_daemon(agent_ids))
+
     def action_delete_agent(self) -> None:
         """Delete the selected agent."""
         session = self._get_selected_session()
@@ -840,12 +1031,12 @@ Daemon Architecture:
             return
 
         try:
-            content = session.log_file.read_text(encoding="utf-8", errors="replace")
+            start, content = read_log_tail(session.log_file)
             lines = content.count("\n")
 
             # Use Textual's built-in clipboard support
             self.copy_to_clipboard(content)
-            self.notify(f"Copied {lines} lines to clipboard")
+            self.notify(f"Copied {lines} lines to clipboard" + (" (end of the log)" if start else ""))
         except (OSError, UnicodeDecodeError) as e:
             self.notify(f"Failed to copy: {e}", severity="error")
 
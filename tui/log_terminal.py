@@ -2,32 +2,40 @@
 Log Terminal Widget
 ====================
 
-Widget for displaying agent log output by tailing log files.
-Agents run in the daemon process; this widget just displays their output.
+Widget for displaying agent log output.
+Agents run in the daemon process; this widget just displays their output,
+streamed over the daemon socket (subscribe_logs) or, without an agent id or
+when the daemon is unreachable, by tailing the log file.
 """
 
 from __future__ import annotations
 
 import asyncio
+import codecs
 from pathlib import Path
 
 from rich.text import Text
 from textual.widgets import RichLog
 
+from agent.daemon import DaemonClient, DaemonError, LogReader
+
 
 class LogTerminal(RichLog):
-    """A terminal-like widget that tails a log file.
+    """A terminal-like widget that shows an agent's log output.
 
-    This widget displays agent output by watching a log file written by the daemon.
-    It uses async file tailing to show real-time updates.
+    With an agent_id, output is pushed by the daemon as it is produced.
+    Otherwise (or if streaming fails) the log file written by the daemon is
+    tailed, resuming from the last byte offset received.
     """
 
     _FILE_WAIT_INTERVAL: float = 0.5  # Seconds to wait when file doesn't exist
     _POLL_INTERVAL: float = 0.2  # Seconds between file reads for new content
+    _READ_BYTES: int = 1024 * 1024  # Max bytes read from the log at once
 
     def __init__(
         self,
         log_file: Path | str | None = None,
+        agent_id: str | None = None,
         name: str | None = None,
         id: str | None = None,  # pylint: disable=redefined-builtin
         classes: str | None = None,
@@ -36,6 +44,7 @@ class LogTerminal(RichLog):
 
         Args:
             log_file: Path to the log file to tail
+            agent_id: Daemon agent id to stream the log from
             name: Optional widget name
             id: Optional widget ID
             classes: Optional CSS classes
@@ -50,6 +59,7 @@ class LogTerminal(RichLog):
             auto_scroll=True,
         )
         self._log_file: Path | None = Path(log_file) if log_file else None
+        self._agent_id = agent_id
         self._tail_task: asyncio.Task[None] | None = None
         self._file_position: int = 0
         self._active: bool = False
@@ -73,7 +83,10 @@ class LogTerminal(RichLog):
         if self._tail_task and not self._tail_task.done():
             return
 
-        self._tail_task = asyncio.create_task(self._tail_file())
+        if self._agent_id:
+            self._tail_task = asyncio.create_task(self._stream_from_daemon())
+        else:
+            self._tail_task = asyncio.create_task(self._tail_file())
 
     def _stop_tailing(self) -> None:
         """Stop the tail task."""
@@ -81,8 +94,26 @@ class LogTerminal(RichLog):
             self._tail_task.cancel()
             self._tail_task = None
 
-    async def _tail_file(self) -> None:
-        """Tail the log file and write new content to the widget."""
+    async def _stream_from_daemon(self) -> None:
+        """Write log chunks pushed by the daemon; fall back to tailing on error."""
+        assert self._agent_id is not None
+        try:
+            async for chunk in DaemonClient().subscribe_logs(self._agent_id, offset=self._file_position):
+                self._write_content(chunk["data"])
+                self._file_position = chunk["offset"]
+        except asyncio.CancelledError:
+            pass
+        except DaemonError:
+            if self._active:
+                await self._tail_file(resume=True)
+
+    async def _tail_file(self, resume: bool = False) -> None:
+        """Tail the log file and write new content to the widget.
+
+        Args:
+            resume: Continue from the current position instead of showing
+                the whole file
+        """
         if not self._log_file:
             return
 
@@ -93,25 +124,20 @@ class LogTerminal(RichLog):
                     return
                 await asyncio.sleep(self._FILE_WAIT_INTERVAL)
 
-            # Read existing content first
-            with open(self._log_file, encoding="utf-8", errors="replace") as f:
-                content = f.read()
-                if content:
-                    self._write_content(content)
-                self._file_position = f.tell()
-
-            # Then tail for new content
+            # Read existing content first, then tail for new content. Positions
+            # count bytes of the whole run, across rotated segments (a missing
+            # file reads as empty until it reappears)
+            if not resume:
+                self._file_position = 0
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            reader = LogReader(self._log_file)
             while self._active:
-                try:
-                    with open(self._log_file, encoding="utf-8", errors="replace") as f:
-                        f.seek(self._file_position)
-                        new_content = f.read()
-                        if new_content:
-                            self._write_content(new_content)
-                            self._file_position = f.tell()
-                except FileNotFoundError:
-                    # File was deleted, wait for it to reappear
-                    pass
+                # Off the UI thread: reads may decompress rotated segments
+                start, data = await asyncio.to_thread(reader.read, self._file_position, self._READ_BYTES)
+                if data:
+                    self._write_content(decoder.decode(data))
+                    self._file_position = start + len(data)
+                    continue
 
                 await asyncio.sleep(self._POLL_INTERVAL)
 
@@ -13,6 +13,8 @@ from textual.containers import Horizontal, Vertical
 from textual.screen import Screen
 from textual.widgets import Button, Static, TextArea
 
+from agent.daemon import read_log_tail
+
 _ERROR_PREFIX = "Error loading log:"
 
 
@@ -132,7 +134,10 @@ class LogViewerScreen(Screen):
     def _load_content(self) -> None:
         """Load the log file content."""
         try:
-            self._content = self.log_file.read_text(encoding="utf-8", errors="replace")
+            # Only the end of long logs: older output is in compressed segments
+            start, self._content = read_log_tail(self.log_file)
+            if start:
+                self._content = f"(... {start:,} earlier bytes not shown)\n" + self._content
             if not self._content:
                 self._content = "(Log file is empty)"
         except OSError as e: